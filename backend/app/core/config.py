@@ -1,8 +1,8 @@
 """Centralized settings management."""
 from functools import lru_cache
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
-from pydantic import Field, field_validator
+from pydantic import Field, ValidationInfo, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 DEFAULT_GEMINI_MODELS: List[str] = [
@@ -37,14 +37,74 @@ DEFAULT_GEMINI_MODELS: List[str] = [
 ]
 
 
+def _parse_model_values(value: str, setting: str) -> Dict[str, float]:
+    """Parse ``model=number`` pairs (comma separated, numbers > 0) used by per-model settings."""
+    parsed: Dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        model, sep, number = item.partition("=")
+        try:
+            parsed_number = float(number) if sep else 0.0
+        except ValueError:
+            parsed_number = 0.0
+        if parsed_number <= 0 or not model.strip():
+            raise ValueError(f"{setting} entries must look like model=1.5, got '{item}'")
+        parsed[model.strip()] = parsed_number
+    return parsed
+
+
 class Settings(BaseSettings):
     gemini_api_key: Optional[str] = Field(default=None, alias="GEMINI_API_KEY")
     gemini_model: str = Field(default="gemini-flash-latest", alias="GEMINI_MODEL")
     gemini_models: Optional[List[str]] = Field(default=None, alias="GEMINI_MODELS")
+    gemini_breaker_cooldown_seconds: float = Field(default=30, alias="GEMINI_BREAKER_COOLDOWN", ge=0)
+    gemini_routing: Literal["static", "adaptive"] = Field(default="static", alias="GEMINI_ROUTING")
+    gemini_routing_alpha: float = Field(default=0.2, alias="GEMINI_ROUTING_ALPHA", gt=0, le=1)
+    gemini_model_weights: str = Field(default="", alias="GEMINI_MODEL_WEIGHTS")
+    gemini_hedge_percentile: float = Field(default=0, alias="GEMINI_HEDGE_PERCENTILE", ge=0, lt=100)
+    gemini_hedge_max_fraction: float = Field(default=0.05, alias="GEMINI_HEDGE_MAX_FRACTION", ge=0, le=1)
+    gemini_interactive_concurrency: int = Field(default=32, alias="GEMINI_INTERACTIVE_CONCURRENCY", ge=1)
+    gemini_interactive_queue: int = Field(default=64, alias="GEMINI_INTERACTIVE_QUEUE", ge=0)
+    gemini_batch_concurrency: int = Field(default=4, alias="GEMINI_BATCH_CONCURRENCY", ge=1)
+    gemini_batch_queue: int = Field(default=16, alias="GEMINI_BATCH_QUEUE", ge=0)
+    gemini_queue_deadline_seconds: float = Field(default=10, alias="GEMINI_QUEUE_DEADLINE", gt=0)
+    gemini_rpm_limits: str = Field(default="", alias="GEMINI_RPM_LIMITS")
+    gemini_tpm_limits: str = Field(default="", alias="GEMINI_TPM_LIMITS")
+    gemini_rate_limit_max_wait_ms: int = Field(default=500, alias="GEMINI_RATE_LIMIT_MAX_WAIT_MS", ge=0)
+    gemini_retry_attempts: int = Field(default=3, alias="GEMINI_RETRY_ATTEMPTS", ge=1)
+    gemini_retry_base_ms: int = Field(default=200, alias="GEMINI_RETRY_BASE_MS", ge=0)
+    gemini_retry_max_ms: int = Field(default=2000, alias="GEMINI_RETRY_MAX_MS", ge=0)
+    gemini_retry_budget_seconds: float = Field(default=15, alias="GEMINI_RETRY_BUDGET", gt=0)
+    gemini_coalesce: bool = Field(default=True, alias="GEMINI_COALESCE")
+    request_timeout_seconds: float = Field(default=60, alias="REQUEST_TIMEOUT", gt=0)
+    request_timeout_max_seconds: float = Field(default=300, alias="REQUEST_TIMEOUT_MAX", gt=0)
     frontend_origins: str = Field(default="http://localhost:3000", alias="FRONTEND_ORIGINS")
     store_path: str = Field(default="data/store.json", alias="STORE_PATH")
     store_max_sessions_per_bot: int = Field(default=10, alias="STORE_MAX_SESSIONS", ge=1)
     store_max_turns_per_session: int = Field(default=200, alias="STORE_MAX_TURNS", ge=1)
+    store_journal: bool = Field(default=False, alias="STORE_JOURNAL")
+    store_compact_threshold: int = Field(default=1000, alias="STORE_COMPACT_THRESHOLD", ge=1)
+    store_shared: bool = Field(default=False, alias="STORE_SHARED")
+    store_lazy_load: bool = Field(default=False, alias="STORE_LAZY_LOAD")
+    store_session_ttl_seconds: int = Field(default=0, alias="STORE_SESSION_TTL", ge=0)
+    store_blueprint_ttl_seconds: int = Field(default=0, alias="STORE_BLUEPRINT_TTL", ge=0)
+    store_sweep_interval_seconds: int = Field(default=60, alias="STORE_SWEEP_INTERVAL", ge=1)
+    store_durability: Literal["always", "batch", "none"] = Field(default="always", alias="STORE_DURABILITY")
+    store_flush_interval_ms: int = Field(default=200, alias="STORE_FLUSH_INTERVAL_MS", ge=1)
+    store_flush_max_pending: int = Field(default=100, alias="STORE_FLUSH_MAX_PENDING", ge=1)
+    store_max_bytes: int = Field(default=0, alias="STORE_MAX_BYTES", ge=0)
+    blueprint_cache_path: str = Field(default="data/blueprint_cache.json", alias="BLUEPRINT_CACHE_PATH")
+    blueprint_cache_size: int = Field(default=256, alias="BLUEPRINT_CACHE_SIZE", ge=0)
+    blueprint_cache_ttl_seconds: int = Field(default=7 * 24 * 3600, alias="BLUEPRINT_CACHE_TTL", ge=0)
+    answer_cache_max_bots: int = Field(default=1024, alias="ANSWER_CACHE_MAX_BOTS", ge=0)
+    answer_cache_prewarm: bool = Field(default=False, alias="ANSWER_CACHE_PREWARM")
+    semantic_cache_enabled: bool = Field(default=False, alias="SEMANTIC_CACHE")
+    semantic_cache_threshold: float = Field(default=0.9, alias="SEMANTIC_CACHE_THRESHOLD", ge=0, le=1)
+    semantic_cache_size: int = Field(default=128, alias="SEMANTIC_CACHE_SIZE", ge=0)
+    semantic_cache_max_bots: int = Field(default=1024, alias="SEMANTIC_CACHE_MAX_BOTS", ge=0)
+    knowledge_top_k: int = Field(default=5, alias="KNOWLEDGE_TOP_K", ge=0)
+    knowledge_max_tokens: int = Field(default=400, alias="KNOWLEDGE_MAX_TOKENS", ge=0)
+    knowledge_index_max_bots: int = Field(default=1024, alias="KNOWLEDGE_INDEX_MAX_BOTS", ge=0)
+    prompt_max_tokens: int = Field(default=6000, alias="PROMPT_MAX_TOKENS", ge=0)
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
@@ -77,11 +137,32 @@ class Settings(BaseSettings):
             )
         return value
 
+    @field_validator("gemini_model_weights", "gemini_rpm_limits", "gemini_tpm_limits")
+    @classmethod
+    def _validate_model_values(cls, value: str, info: ValidationInfo) -> str:
+        _parse_model_values(value, cls.model_fields[info.field_name].alias or info.field_name)
+        return value
+
     @property
     def allowed_origins(self) -> list[str]:
         """Normalized list of origins allowed by CORS."""
         return [origin.strip() for origin in self.frontend_origins.split(",") if origin.strip()]
 
+    @property
+    def model_weights(self) -> Dict[str, float]:
+        """Routing preference per model from ``GEMINI_MODEL_WEIGHTS`` (default weight is 1)."""
+        return _parse_model_values(self.gemini_model_weights, "GEMINI_MODEL_WEIGHTS")
+
+    @property
+    def rpm_limits(self) -> Dict[str, float]:
+        """Requests per minute per model from ``GEMINI_RPM_LIMITS``; ``*`` applies to unlisted models."""
+        return _parse_model_values(self.gemini_rpm_limits, "GEMINI_RPM_LIMITS")
+
+    @property
+    def tpm_limits(self) -> Dict[str, float]:
+        """Tokens per minute per model from ``GEMINI_TPM_LIMITS``; ``*`` applies to unlisted models."""
+        return _parse_model_values(self.gemini_tpm_limits, "GEMINI_TPM_LIMITS")
+
     @property
     def available_models(self) -> List[str]:
         return DEFAULT_GEMINI_MODELS
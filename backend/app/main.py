@@ -1,12 +1,29 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
 from app.routers.ai_router import router as api_router
+from app.services import gemini_client
+from app.services.answer_cache import answer_cache
+from app.services.blueprint_cache import blueprint_cache
+from app.services.knowledge_index import knowledge_index
+from app.services.prompt_budget import prompt_budget
+from app.services.semantic_cache import semantic_cache
+from app.services.store import store
 
 settings = get_settings()
 
-app = FastAPI(title="IntegrAIte Backend", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    # Batched durability levels may still hold mutations in memory.
+    store.flush()
+
+
+app = FastAPI(title="IntegrAIte Backend", version="0.1.0", lifespan=lifespan)
 
 # Ensure allowed_origins is a list of strings
 origins = settings.allowed_origins
@@ -26,5 +43,21 @@ def health_check() -> dict:
     """Lightweight liveness probe."""
     return {"status": "ok"}
 
+
+@app.get("/metrics", tags=["system"])
+def metrics() -> dict:
+    """Storage, cache and model-routing counters for dashboards and capacity planning."""
+    return {
+        "store": store.stats(),
+        "gemini": gemini_client.stats(),
+        "knowledge": knowledge_index.stats(),
+        "prompts": prompt_budget.stats(),
+        "caches": {
+            "blueprints": blueprint_cache.stats(),
+            "answers": answer_cache.stats(),
+            "semantic": semantic_cache.stats(),
+        },
+    }
+
 # Mount versioned API router
 app.include_router(api_router, prefix="/api/v1")
\ No newline at end of file
@@ -1,4 +1,8 @@
-from fastapi import APIRouter, Header, HTTPException, Query
+import json
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from app.models.bot import (
     BotBlueprint,
@@ -9,51 +13,130 @@ from app.models.bot import (
 )
 from app.models.message import ChatMessage, ChatResponse
 from app.models.session import SessionState
-from app.services.ai_service import generate_ai_reply_with_context
-from app.services.blueprint_service import create_bot_blueprint
+from app.services.ai_service import generate_ai_reply_with_context_async, stream_ai_reply_with_context
+from app.services.blueprint_service import create_bot_blueprint_async
+from app.services.deadline import Deadline
 from app.services.exceptions import (
     AIServiceError,
     BlueprintNotFoundError,
+    DeadlineExceededError,
     MissingConfigurationError,
+    ServiceOverloadedError,
 )
-from app.services.playground_service import chat_with_bot
+from app.services.playground_service import chat_with_bot_async, stream_chat_with_bot
 from app.services.snippet_service import generate_snippet
 from app.services.store import store
 
 router = APIRouter(tags=["chat"])
 
 
+def _overloaded(exc: ServiceOverloadedError) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": str(exc.retry_after)})
+
+
+def _request_deadline(
+    timeout: Optional[float] = Header(default=None, alias="X-Request-Timeout", gt=0),
+) -> Deadline:
+    """Deadline from ``X-Request-Timeout`` (seconds), else ``REQUEST_TIMEOUT``."""
+    return Deadline.from_header(timeout)
+
+
+def _timed_out(exc: DeadlineExceededError) -> HTTPException:
+    return HTTPException(status_code=504, detail=str(exc))
+
+
+def _sse_event(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _sse_stream(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Frame reply chunks as Server-Sent Events.
+
+    The status line is already sent once streaming starts, so a failure is
+    reported as an ``error`` event instead of an HTTP status.
+    """
+    try:
+        async for chunk in chunks:
+            yield _sse_event({"delta": chunk})
+    except Exception as exc:  # noqa: BLE001 - surfaced to the client as an event
+        yield _sse_event({"detail": str(exc)}, event="error")
+        return
+    yield _sse_event({}, event="done")
+
+
+def _sse_response(chunks: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        _sse_stream(chunks),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/ping", summary="Simple ping")
 def ping() -> dict:
     return {"message": "pong"}
 
 
 @router.post("/chat", response_model=ChatResponse, summary="Chat with AI maintaining context")
-def chat(
+async def chat(
     message: ChatMessage,
-    session_id: str = Header(default="default", alias="X-Session-ID")
+    session_id: str = Header(default="default", alias="X-Session-ID"),
+    deadline: Deadline = Depends(_request_deadline),
 ) -> ChatResponse:
     """
     Chat with AI maintaining conversation history per session.
     Send X-Session-ID header to maintain context across requests.
     """
-    reply = generate_ai_reply_with_context(session_id, message.content)
+    try:
+        reply = await generate_ai_reply_with_context_async(session_id, message.content, deadline=deadline)
+    except ServiceOverloadedError as exc:
+        raise _overloaded(exc) from exc
+    except DeadlineExceededError as exc:
+        raise _timed_out(exc) from exc
     if reply is None:
         raise HTTPException(status_code=503, detail="AI service unavailable")
     return ChatResponse(reply=reply)
 
 
+@router.post("/chat/stream", summary="Stream an AI reply as Server-Sent Events")
+async def chat_stream(
+    message: ChatMessage,
+    session_id: str = Header(default="default", alias="X-Session-ID"),
+    deadline: Deadline = Depends(_request_deadline),
+) -> StreamingResponse:
+    """
+    Same as ``/chat``, but the reply arrives as ``data: {"delta": ...}`` events
+    followed by a ``done`` (or ``error``) event.
+    """
+    try:
+        chunks = stream_ai_reply_with_context(session_id, message.content, deadline=deadline)
+    except ServiceOverloadedError as exc:
+        raise _overloaded(exc) from exc
+    if chunks is None:
+        raise HTTPException(status_code=503, detail="AI service unavailable")
+    return _sse_response(chunks)
+
+
 @router.post(
     "/bots/blueprint",
     response_model=BotBlueprint,
     summary="Create a bot blueprint from interview answers",
 )
-def create_blueprint(
+async def create_blueprint(
     payload: BotBlueprintRequest,
     session_id: str = Header(default=None, alias="X-Session-ID"),
+    cache_control: Optional[str] = Header(default=None, alias="Cache-Control"),
+    deadline: Deadline = Depends(_request_deadline),
 ) -> BotBlueprint:
+    """Send ``Cache-Control: no-cache`` to skip blueprints cached for identical answers."""
+    use_cache = "no-cache" not in (cache_control or "").lower()
     try:
-        return create_bot_blueprint(payload, session_id)
+        return await create_bot_blueprint_async(payload, session_id, deadline=deadline, use_cache=use_cache)
+    except ServiceOverloadedError as exc:
+        raise _overloaded(exc) from exc
+    except DeadlineExceededError as exc:
+        raise _timed_out(exc) from exc
     except MissingConfigurationError as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
     except AIServiceError as exc:
@@ -65,14 +148,19 @@ def create_blueprint(
     response_model=ChatResponse,
     summary="Talk to a freshly generated bot",
 )
-def playground_chat(
+async def playground_chat(
     bot_id: str,
     message: PlaygroundMessage,
     session_id: str = Header(default="default", alias="X-Session-ID"),
+    deadline: Deadline = Depends(_request_deadline),
 ) -> ChatResponse:
     try:
-        reply = chat_with_bot(bot_id, session_id, message.content)
+        reply = await chat_with_bot_async(bot_id, session_id, message.content, deadline=deadline)
         return ChatResponse(reply=reply)
+    except ServiceOverloadedError as exc:
+        raise _overloaded(exc) from exc
+    except DeadlineExceededError as exc:
+        raise _timed_out(exc) from exc
     except MissingConfigurationError as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
     except BlueprintNotFoundError as exc:
@@ -81,6 +169,24 @@ def playground_chat(
         raise HTTPException(status_code=502, detail=str(exc)) from exc
 
 
+@router.post("/bots/{bot_id}/playground/stream", summary="Stream a Playground reply as Server-Sent Events")
+async def playground_chat_stream(
+    bot_id: str,
+    message: PlaygroundMessage,
+    session_id: str = Header(default="default", alias="X-Session-ID"),
+    deadline: Deadline = Depends(_request_deadline),
+) -> StreamingResponse:
+    try:
+        chunks = await stream_chat_with_bot(bot_id, session_id, message.content, deadline=deadline)
+    except ServiceOverloadedError as exc:
+        raise _overloaded(exc) from exc
+    except MissingConfigurationError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    except BlueprintNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return _sse_response(chunks)
+
+
 @router.get(
     "/bots/{bot_id}/snippet",
     response_model=BotSnippetResponse,
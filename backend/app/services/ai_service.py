@@ -9,10 +9,13 @@ from __future__ import annotations
 #     os.environ.setdefault("REQUESTS_CA_BUNDLE", certifi.where())
 # except Exception:
 #     pass
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from app.core.config import get_settings
-from app.services.gemini_client import generate_with_fallback
+from app.services.bulkhead import bulkheads
+from app.services.deadline import Deadline
+from app.services.exceptions import DeadlineExceededError, ServiceOverloadedError
+from app.services.gemini_client import generate_with_fallback, generate_with_fallback_async, stream_with_fallback
 
 settings = get_settings()
 
@@ -63,3 +66,54 @@ def generate_ai_reply_with_context(session_id: str, prompt: str) -> Optional[str
         # Remove the user turn we appended so the history stays consistent.
         history.pop()
         return f"Error: {str(e)}"
+
+
+async def generate_ai_reply_with_context_async(
+    session_id: str, prompt: str, *, deadline: Optional[Deadline] = None
+) -> Optional[str]:
+    """Async ``generate_ai_reply_with_context``; overload and deadline errors propagate for a 503/504.
+
+    Other requests for the same session may run while Gemini is awaited, so the
+    exchange is only added to the history once the reply arrived.
+    """
+    if not prompt or not settings.gemini_api_key:
+        return None
+
+    history = get_or_create_history(session_id)
+    user_message = _user_message(prompt)
+
+    try:
+        response, _ = await generate_with_fallback_async([*history, user_message], deadline=deadline)
+    except (ServiceOverloadedError, DeadlineExceededError):
+        raise
+    except Exception as e:
+        return f"Error: {str(e)}"
+    if deadline is not None:
+        deadline.check()
+    history.extend((user_message, _model_message(response.text)))
+    return response.text
+
+
+def stream_ai_reply_with_context(
+    session_id: str, prompt: str, *, deadline: Optional[Deadline] = None
+) -> Optional[AsyncIterator[str]]:
+    """Return an iterator over the reply chunks, or ``None`` when the AI service is unavailable.
+
+    Raises ``BulkheadFullError`` up front when the interactive pool is saturated.
+    """
+    if not prompt or not settings.gemini_api_key:
+        return None
+    bulkheads["interactive"].check()
+    return _stream_reply(session_id, prompt, deadline)
+
+
+async def _stream_reply(session_id: str, prompt: str, deadline: Optional[Deadline]) -> AsyncIterator[str]:
+    # The exchange joins the history only once the stream completed.
+    history = get_or_create_history(session_id)
+    user_message = _user_message(prompt)
+    parts = []
+
+    async for chunk in stream_with_fallback([*history, user_message], deadline=deadline):
+        parts.append(chunk)
+        yield chunk
+    history.extend((user_message, _model_message("".join(parts))))
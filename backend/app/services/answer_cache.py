@@ -0,0 +1,109 @@
+"""First-turn answers to a bot's sample questions, served without calling Gemini."""
+from __future__ import annotations
+
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import get_settings
+from app.models.bot import BotBlueprint
+
+
+def normalize_question(text: str) -> str:
+    """Case-, accent- and punctuation-insensitive form of a question, for exact matching."""
+    chars = []
+    for char in unicodedata.normalize("NFKD", text).casefold():
+        if unicodedata.category(char).startswith("M"):
+            continue  # combining marks: accents, Hebrew niqqud
+        chars.append(char if char.isalnum() else " ")
+    return " ".join("".join(chars).split())
+
+
+class AnswerCache:
+    """Per-bot map from normalized sample question to its answer.
+
+    A bot's entry starts out as the blueprint's ``sample_responses`` and is
+    built on first use when missing (e.g. after a restart). Pre-warming may
+    replace those with full Gemini answers. At most ``max_bots`` bots are kept,
+    least recently used first out.
+    """
+
+    def __init__(self, max_bots: int, *, prewarm: bool = False) -> None:
+        self._max_bots = max_bots
+        self.prewarm = prewarm
+        self._answers: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "prewarmed": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_bots > 0
+
+    def populate(self, blueprint: BotBlueprint) -> None:
+        """(Re)build the bot's answers from its blueprint samples."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._put_locked(blueprint.bot_id, self._sample_answers(blueprint))
+
+    def lookup(self, blueprint: BotBlueprint, message: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            answers = self._answers.get(blueprint.bot_id)
+            if answers is None:
+                answers = self._sample_answers(blueprint)
+            self._put_locked(blueprint.bot_id, answers)
+            answer = answers.get(normalize_question(message))
+            self._counters["hits" if answer is not None else "misses"] += 1
+            return answer
+
+    def store(self, bot_id: str, question: str, answer: str) -> bool:
+        """Record a generated answer for a bot that is still cached; returns whether it was kept."""
+        with self._lock:
+            answers = self._answers.get(bot_id)
+            if answers is None:
+                return False
+            answers[normalize_question(question)] = answer
+            self._counters["prewarmed"] += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "bots": len(self._answers),
+                "max_bots": self._max_bots,
+                "answers": sum(len(answers) for answers in self._answers.values()),
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else None,
+                **self._counters,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._answers.clear()
+            self._counters = dict.fromkeys(self._counters, 0)
+
+    @staticmethod
+    def _sample_answers(blueprint: BotBlueprint) -> Dict[str, str]:
+        return {
+            normalize_question(question): answer.strip()
+            for question, answer in zip(blueprint.sample_questions, blueprint.sample_responses)
+            if normalize_question(question) and answer.strip()
+        }
+
+    def _put_locked(self, bot_id: str, answers: Dict[str, str]) -> None:
+        self._answers[bot_id] = answers
+        self._answers.move_to_end(bot_id)
+        while len(self._answers) > self._max_bots:
+            self._answers.popitem(last=False)
+
+
+def _create_cache() -> AnswerCache:
+    settings = get_settings()
+    return AnswerCache(settings.answer_cache_max_bots, prewarm=settings.answer_cache_prewarm)
+
+
+answer_cache = _create_cache()
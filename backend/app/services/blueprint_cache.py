@@ -0,0 +1,153 @@
+"""Content-addressed cache of generated blueprints, so repeated interview answers skip Gemini."""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(prompt: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class BlueprintCache:
+    """Blueprint payloads (everything but ``bot_id``) keyed by the rendered prompt and the answering model.
+
+    Entries are kept in LRU order, bounded by ``max_entries`` and dropped
+    ``ttl_seconds`` after they were generated (``0`` keeps them). A lookup
+    tries the configured models in preference order. The cache is rewritten
+    atomically to ``path`` on every store, so it survives restarts;
+    ``:memory:`` keeps it in memory only.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None,
+        *,
+        models: List[str],
+        max_entries: int,
+        ttl_seconds: float,
+    ) -> None:
+        self._path = None if not path or str(path).lower() == ":memory:" else Path(path).resolve()
+        self._models = list(models)
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0, "expired": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        if self.enabled:
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_entries > 0
+
+    def get(self, prompt: str, now: float | None = None) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Return ``(payload, model)`` for a fresh entry, or ``None``."""
+        if not self.enabled:
+            return None
+        now = time.time() if now is None else now
+        with self._lock:
+            for model in self._models:
+                key = cache_key(prompt, model)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if self._expired(entry, now):
+                    del self._entries[key]
+                    self._counters["expired"] += 1
+                    continue
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return dict(entry["payload"]), model
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, prompt: str, model: str, payload: Dict[str, Any], now: float | None = None) -> None:
+        if not self.enabled:
+            return
+        now = time.time() if now is None else now
+        key = cache_key(prompt, model)
+        with self._lock:
+            self._entries[key] = {"model": model, "created_at": now, "payload": payload}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evicted"] += 1
+            self._counters["stored"] += 1
+            self._save_locked()
+
+    def record_bypass(self) -> None:
+        """A request asked not to be served from the cache."""
+        with self._lock:
+            self._counters["bypassed"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "ttl_seconds": self._ttl,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else None,
+                **self._counters,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters = dict.fromkeys(self._counters, 0)
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return self._ttl > 0 and now - entry["created_at"] >= self._ttl
+
+    def _load(self) -> None:
+        if self._path is None or not self._path.exists():
+            return
+        try:
+            raw = json.loads(self._path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("Ignoring unreadable blueprint cache %s: %s", self._path, exc)
+            return
+        now = time.time()
+        for key, entry in raw.get("entries", []):
+            if not self._expired(entry, now):
+                self._entries[key] = entry
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _save_locked(self) -> None:
+        """Atomically replace the cache file: temp file, fsync, rename."""
+        if self._path is None:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(self._path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            json.dump({"entries": list(self._entries.items())}, handle, ensure_ascii=False)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self._path)
+
+
+def _create_cache() -> BlueprintCache:
+    settings = get_settings()
+    return BlueprintCache(
+        settings.blueprint_cache_path,
+        models=settings.preferred_models,
+        max_entries=settings.blueprint_cache_size,
+        ttl_seconds=settings.blueprint_cache_ttl_seconds,
+    )
+
+
+blueprint_cache = _create_cache()
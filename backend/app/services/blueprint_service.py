@@ -1,17 +1,25 @@
 """Business logic for generating bot blueprints via Gemini."""
 from __future__ import annotations
 
+import asyncio
+import logging
 import uuid
 from typing import Any, Dict, Optional
 
 from app.core.config import get_settings
 from app.models.bot import BotBlueprint, BotBlueprintRequest
+from app.services.answer_cache import answer_cache
+from app.services.blueprint_cache import blueprint_cache
+from app.services.deadline import Deadline
 from app.services.exceptions import AIServiceError, MissingConfigurationError
-from app.services.gemini_client import generate_with_fallback
+from app.services.gemini_client import generate_with_fallback, generate_with_fallback_async
+from app.services.knowledge_index import knowledge_index
+from app.services.playground_service import prewarm_sample_answers
 from app.services.store import store
 from app.utils.helpers import extract_json_from_text
 from app.utils.prompts import build_blueprint_prompt
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
@@ -34,11 +42,10 @@ def _parse_blueprint_payload(payload: Dict[str, Any]) -> BotBlueprint:
     )
 
 
-def create_bot_blueprint(request: BotBlueprintRequest, session_id: Optional[str] = None) -> BotBlueprint:
-    """Call Gemini to transform interview answers into a bot blueprint."""
+def _prepare_prompt(request: BotBlueprintRequest) -> str:
     _ensure_configured()
 
-    prompt = build_blueprint_prompt(
+    return build_blueprint_prompt(
         business_name=request.business_name,
         business_description=request.business_description,
         desired_bot_role=request.desired_bot_role,
@@ -47,20 +54,101 @@ def create_bot_blueprint(request: BotBlueprintRequest, session_id: Optional[str]
         preferred_language=request.preferred_language,
     )
 
+
+def _cached_blueprint(prompt: str, use_cache: bool) -> Optional[BotBlueprint]:
+    """A fresh blueprint (new ``bot_id``) built from an earlier answer to the same prompt."""
+    if not use_cache:
+        blueprint_cache.record_bypass()
+        return None
+    cached = blueprint_cache.get(prompt)
+    return None if cached is None else _parse_blueprint_payload(cached[0])
+
+
+def _cache_blueprint(prompt: str, model_name: str, blueprint: BotBlueprint) -> None:
+    blueprint_cache.put(prompt, model_name, blueprint.model_dump(exclude={"bot_id"}))
+
+
+def _blueprint_from_text(text: str) -> BotBlueprint:
     try:
-        response, _ = generate_with_fallback(prompt)
-        blueprint_dict = extract_json_from_text(response.text)
+        blueprint_dict = extract_json_from_text(text)
+    except AIServiceError:
+        raise
     except Exception as exc:  # noqa: BLE001 - want to wrap SDK errors
         raise AIServiceError(str(exc)) from exc
 
     if not isinstance(blueprint_dict, dict):
-        import sys
-        print(f"[ERROR] Gemini response is not a valid JSON object: {blueprint_dict}", file=sys.stderr)
+        logger.error("Gemini response is not a valid JSON object: %r", blueprint_dict)
         raise AIServiceError("Gemini response is not a valid JSON object")
+    return _parse_blueprint_payload(blueprint_dict)
+
+
+def _save_blueprint(
+    blueprint: BotBlueprint, session_id: Optional[str], deadline: Optional[Deadline] = None
+) -> None:
+    if deadline is not None:
+        deadline.check()
+    with store.transaction():
+        store.save_blueprint(blueprint)
+        store.reset_history_for_bot(blueprint.bot_id)
+        if session_id:
+            store.assign_session(blueprint.bot_id, session_id)
+    knowledge_index.index_blueprint(blueprint)
+    answer_cache.populate(blueprint)
+    if answer_cache.prewarm:
+        prewarm_sample_answers(blueprint)
+
+
+def create_bot_blueprint(
+    request: BotBlueprintRequest,
+    session_id: Optional[str] = None,
+    *,
+    deadline: Optional[Deadline] = None,
+    use_cache: bool = True,
+) -> BotBlueprint:
+    """Call Gemini to transform interview answers into a bot blueprint.
+
+    Answers that render the same prompt as an earlier request reuse its blueprint
+    under a new ``bot_id`` unless ``use_cache`` is off. Raises
+    ``DeadlineExceededError`` without saving anything once ``deadline`` has passed.
+    """
+    prompt = _prepare_prompt(request)
+    blueprint = _cached_blueprint(prompt, use_cache)
+
+    if blueprint is None:
+        try:
+            response, model_name = generate_with_fallback(prompt, traffic="batch", deadline=deadline)
+        except AIServiceError:
+            raise
+        except Exception as exc:  # noqa: BLE001 - want to wrap SDK errors
+            raise AIServiceError(str(exc)) from exc
+
+        blueprint = _blueprint_from_text(response.text)
+        _cache_blueprint(prompt, model_name, blueprint)
+    _save_blueprint(blueprint, session_id, deadline)
+    return blueprint
+
+
+async def create_bot_blueprint_async(
+    request: BotBlueprintRequest,
+    session_id: Optional[str] = None,
+    *,
+    deadline: Optional[Deadline] = None,
+    use_cache: bool = True,
+) -> BotBlueprint:
+    """``create_bot_blueprint`` for async routes: awaits Gemini instead of holding a worker thread."""
+    prompt = _prepare_prompt(request)
+    blueprint = _cached_blueprint(prompt, use_cache)
+
+    if blueprint is None:
+        try:
+            response, model_name = await generate_with_fallback_async(prompt, traffic="batch", deadline=deadline)
+        except AIServiceError:
+            raise
+        except Exception as exc:  # noqa: BLE001 - want to wrap SDK errors
+            raise AIServiceError(str(exc)) from exc
 
-    blueprint = _parse_blueprint_payload(blueprint_dict)
-    store.save_blueprint(blueprint)
-    store.reset_history_for_bot(blueprint.bot_id)
-    if session_id:
-        store.assign_session(blueprint.bot_id, session_id)
+        blueprint = _blueprint_from_text(response.text)
+        await asyncio.to_thread(_cache_blueprint, prompt, model_name, blueprint)
+    # Persisting may fsync; keep that off the event loop.
+    await asyncio.to_thread(_save_blueprint, blueprint, session_id, deadline)
     return blueprint
@@ -0,0 +1,203 @@
+"""Concurrency pools that keep batch Gemini traffic from starving interactive chats."""
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, Literal, Optional
+
+from app.core.config import get_settings
+from app.services.deadline import Deadline
+from app.services.exceptions import BulkheadFullError
+
+TrafficClass = Literal["interactive", "batch"]
+_HOLD_ALPHA = 0.2
+
+
+class _Waiter:
+    __slots__ = ("granted", "notify", "enqueued_at")
+
+    def __init__(self, notify: Callable[[], None]) -> None:
+        self.granted = False
+        self.notify = notify
+        self.enqueued_at = time.monotonic()
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class Bulkhead:
+    """At most ``max_concurrent`` calls at once, with a bounded FIFO of waiters.
+
+    A caller is turned away up front when the queue is full or when the
+    projected wait (queue position times the average time a slot is held,
+    spread over the pool) exceeds ``max_wait_seconds``, and after waiting that
+    long without a slot. A caller with a request deadline waits no longer than
+    the time it has left and then gets ``DeadlineExceededError``. Works for
+    threads and coroutines alike: a released slot is handed directly to the
+    oldest waiter.
+    """
+
+    def __init__(self, name: str, *, max_concurrent: int, max_queue: int, max_wait_seconds: float) -> None:
+        self.name = name
+        self._limit = max_concurrent
+        self._max_queue = max_queue
+        self._max_wait = max_wait_seconds
+        self._active = 0
+        self._queue: Deque[_Waiter] = deque()
+        self._hold_ewma = 0.0
+        self._wait_ewma = 0.0
+        self._counters = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0, "deadline_exceeded": 0}
+        self._lock = threading.Lock()
+
+    def check(self) -> None:
+        """Raise ``BulkheadFullError`` if a call arriving now would be rejected."""
+        with self._lock:
+            self._check_locked()
+
+    @contextmanager
+    def slot(self, deadline: Optional[Deadline] = None) -> Iterator[None]:
+        event = threading.Event()
+        with self._lock:
+            waiter = self._enter_locked(event.set)
+        if waiter is not None:
+            event.wait(self._wait_limit(deadline))
+            self._finish_wait(waiter, deadline)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    @asynccontextmanager
+    async def slot_async(self, deadline: Optional[Deadline] = None) -> AsyncIterator[None]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            waiter = self._enter_locked(lambda: loop.call_soon_threadsafe(_resolve, future))
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout=self._wait_limit(deadline))
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter.granted:
+                        self._release_locked(None)
+                    else:
+                        self._queue.remove(waiter)
+                raise
+            self._finish_wait(waiter, deadline)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrent": self._limit,
+                "in_flight": self._active,
+                "queue_depth": len(self._queue),
+                "max_queue": self._max_queue,
+                "avg_wait_ms": round(self._wait_ewma * 1000, 1),
+                "avg_hold_ms": round(self._hold_ewma * 1000, 1),
+                "projected_wait_ms": round(self._projected_wait_locked() * 1000, 1),
+                **self._counters,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hold_ewma = self._wait_ewma = 0.0
+            self._counters = dict.fromkeys(self._counters, 0)
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _wait_limit(self, deadline: Optional[Deadline]) -> float:
+        return self._max_wait if deadline is None else min(self._max_wait, deadline.remaining())
+
+    def _projected_wait_locked(self) -> float:
+        return (len(self._queue) + 1) * self._hold_ewma / self._limit if self._active >= self._limit else 0.0
+
+    def _check_locked(self) -> None:
+        if self._active < self._limit and not self._queue:
+            return
+        projected = self._projected_wait_locked()
+        if len(self._queue) >= self._max_queue or projected > self._max_wait:
+            self._counters["rejected"] += 1
+            raise BulkheadFullError(
+                f"Too many pending {self.name} Gemini requests; try again shortly",
+                retry_after=max(1, math.ceil(projected)),
+            )
+
+    def _enter_locked(self, notify: Callable[[], None]) -> _Waiter | None:
+        """Take a free slot (returns ``None``) or join the queue (returns the waiter)."""
+        self._check_locked()
+        self._counters["admitted"] += 1
+        if self._active < self._limit and not self._queue:
+            self._active += 1
+            return None
+        waiter = _Waiter(notify)
+        self._queue.append(waiter)
+        self._counters["queued"] += 1
+        return waiter
+
+    def _finish_wait(self, waiter: _Waiter, deadline: Optional[Deadline] = None) -> None:
+        with self._lock:
+            waited = time.monotonic() - waiter.enqueued_at
+            self._wait_ewma += _HOLD_ALPHA * (waited - self._wait_ewma)
+            if waiter.granted:
+                return
+            self._queue.remove(waiter)
+            # The wait was cut short by the request deadline rather than by ``max_wait``.
+            out_of_time = deadline is not None and deadline.expires_at <= waiter.enqueued_at + self._max_wait
+            self._counters["deadline_exceeded" if out_of_time else "timed_out"] += 1
+            retry_after = max(1, math.ceil(self._projected_wait_locked()))
+        if out_of_time:
+            raise deadline.exceeded()
+        raise BulkheadFullError(
+            f"Timed out waiting for a {self.name} Gemini slot; try again shortly", retry_after=retry_after
+        )
+
+    def _release(self, held: float) -> None:
+        with self._lock:
+            self._release_locked(held)
+
+    def _release_locked(self, held: float | None) -> None:
+        if held is not None:
+            self._hold_ewma += _HOLD_ALPHA * (held - self._hold_ewma)
+        if self._queue:
+            # Hand the slot straight to the oldest waiter; ``_active`` stays the same.
+            waiter = self._queue.popleft()
+            waiter.granted = True
+            waiter.notify()
+        else:
+            self._active -= 1
+
+
+def _create_bulkheads() -> Dict[TrafficClass, Bulkhead]:
+    settings = get_settings()
+    return {
+        "interactive": Bulkhead(
+            "interactive",
+            max_concurrent=settings.gemini_interactive_concurrency,
+            max_queue=settings.gemini_interactive_queue,
+            max_wait_seconds=settings.gemini_queue_deadline_seconds,
+        ),
+        "batch": Bulkhead(
+            "batch",
+            max_concurrent=settings.gemini_batch_concurrency,
+            max_queue=settings.gemini_batch_queue,
+            max_wait_seconds=settings.gemini_queue_deadline_seconds,
+        ),
+    }
+
+
+bulkheads = _create_bulkheads()
@@ -0,0 +1,39 @@
+"""Request deadlines threaded from the HTTP layer down to each Gemini attempt."""
+from __future__ import annotations
+
+import time
+
+from app.core.config import get_settings
+from app.services.exceptions import DeadlineExceededError
+
+
+class Deadline:
+    """The monotonic time by which a request has to be answered."""
+
+    __slots__ = ("timeout", "expires_at")
+
+    def __init__(self, timeout: float, now: float | None = None) -> None:
+        self.timeout = timeout
+        self.expires_at = (time.monotonic() if now is None else now) + timeout
+
+    @classmethod
+    def from_header(cls, timeout: float | None) -> "Deadline":
+        """``X-Request-Timeout`` seconds capped at ``REQUEST_TIMEOUT_MAX``, else ``REQUEST_TIMEOUT``."""
+        settings = get_settings()
+        if timeout is None:
+            return cls(settings.request_timeout_seconds)
+        return cls(min(timeout, settings.request_timeout_max_seconds))
+
+    def remaining(self, now: float | None = None) -> float:
+        return max(0.0, self.expires_at - (time.monotonic() if now is None else now))
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def exceeded(self) -> DeadlineExceededError:
+        return DeadlineExceededError(f"Request deadline of {self.timeout:g}s exceeded")
+
+    def check(self) -> None:
+        if self.expired:
+            raise self.exceeded()
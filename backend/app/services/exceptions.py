@@ -11,3 +11,27 @@ class BlueprintNotFoundError(AIServiceError):
 
 class MissingConfigurationError(AIServiceError):
     """Raised when required environment variables are missing."""
+
+
+class ModelsUnavailableError(AIServiceError):
+    """Raised when every configured Gemini model is cooling down after quota errors."""
+
+
+class DeadlineExceededError(AIServiceError):
+    """Raised when a request's deadline passed before Gemini answered."""
+
+
+class ServiceOverloadedError(AIServiceError):
+    """Raised when a request is turned away locally; ``retry_after`` is a hint in seconds."""
+
+    def __init__(self, message: str, *, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BulkheadFullError(ServiceOverloadedError):
+    """Raised when a Gemini concurrency pool cannot take the request within its queue deadline."""
+
+
+class RateLimitedError(ServiceOverloadedError):
+    """Raised when every available Gemini model is out of its configured RPM/TPM budget."""
@@ -0,0 +1,97 @@
+"""Time-based expiry helpers shared by the store engines."""
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+from typing import Callable, Dict, Generic, Hashable, Iterator, List, Set, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+
+
+class ExpiryIndex(Generic[K]):
+    """Min-heap of deadlines keyed by last activity.
+
+    Touching a key only updates its timestamp; the heap keeps at most one entry
+    per key and an entry that surfaces early is pushed back with its real
+    deadline. A sweep therefore costs O(expired + rescheduled), never a scan.
+    """
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self._ttl = ttl_seconds
+        self._heap: List[Tuple[float, K]] = []
+        self._scheduled: Set[K] = set()
+        self._last_seen: Dict[K, float] = {}
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    def touch(self, key: K, now: float) -> None:
+        self._last_seen[key] = now
+        if key not in self._scheduled:
+            self._scheduled.add(key)
+            heapq.heappush(self._heap, (now + self._ttl, key))
+
+    def discard(self, key: K) -> None:
+        # The heap entry goes stale and is dropped when it surfaces.
+        self._last_seen.pop(key, None)
+
+    def last_seen(self, key: K) -> float | None:
+        return self._last_seen.get(key)
+
+    def pop_expired(self, now: float) -> List[K]:
+        expired: List[K] = []
+        while self._heap and self._heap[0][0] <= now:
+            _, key = heapq.heappop(self._heap)
+            seen = self._last_seen.get(key)
+            if seen is None:
+                self._scheduled.discard(key)
+                continue
+            if seen + self._ttl > now:
+                heapq.heappush(self._heap, (seen + self._ttl, key))
+                continue
+            self._scheduled.discard(key)
+            del self._last_seen[key]
+            expired.append(key)
+        return expired
+
+    def items(self) -> Iterator[Tuple[K, float]]:
+        return iter(list(self._last_seen.items()))
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._scheduled.clear()
+        self._last_seen.clear()
+
+    def __len__(self) -> int:
+        return len(self._last_seen)
+
+
+class Sweeper:
+    """Daemon thread that calls ``sweep`` every ``interval`` seconds until stopped."""
+
+    def __init__(self, sweep: Callable[[], int], interval: float, *, name: str = "store-sweeper") -> None:
+        self._sweep = sweep
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> "Sweeper":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            try:
+                removed = self._sweep()
+            except Exception:  # noqa: BLE001 - keep sweeping on the next tick
+                logger.exception("Store expiry sweep failed")
+                continue
+            if removed:
+                logger.info("Store expiry sweep removed %d entries", removed)
@@ -1,15 +1,33 @@
 """Shared Gemini client helpers with fallback logic across models."""
 from __future__ import annotations
 
+import asyncio
+import math
 import os
 import logging
-from typing import Any, List, Optional, Tuple
+import time
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, List, Optional, Tuple
 
+import httpx
 from google import genai
 from google.api_core import exceptions as google_exceptions
+from google.genai import errors as genai_errors
 
 from app.core.config import get_settings
-from app.services.exceptions import MissingConfigurationError
+from app.services.exceptions import (
+    MissingConfigurationError,
+    ModelsUnavailableError,
+    RateLimitedError,
+)
+from app.services.bulkhead import TrafficClass, bulkheads
+from app.services.deadline import Deadline
+from app.services.hedging import hedge_policy
+from app.services.model_health import health_registry
+from app.services.model_router import model_router
+from app.services.rate_limits import rate_limiter
+from app.services.retry_policy import retry_policy
+from app.services.single_flight import content_key, single_flight
+from app.utils.tokens import estimate_tokens
 
 # _DEFAULT_CA_PATH = "/etc/ssl/certs/ca-certificates.crt"
 # for var in ("REQUESTS_CA_BUNDLE", "SSL_CERT_FILE", "GRPC_DEFAULT_SSL_ROOTS_FILE_PATH"):
@@ -19,6 +37,15 @@ settings = get_settings()
 _client: Optional[genai.Client] = None
 logger = logging.getLogger(__name__)
 
+# Upstream hiccups worth retrying on the same model: 5xx, deadline exceeded, dropped connections.
+_TRANSIENT_ERRORS = (
+    google_exceptions.ServerError,
+    genai_errors.ServerError,
+    httpx.TransportError,
+    ConnectionError,
+    TimeoutError,
+)
+
 
 def _ensure_client() -> genai.Client:
     global _client
@@ -43,26 +70,432 @@ def _is_retryable(exc: Exception) -> bool:
     return "RESOURCE_EXHAUSTED" in message or "QUOTA" in message or "429" in message
 
 
-def generate_with_fallback(contents: Any) -> Tuple[genai.types.GenerateContentResponse, str]:
-    """Try each preferred model until one succeeds; raises last error otherwise."""
+def _is_transient(exc: Exception) -> bool:
+    if isinstance(exc, google_exceptions.MethodNotImplemented):
+        return False
+    if isinstance(exc, _TRANSIENT_ERRORS):
+        return True
+    message = str(exc).upper()
+    return "UNAVAILABLE" in message or "DEADLINE_EXCEEDED" in message
+
+
+def _used_tokens(response: Any) -> Optional[int]:
+    total = getattr(getattr(response, "usage_metadata", None), "total_token_count", None)
+    return total if isinstance(total, int) else None
+
+
+def _sync_options(timeout: Optional[float]) -> Dict[str, Any]:
+    """Extra ``generate_content`` arguments bounding a blocking call to ``timeout`` seconds."""
+    if timeout is None:
+        return {}
+    http_options = genai.types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+    return {"config": genai.types.GenerateContentConfig(http_options=http_options)}
+
+
+def _log_failure(model_name: str, exc: Exception) -> None:
+    logger.warning(
+        "Gemini call failed for model %s (%s): %s",
+        model_name,
+        exc.__class__.__name__,
+        exc,
+    )
+
+
+class _Dispatch:
+    """Per-request bookkeeping shared by the sync, async and streaming fallback loops.
+
+    Orders the candidates through the router, skips models with an open
+    breaker or an exhausted RPM/TPM budget, stops once the request deadline
+    passed and feeds every outcome back into the breaker, the rate limiter,
+    the latency averages and the request's routing trace.
+    """
+
+    def __init__(self, contents: Any, deadline: Optional[Deadline] = None) -> None:
+        self.created = time.monotonic()
+        self.deadline = deadline
+        self.trace = model_router.plan(_model_candidates())
+        self.tokens = estimate_tokens(contents) if rate_limiter.enabled else 0
+        self.last_exc: Optional[Exception] = None
+        self.skipped: List[str] = []
+        self.rate_limited: List[str] = []
+        self._started: Dict[str, float] = {}
+        self._attempts: Dict[str, int] = {}
+
+    def models(self) -> Iterator[Tuple[str, float]]:
+        """Yield ``(model, delay)``; the caller sleeps ``delay`` seconds before calling the model.
+
+        Models that are out of budget are passed over first. Once every other
+        candidate has been tried, the one whose budget frees up soonest is
+        waited for, as long as the total wait stays within the limiter's
+        ``max_wait`` and the request deadline.
+        """
+        for model_name in self.trace.order:
+            if self.out_of_time():
+                return
+            if not health_registry.allow(model_name):
+                self.skipped.append(model_name)
+                self.trace.record(model_name, "breaker_open")
+                continue
+            if rate_limiter.acquire(model_name, self.tokens) is None:
+                health_registry.release_probe(model_name)
+                self.rate_limited.append(model_name)
+                self.trace.record(model_name, "rate_limited")
+                continue
+            yield self._begin(model_name, 0.0)
+
+        waited = 0.0
+        deferred = list(self.rate_limited)
+        while deferred:
+            model_name = min(deferred, key=lambda name: rate_limiter.wait_time(name, self.tokens))
+            deferred.remove(model_name)
+            max_wait = rate_limiter.max_wait - waited
+            if self.deadline is not None:
+                max_wait = min(max_wait, self.deadline.remaining())
+            if rate_limiter.wait_time(model_name, self.tokens) > max_wait:
+                return  # the soonest budget is too far away; the rest are further still
+            if not health_registry.allow(model_name):
+                continue
+            delay = rate_limiter.acquire(model_name, self.tokens, max_wait=max_wait)
+            if delay is None:
+                health_registry.release_probe(model_name)
+                continue
+            self.rate_limited.remove(model_name)
+            waited += delay
+            yield self._begin(model_name, delay)
+
+    def out_of_time(self) -> bool:
+        return self.deadline is not None and self.deadline.expired
+
+    def attempt_timeout(self) -> Optional[float]:
+        """Time left for the attempt about to be sent; ``None`` without a deadline."""
+        return None if self.deadline is None else self.deadline.remaining()
+
+    def _begin(self, model_name: str, delay: float) -> Tuple[str, float]:
+        # Latency is measured from when the call is actually sent, after the wait.
+        self._started[model_name] = time.perf_counter() + delay
+        return model_name, delay
+
+    def retry_delay(self, model_name: str, exc: Exception) -> Optional[float]:
+        """Backoff before calling ``model_name`` again after a transient error; ``None`` to move on.
+
+        A retry reuses the attempt's rate-limit reservation.
+        """
+        if not _is_transient(exc):
+            return None
+        attempt = self._attempts.get(model_name, 1)
+        elapsed = time.monotonic() - self.created
+        budget = None if self.deadline is None else elapsed + self.deadline.remaining()
+        delay = retry_policy.backoff(attempt, elapsed, budget)
+        if delay is None:
+            return None
+        self._attempts[model_name] = attempt + 1
+        latency = time.perf_counter() - self._started[model_name]
+        self._started[model_name] = time.perf_counter() + delay
+        _log_failure(model_name, exc)
+        model_router.observe(model_name, latency, ok=False)
+        self.trace.record(model_name, "retry", latency)
+        return delay
+
+    def settle(self, model_name: str, response: Any) -> None:
+        """Charge the model's token budget with the usage Gemini reported for ``response``."""
+        used = _used_tokens(response)
+        if used is not None:
+            rate_limiter.settle(model_name, self.tokens, used)
+
+    def succeeded(self, model_name: str, response: Any = None) -> None:
+        latency = time.perf_counter() - self._started.pop(model_name)
+        if response is not None:
+            self.settle(model_name, response)
+        if self._attempts.get(model_name, 1) > 1:
+            retry_policy.record_recovery()
+        health_registry.record_success(model_name)
+        model_router.observe(model_name, latency, ok=True)
+        self.trace.record(model_name, "ok", latency)
+        model_router.finish(self.trace)
+        logger.info("Gemini call succeeded with model %s", model_name)
+
+    def failed(self, model_name: str, exc: Exception) -> bool:
+        """Log and record the failure; returns whether to fall back to the next model."""
+        latency = time.perf_counter() - self._started.pop(model_name)
+        self.last_exc = exc
+        # A rejected call consumed no tokens; its request still counts towards RPM.
+        rate_limiter.settle(model_name, self.tokens, 0)
+        _log_failure(model_name, exc)
+        if self.out_of_time():
+            # Cut short by the request deadline; that says nothing about the model.
+            health_registry.release_probe(model_name)
+            self.trace.record(model_name, "deadline", latency)
+            return True
+        if _is_retryable(exc):
+            health_registry.record_quota_error(model_name)
+            model_router.observe(model_name, latency, ok=False)
+            self.trace.record(model_name, "quota", latency)
+            return True
+        if _is_transient(exc):
+            # Retries on this model are used up; another model may still answer.
+            health_registry.release_probe(model_name)
+            model_router.observe(model_name, latency, ok=False)
+            self.trace.record(model_name, "transient", latency)
+            return True
+        # Not the model's fault (e.g. a bad request): leave its averages alone.
+        health_registry.release_probe(model_name)
+        self.trace.record(model_name, "error", latency)
+        model_router.finish(self.trace)
+        return False
+
+    def cancelled(self, model_name: str) -> None:
+        """An attempt that lost a hedge race; it says nothing about the model's health."""
+        latency = time.perf_counter() - self._started.pop(model_name)
+        health_registry.release_probe(model_name)
+        self.trace.record(model_name, "cancelled", latency)
+
+    def exhausted(self) -> Exception:
+        model_router.finish(self.trace)
+        if self.out_of_time():
+            return self.deadline.exceeded()
+        if self.last_exc:
+            return self.last_exc
+        if self.rate_limited:
+            wait = min(rate_limiter.wait_time(model_name, self.tokens) for model_name in self.rate_limited)
+            return RateLimitedError(
+                f"All available Gemini models are over their request budget: {', '.join(self.rate_limited)}",
+                retry_after=max(1, math.ceil(wait)),
+            )
+        if self.skipped:
+            return ModelsUnavailableError(
+                f"All Gemini models are cooling down after quota errors: {', '.join(self.skipped)}"
+            )
+        return MissingConfigurationError("Unable to select a Gemini model.")
+
+
+def generate_with_fallback(
+    contents: Any, *, traffic: TrafficClass = "interactive", deadline: Optional[Deadline] = None
+) -> Tuple[genai.types.GenerateContentResponse, str]:
+    """Try each preferred model until one succeeds; raises last error otherwise.
+
+    Models whose circuit breaker is open after a recent quota error are skipped,
+    as are models over their RPM/TPM budget unless it frees up within
+    ``GEMINI_RATE_LIMIT_MAX_WAIT_MS``. Transient errors (5xx, deadline exceeded,
+    dropped connections) are retried on the same model with jittered backoff
+    before falling back. With a ``deadline`` every attempt is bounded by the
+    time left and ``DeadlineExceededError`` is raised once it is spent. The call
+    holds a slot in the ``traffic`` bulkhead for its whole duration. Identical
+    calls made while one is in flight share its outcome (``GEMINI_COALESCE``).
+    """
     client = _ensure_client()
-    last_exc: Optional[Exception] = None
+    if deadline is not None:
+        deadline.check()
+
+    def call() -> Tuple[genai.types.GenerateContentResponse, str]:
+        with bulkheads[traffic].slot(deadline):
+            return _generate(client, contents, deadline)
+
+    return single_flight.do(content_key(contents, traffic), call, deadline)
 
-    for model_name in _model_candidates():
-        try:
-            response = client.models.generate_content(model=model_name, contents=contents)
-            logger.info("Gemini call succeeded with model %s", model_name)
+
+def _generate(
+    client: genai.Client, contents: Any, deadline: Optional[Deadline]
+) -> Tuple[genai.types.GenerateContentResponse, str]:
+    dispatch = _Dispatch(contents, deadline)
+
+    for model_name, delay in dispatch.models():
+        while delay is not None:
+            if delay:
+                time.sleep(delay)
+            try:
+                response = client.models.generate_content(
+                    model=model_name, contents=contents, **_sync_options(dispatch.attempt_timeout())
+                )
+            except Exception as exc:  # noqa: BLE001 - passthrough to retry/fallback logic
+                delay = dispatch.retry_delay(model_name, exc)
+                if delay is None and not dispatch.failed(model_name, exc):
+                    raise
+                continue
+            dispatch.succeeded(model_name, response)
             return response, model_name
-        except Exception as exc:  # pragma: no cover - passthrough to fallback logic
-            last_exc = exc
-            logger.warning(
-                "Gemini call failed for model %s (%s): %s",
-                model_name,
-                exc.__class__.__name__,
-                exc,
-            )
-            if not _is_retryable(exc):
-                raise
-    if last_exc:
-        raise last_exc
-    raise MissingConfigurationError("Unable to select a Gemini model.")
+    raise dispatch.exhausted()
+
+
+async def generate_with_fallback_async(
+    contents: Any, *, traffic: TrafficClass = "interactive", deadline: Optional[Deadline] = None
+) -> Tuple[genai.types.GenerateContentResponse, str]:
+    """Non-blocking ``generate_with_fallback`` on the SDK's asyncio client (``client.aio``).
+
+    The event loop keeps serving other requests while Gemini answers, so concurrency is
+    no longer bounded by the threadpool that sync routes run in.
+    """
+    client = _ensure_client()
+    if deadline is not None:
+        deadline.check()
+
+    async def call() -> Tuple[genai.types.GenerateContentResponse, str]:
+        async with bulkheads[traffic].slot_async(deadline):
+            return await _generate_async(client, contents, deadline)
+
+    return await single_flight.do_async(content_key(contents, traffic), call, deadline)
+
+
+async def _attempt(dispatch: _Dispatch, call: Awaitable[Any]) -> Any:
+    """Await one Gemini call, cancelling it when the request deadline passes."""
+    return await asyncio.wait_for(call, timeout=dispatch.attempt_timeout())
+
+
+async def _generate_async(
+    client: genai.Client, contents: Any, deadline: Optional[Deadline]
+) -> Tuple[genai.types.GenerateContentResponse, str]:
+    dispatch = _Dispatch(contents, deadline)
+    if hedge_policy.enabled:
+        return await _generate_hedged(client, contents, dispatch)
+
+    for model_name, delay in dispatch.models():
+        while delay is not None:
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                response = await _attempt(
+                    dispatch, client.aio.models.generate_content(model=model_name, contents=contents)
+                )
+            except Exception as exc:  # noqa: BLE001 - passthrough to retry/fallback logic
+                delay = dispatch.retry_delay(model_name, exc)
+                if delay is None and not dispatch.failed(model_name, exc):
+                    raise
+                continue
+            dispatch.succeeded(model_name, response)
+            return response, model_name
+    raise dispatch.exhausted()
+
+
+async def _generate_hedged(
+    client: genai.Client, contents: Any, dispatch: _Dispatch
+) -> Tuple[genai.types.GenerateContentResponse, str]:
+    """Fallback loop that may race the next model against a slow primary.
+
+    Once the in-flight call has run past ``GEMINI_HEDGE_PERCENTILE`` of its
+    model's observed latency, the same request goes to the next candidate (at
+    most once per request, within the hedge budget). The first success wins
+    and the other call is cancelled; failures fall back as usual.
+    """
+    hedge_policy.on_request()
+    models = dispatch.models()
+    in_flight: Dict[asyncio.Future, str] = {}
+    hedge: Optional[asyncio.Future] = None
+    hedge_considered = False
+
+    async def call(model_name: str, delay: float) -> genai.types.GenerateContentResponse:
+        if delay:
+            await asyncio.sleep(delay)
+        return await _attempt(dispatch, client.aio.models.generate_content(model=model_name, contents=contents))
+
+    def launch(retry: Optional[Tuple[str, float]] = None) -> Optional[asyncio.Future]:
+        candidate = retry or next(models, None)
+        if candidate is None:
+            return None
+        task = asyncio.ensure_future(call(*candidate))
+        in_flight[task] = candidate[0]
+        return task
+
+    try:
+        launch()
+        while in_flight:
+            timeout = None
+            if not hedge_considered and len(in_flight) == 1:
+                (model_name,) = in_flight.values()
+                timeout = model_router.latency_percentile(model_name, hedge_policy.percentile)
+            done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                hedge_considered = True
+                if hedge_policy.try_acquire():
+                    hedge = launch()
+                    if hedge is None:
+                        hedge_policy.refund()  # no other candidate left to race against
+                continue
+            for task in done:
+                model_name = in_flight.pop(task)
+                exc = task.exception()
+                if exc is None:
+                    dispatch.succeeded(model_name, task.result())
+                    if task is hedge:
+                        hedge_policy.record_win()
+                    return task.result(), model_name
+                delay = dispatch.retry_delay(model_name, exc)
+                if delay is not None:
+                    launch((model_name, delay))
+                elif not dispatch.failed(model_name, exc):
+                    raise exc
+            if not in_flight:
+                launch()
+        raise dispatch.exhausted()
+    finally:
+        for task, model_name in in_flight.items():
+            if not task.cancel() and not task.cancelled():
+                task.exception()  # finished alongside the winner; mark its error as retrieved
+            dispatch.cancelled(model_name)
+
+
+async def stream_with_fallback(
+    contents: Any, *, traffic: TrafficClass = "interactive", deadline: Optional[Deadline] = None
+) -> AsyncIterator[str]:
+    """Yield reply text chunks as Gemini streams them.
+
+    Retrying or falling back to the next model is only possible until the
+    first chunk arrived; a failure after that is raised to the consumer mid-stream. The
+    latency fed to routing is the time to the first chunk, which is also what
+    ``deadline`` bounds. The bulkhead slot is held until the stream ends.
+    """
+    client = _ensure_client()
+    if deadline is not None:
+        deadline.check()
+    async with bulkheads[traffic].slot_async(deadline):
+        async for chunk in _stream(client, contents, deadline):
+            yield chunk
+
+
+async def _stream(client: genai.Client, contents: Any, deadline: Optional[Deadline]) -> AsyncIterator[str]:
+    dispatch = _Dispatch(contents, deadline)
+
+    async def first_chunk(model_name: str) -> Tuple[AsyncIterator[Any], Any]:
+        stream = await client.aio.models.generate_content_stream(model=model_name, contents=contents)
+        return stream, await anext(stream)
+
+    for model_name, delay in dispatch.models():
+        while delay is not None:
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                stream, first = await _attempt(dispatch, first_chunk(model_name))
+                break
+            except StopAsyncIteration:
+                dispatch.succeeded(model_name)
+                return
+            except Exception as exc:  # noqa: BLE001 - passthrough to retry/fallback logic
+                delay = dispatch.retry_delay(model_name, exc)
+                if delay is None and not dispatch.failed(model_name, exc):
+                    raise
+        if delay is None:
+            continue
+
+        dispatch.succeeded(model_name)
+        last = first
+        if first.text:
+            yield first.text
+        async for chunk in stream:
+            last = chunk
+            if chunk.text:
+                yield chunk.text
+        # Usage metadata arrives with the final chunk.
+        dispatch.settle(model_name, last)
+        return
+    raise dispatch.exhausted()
+
+
+def stats() -> Dict[str, Any]:
+    """Routing state for ``GET /metrics``."""
+    return {
+        "breakers": health_registry.snapshot(),
+        "routing": model_router.snapshot(),
+        "hedging": hedge_policy.snapshot(),
+        "bulkheads": {name: bulkhead.snapshot() for name, bulkhead in bulkheads.items()},
+        "rate_limits": rate_limiter.snapshot(),
+        "retries": retry_policy.snapshot(),
+        "coalescing": single_flight.snapshot(),
+    }
@@ -0,0 +1,77 @@
+"""Budget for hedged Gemini requests."""
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict
+
+from app.core.config import get_settings
+
+# Unused hedge credit that may pile up during quiet periods and be spent in one burst.
+_MAX_CREDIT = 10.0
+
+
+class HedgePolicy:
+    """Decides whether a slow request may be duplicated to the next model.
+
+    A request is hedged once its primary model has been running longer than
+    the model's ``percentile`` latency. Every request earns ``max_fraction`` of
+    a hedge and every hedge spends one, so over time at most that fraction of
+    traffic is sent twice.
+    """
+
+    def __init__(self, percentile: float, max_fraction: float) -> None:
+        self.percentile = percentile
+        self.max_fraction = max_fraction
+        self._credit = 0.0
+        self._counters = {"requests": 0, "hedged": 0, "hedge_wins": 0, "denied": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.percentile > 0 and self.max_fraction > 0
+
+    def on_request(self) -> None:
+        with self._lock:
+            self._counters["requests"] += 1
+            self._credit = min(_MAX_CREDIT, self._credit + self.max_fraction)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._credit < 1.0:
+                self._counters["denied"] += 1
+                return False
+            self._credit -= 1.0
+            self._counters["hedged"] += 1
+            return True
+
+    def refund(self) -> None:
+        """Give back a hedge acquired for a request that had no other model to send it to."""
+        with self._lock:
+            self._credit = min(_MAX_CREDIT, self._credit + 1.0)
+            self._counters["hedged"] -= 1
+
+    def record_win(self) -> None:
+        with self._lock:
+            self._counters["hedge_wins"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "percentile": self.percentile,
+                "max_fraction": self.max_fraction,
+                "credit": round(self._credit, 3),
+                **self._counters,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._credit = 0.0
+            self._counters = dict.fromkeys(self._counters, 0)
+
+
+def _create_policy() -> HedgePolicy:
+    settings = get_settings()
+    return HedgePolicy(settings.gemini_hedge_percentile, settings.gemini_hedge_max_fraction)
+
+
+hedge_policy = _create_policy()
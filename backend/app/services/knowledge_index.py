@@ -0,0 +1,180 @@
+"""Per-bot BM25 index over ``knowledge_base`` entries, so each turn only carries the relevant ones."""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Tuple
+
+from app.core.config import get_settings
+from app.models.bot import BotBlueprint, ChatTurn
+from app.services.answer_cache import normalize_question
+from app.utils.tokens import estimate_text_tokens
+
+K1 = 1.5
+B = 0.75
+# Besides the latest message, the newest turns also say what the user is asking about.
+HISTORY_QUERY_TURNS = 4
+
+
+def tokenize(text: str) -> List[str]:
+    return normalize_question(text).split()
+
+
+class BM25Index:
+    """Inverted index over one bot's knowledge entries; entries are added and removed in place."""
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._docs: Dict[int, Tuple[str, int]] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, text: str) -> None:
+        if text in self._ids:
+            return
+        doc_id = self._ids[text] = self._next_id
+        self._next_id += 1
+        terms = tokenize(text)
+        self._docs[doc_id] = (text, len(terms))
+        self._total_length += len(terms)
+        for term in terms:
+            postings = self._postings.setdefault(term, {})
+            postings[doc_id] = postings.get(doc_id, 0) + 1
+
+    def remove(self, text: str) -> None:
+        doc_id = self._ids.pop(text, None)
+        if doc_id is None:
+            return
+        _, length = self._docs.pop(doc_id)
+        self._total_length -= length
+        for term in set(tokenize(text)):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def sync(self, entries: Iterable[str]) -> None:
+        """Make the index hold exactly ``entries``, touching only what changed."""
+        wanted = {entry for entry in entries if entry.strip()}
+        for text in set(self._ids) - wanted:
+            self.remove(text)
+        for text in wanted - set(self._ids):
+            self.add(text)
+
+    def search(self, query: Iterable[str], top_k: int) -> List[Tuple[str, float]]:
+        """The ``top_k`` entries sharing a term with ``query``, best first."""
+        if not self._docs or top_k <= 0:
+            return []
+        count = len(self._docs)
+        average_length = self._total_length / count or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(query):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                length = self._docs[doc_id][1]
+                norm = frequency + K1 * (1 - B + B * length / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (K1 + 1) / norm
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+        return [(self._docs[doc_id][0], score) for doc_id, score in ranked]
+
+
+class KnowledgeIndex:
+    """BM25 indexes for up to ``max_bots`` bots, least recently used first out.
+
+    A bot is indexed when its blueprint is saved, or on its first turn when
+    missing (e.g. after a restart). ``select`` keeps at most ``top_k``
+    entries and stops adding them once ``max_tokens`` would be exceeded.
+    """
+
+    def __init__(self, *, top_k: int, max_tokens: int, max_bots: int) -> None:
+        self.top_k = top_k
+        self.max_tokens = max_tokens
+        self._max_bots = max_bots
+        self._indexes: "OrderedDict[str, BM25Index]" = OrderedDict()
+        self._counters = {"lookups": 0, "selected": 0, "skipped_for_budget": 0}
+        self._lookup_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.top_k > 0 and self.max_tokens > 0 and self._max_bots > 0
+
+    def index_blueprint(self, blueprint: BotBlueprint) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._index_locked(blueprint)
+
+    def select(self, blueprint: BotBlueprint, user_message: str, turns: Iterable[ChatTurn] = ()) -> List[str]:
+        """Knowledge entries relevant to the latest message and the newest turns, best first."""
+        if not self.enabled or not blueprint.knowledge_base:
+            return []
+        started = time.perf_counter()
+        query = tokenize(user_message)
+        for turn in list(turns)[-HISTORY_QUERY_TURNS:]:
+            query.extend(tokenize(turn.content))
+        with self._lock:
+            ranked = self._index_locked(blueprint).search(query, self.top_k)
+            selected: List[str] = []
+            budget = self.max_tokens
+            for text, _ in ranked:
+                tokens = estimate_text_tokens(text)
+                if tokens > budget:
+                    self._counters["skipped_for_budget"] += 1
+                    continue
+                selected.append(text)
+                budget -= tokens
+            self._counters["lookups"] += 1
+            self._counters["selected"] += len(selected)
+            self._lookup_seconds += time.perf_counter() - started
+            return selected
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["lookups"]
+            return {
+                "enabled": self.enabled,
+                "top_k": self.top_k,
+                "max_tokens": self.max_tokens,
+                "bots": len(self._indexes),
+                "entries": sum(len(index) for index in self._indexes.values()),
+                "avg_lookup_ms": round(self._lookup_seconds / lookups * 1000, 3) if lookups else None,
+                **self._counters,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self._counters = dict.fromkeys(self._counters, 0)
+            self._lookup_seconds = 0.0
+
+    def _index_locked(self, blueprint: BotBlueprint) -> BM25Index:
+        index = self._indexes.get(blueprint.bot_id)
+        if index is None:
+            index = self._indexes[blueprint.bot_id] = BM25Index()
+        index.sync(blueprint.knowledge_base)
+        self._indexes.move_to_end(blueprint.bot_id)
+        while len(self._indexes) > self._max_bots:
+            self._indexes.popitem(last=False)
+        return index
+
+
+def _create_index() -> KnowledgeIndex:
+    settings = get_settings()
+    return KnowledgeIndex(
+        top_k=settings.knowledge_top_k,
+        max_tokens=settings.knowledge_max_tokens,
+        max_bots=settings.knowledge_index_max_bots,
+    )
+
+
+knowledge_index = _create_index()
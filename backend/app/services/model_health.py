@@ -0,0 +1,120 @@
+"""Per-model circuit breakers for the Gemini fallback chain."""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Literal
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+BreakerState = Literal["closed", "open", "half_open"]
+_MAX_TRANSITIONS = 100
+
+
+@dataclass
+class _Breaker:
+    state: BreakerState = "closed"
+    opened_at: float = 0.0
+    probe_started_at: float | None = None
+    failures: int = 0
+    trips: int = 0
+
+
+class ModelHealthRegistry:
+    """Tracks which models recently ran out of quota.
+
+    A quota error opens the model's breaker: the model is skipped for
+    ``cooldown_seconds``. After that one request is let through as a half-open
+    probe; success closes the breaker, another quota error re-opens it. A probe
+    that never reports back is replaced after another cooldown.
+    """
+
+    def __init__(self, cooldown_seconds: float) -> None:
+        self._cooldown = cooldown_seconds
+        self._breakers: Dict[str, _Breaker] = {}
+        self._transitions: Deque[Dict[str, Any]] = deque(maxlen=_MAX_TRANSITIONS)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._cooldown > 0
+
+    def allow(self, model: str, now: float | None = None) -> bool:
+        """Whether a request may be sent to ``model`` now; may claim the half-open probe."""
+        if not self.enabled:
+            return True
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is None or breaker.state == "closed":
+                return True
+            if breaker.state == "open":
+                if now - breaker.opened_at < self._cooldown:
+                    return False
+                self._transition(model, breaker, "half_open")
+            elif breaker.probe_started_at is not None and now - breaker.probe_started_at < self._cooldown:
+                return False
+            breaker.probe_started_at = now
+            return True
+
+    def record_success(self, model: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is not None and breaker.state != "closed":
+                self._transition(model, breaker, "closed")
+
+    def record_quota_error(self, model: str, now: float | None = None) -> None:
+        if not self.enabled:
+            return
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            breaker = self._breakers.setdefault(model, _Breaker())
+            breaker.failures += 1
+            breaker.opened_at = now
+            if breaker.state != "open":
+                breaker.trips += 1
+                self._transition(model, breaker, "open")
+
+    def release_probe(self, model: str) -> None:
+        """Give back a half-open probe that ended without a verdict on quota (e.g. a bad request)."""
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is not None and breaker.state == "half_open":
+                breaker.probe_started_at = None
+
+    def state(self, model: str) -> BreakerState:
+        breaker = self._breakers.get(model)
+        return breaker.state if breaker is not None else "closed"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cooldown_seconds": self._cooldown,
+                "models": {
+                    model: {"state": breaker.state, "failures": breaker.failures, "trips": breaker.trips}
+                    for model, breaker in self._breakers.items()
+                },
+                "transitions": list(self._transitions),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._breakers.clear()
+            self._transitions.clear()
+
+    def _transition(self, model: str, breaker: _Breaker, state: BreakerState) -> None:
+        logger.info("Gemini model %s breaker %s -> %s", model, breaker.state, state)
+        self._transitions.append({"model": model, "from": breaker.state, "to": state, "at": time.time()})
+        breaker.state = state
+        if state != "half_open":
+            breaker.probe_started_at = None
+
+
+health_registry = ModelHealthRegistry(get_settings().gemini_breaker_cooldown_seconds)
@@ -0,0 +1,182 @@
+"""Latency/error-aware ordering of Gemini model candidates."""
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Literal
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+RoutingMode = Literal["static", "adaptive"]
+_MAX_TRACES = 50
+# Observations older than this no longer describe the model; it is re-explored like a new one.
+_STALE_AFTER_SECONDS = 300.0
+# Keeps a model that failed every recent call finite (and last) instead of dividing by zero.
+_MIN_SUCCESS_RATE = 0.05
+# Successful-call latencies kept per model for percentile estimates.
+_LATENCY_WINDOW = 200
+_MIN_PERCENTILE_SAMPLES = 20
+
+
+@dataclass
+class _ModelStats:
+    latency_ewma: float | None = None
+    error_ewma: float = 0.0
+    samples: int = 0
+    last_seen: float = 0.0
+    recent: Deque[float] = field(default_factory=lambda: deque(maxlen=_LATENCY_WINDOW))
+
+
+@dataclass
+class RoutingTrace:
+    """What one request saw: the scored candidates, each attempt and the model that answered."""
+
+    request_id: int
+    mode: RoutingMode
+    order: List[str]
+    candidates: List[Dict[str, Any]]
+    attempts: List[Dict[str, Any]] = field(default_factory=list)
+    chosen: str | None = None
+
+    def record(self, model: str, outcome: str, latency: float | None = None) -> None:
+        attempt: Dict[str, Any] = {"model": model, "outcome": outcome}
+        if latency is not None:
+            attempt["latency_ms"] = round(latency * 1000, 1)
+        self.attempts.append(attempt)
+        if outcome == "ok":
+            self.chosen = model
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "mode": self.mode,
+            "order": list(self.order),
+            "candidates": list(self.candidates),
+            "attempts": list(self.attempts),
+            "chosen": self.chosen,
+        }
+
+
+class ModelRouter:
+    """Keeps an EWMA of latency and error rate per model and ranks candidates by it.
+
+    In ``adaptive`` mode candidates are ordered by expected latency, i.e. the
+    latency EWMA divided by the success rate and by the model's preference
+    weight. Models without recent observations sort first so they get measured.
+    ``static`` mode keeps the configured order but still collects the averages.
+    Only configured models are ever returned, so ``GEMINI_MODELS`` stays the
+    allowed set.
+    """
+
+    def __init__(self, mode: RoutingMode, *, alpha: float, weights: Dict[str, float] | None = None) -> None:
+        self._mode: RoutingMode = mode
+        self._alpha = alpha
+        self._weights = dict(weights or {})
+        self._stats: Dict[str, _ModelStats] = {}
+        self._traces: Deque[RoutingTrace] = deque(maxlen=_MAX_TRACES)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def mode(self) -> RoutingMode:
+        return self._mode
+
+    def plan(self, models: List[str], now: float | None = None) -> RoutingTrace:
+        """Order ``models`` for one request and open its decision trace."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            candidates = [self._describe(model, position, now) for position, model in enumerate(models)]
+        if self._mode == "adaptive":
+            candidates.sort(key=lambda item: (item["tier"], item["score"] or 0.0, item["position"]))
+        return RoutingTrace(
+            request_id=next(self._ids),
+            mode=self._mode,
+            order=[item["model"] for item in candidates],
+            candidates=candidates,
+        )
+
+    def observe(self, model: str, latency: float, ok: bool, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            stats = self._stats.setdefault(model, _ModelStats())
+            if now - stats.last_seen > _STALE_AFTER_SECONDS:
+                stats.latency_ewma, stats.error_ewma, stats.samples = None, 0.0, 0
+                stats.recent.clear()
+            if ok:
+                # Failures often return fast; only successful calls say how long an answer takes.
+                previous = stats.latency_ewma
+                stats.latency_ewma = latency if previous is None else self._ewma(previous, latency)
+                stats.recent.append(latency)
+            stats.error_ewma = self._ewma(stats.error_ewma, 0.0 if ok else 1.0) if stats.samples else float(not ok)
+            stats.samples += 1
+            stats.last_seen = now
+
+    def latency_percentile(self, model: str, percentile: float) -> float | None:
+        """Observed successful-call latency at ``percentile`` (0-100); ``None`` until enough samples."""
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None or len(stats.recent) < _MIN_PERCENTILE_SAMPLES:
+                return None
+            ordered = sorted(stats.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    def finish(self, trace: RoutingTrace) -> None:
+        self._traces.append(trace)
+        logger.debug("Gemini routing decision: %s", trace.as_dict())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {
+                model: {
+                    "latency_ms": None if stats.latency_ewma is None else round(stats.latency_ewma * 1000, 1),
+                    "error_rate": round(stats.error_ewma, 4),
+                    "samples": stats.samples,
+                    "weight": self._weights.get(model, 1.0),
+                }
+                for model, stats in self._stats.items()
+            }
+        return {"mode": self._mode, "models": models, "recent": [trace.as_dict() for trace in self._traces]}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._traces.clear()
+
+    def _ewma(self, current: float, sample: float) -> float:
+        return current + self._alpha * (sample - current)
+
+    def _describe(self, model: str, position: int, now: float) -> Dict[str, Any]:
+        # Tiers: 0 = not measured recently (explore first), 1 = measured, 2 = only failures seen.
+        weight = self._weights.get(model, 1.0)
+        stats = self._stats.get(model)
+        latency = error_rate = score = None
+        if stats is None or now - stats.last_seen > _STALE_AFTER_SECONDS:
+            tier = 0
+        elif stats.latency_ewma is None:
+            tier, error_rate = 2, stats.error_ewma
+        else:
+            tier, latency, error_rate = 1, stats.latency_ewma, stats.error_ewma
+            score = round(latency / max(1.0 - error_rate, _MIN_SUCCESS_RATE) / weight, 4)
+        return {
+            "model": model,
+            "position": position,
+            "tier": tier,
+            "score": score,
+            "latency_ms": None if latency is None else round(latency * 1000, 1),
+            "error_rate": None if error_rate is None else round(error_rate, 4),
+            "weight": weight,
+        }
+
+
+def _create_router() -> ModelRouter:
+    settings = get_settings()
+    return ModelRouter(settings.gemini_routing, alpha=settings.gemini_routing_alpha, weights=settings.model_weights)
+
+
+model_router = _create_router()
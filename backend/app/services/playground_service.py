@@ -1,13 +1,25 @@
 """Service powering the live Playground chat flow."""
 from __future__ import annotations
 
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, NamedTuple, Optional
+
 from app.core.config import get_settings
-from app.models.bot import ChatTurn
+from app.models.bot import BotBlueprint, ChatTurn
+from app.services.answer_cache import answer_cache
+from app.services.bulkhead import bulkheads
+from app.services.deadline import Deadline
 from app.services.exceptions import AIServiceError, BlueprintNotFoundError, MissingConfigurationError
-from app.services.gemini_client import generate_with_fallback
+from app.services.gemini_client import generate_with_fallback, generate_with_fallback_async, stream_with_fallback
+from app.services.knowledge_index import knowledge_index
+from app.services.prompt_budget import prompt_budget
+from app.services.semantic_cache import semantic_cache
 from app.services.store import store
 from app.utils.prompts import build_playground_prompt
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
@@ -16,8 +28,13 @@ def _ensure_configured() -> None:
         raise MissingConfigurationError("Gemini API key missing. Set GEMINI_API_KEY in the environment.")
 
 
-def chat_with_bot(bot_id: str, session_id: str, user_message: str) -> str:
-    """Send the Playground message through Gemini and persist history."""
+class _Turn(NamedTuple):
+    prompt: str
+    opens_session: bool
+    cached_reply: Optional[str]
+
+
+def _prepare_prompt(bot_id: str, session_id: str, user_message: str) -> _Turn:
     _ensure_configured()
 
     blueprint = store.get_blueprint(bot_id)
@@ -25,18 +42,152 @@ def chat_with_bot(bot_id: str, session_id: str, user_message: str) -> str:
         raise BlueprintNotFoundError(f"Bot with id {bot_id} was not found")
 
     turns = store.get_history(bot_id, session_id)
-    prompt = build_playground_prompt(blueprint, turns, user_message)
+    if not turns:
+        # Only opening messages are cached: later replies depend on the conversation so far.
+        cached = answer_cache.lookup(blueprint, user_message) or semantic_cache.lookup(bot_id, user_message)
+        if cached is not None:
+            return _Turn("", True, cached)
+
+    knowledge = knowledge_index.select(blueprint, user_message, turns)
+    window = prompt_budget.window(blueprint, turns, user_message, knowledge)
+    prompt = build_playground_prompt(blueprint, window, user_message, knowledge)
+    prompt_budget.record(bot_id, prompt, len(turns), len(window))
+    return _Turn(prompt, not turns, None)
+
+
+def _reply_text(response: Any) -> str:
+    reply = (response.text or "").strip()
+    if not reply:
+        raise AIServiceError("Gemini returned an empty response")
+    return reply
+
+
+def _remember_reply(bot_id: str, turn: _Turn, user_message: str, reply: str) -> None:
+    if turn.opens_session:
+        semantic_cache.store(bot_id, user_message, reply)
+
+
+def _record_exchange(
+    bot_id: str, session_id: str, user_message: str, reply: str, deadline: Optional[Deadline] = None
+) -> None:
+    # A reply that arrives after the client gave up is dropped rather than stored.
+    if deadline is not None:
+        deadline.check()
+    with store.transaction():
+        store.append_turn(bot_id, session_id, ChatTurn(role="user", content=user_message))
+        store.append_turn(bot_id, session_id, ChatTurn(role="assistant", content=reply))
+
+
+def chat_with_bot(
+    bot_id: str, session_id: str, user_message: str, *, deadline: Optional[Deadline] = None
+) -> str:
+    """Send the Playground message through Gemini and persist history.
+
+    A first message matching one of the bot's sample questions, or close enough to
+    an earlier first message (``semantic_cache``), is answered without calling
+    Gemini. Raises ``DeadlineExceededError`` without touching the history once
+    ``deadline`` has passed.
+    """
+    turn = _prepare_prompt(bot_id, session_id, user_message)
+    reply = turn.cached_reply
+
+    if reply is None:
+        try:
+            response, _ = generate_with_fallback(turn.prompt, deadline=deadline)
+        except AIServiceError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            raise AIServiceError(str(exc)) from exc
 
+        reply = _reply_text(response)
+        _remember_reply(bot_id, turn, user_message, reply)
+    _record_exchange(bot_id, session_id, user_message, reply, deadline)
+    return reply
+
+
+async def chat_with_bot_async(
+    bot_id: str, session_id: str, user_message: str, *, deadline: Optional[Deadline] = None
+) -> str:
+    """``chat_with_bot`` for async routes: awaits Gemini instead of holding a worker thread."""
+    # Store reads may take a file lock, reload the file or spill sessions; keep them off the event loop.
+    turn = await asyncio.to_thread(_prepare_prompt, bot_id, session_id, user_message)
+    reply = turn.cached_reply
+
+    if reply is None:
+        try:
+            response, _ = await generate_with_fallback_async(turn.prompt, deadline=deadline)
+        except AIServiceError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            raise AIServiceError(str(exc)) from exc
+
+        reply = _reply_text(response)
+        _remember_reply(bot_id, turn, user_message, reply)
+    # Persisting may fsync; keep that off the event loop.
+    await asyncio.to_thread(_record_exchange, bot_id, session_id, user_message, reply, deadline)
+    return reply
+
+
+async def stream_chat_with_bot(
+    bot_id: str, session_id: str, user_message: str, *, deadline: Optional[Deadline] = None
+) -> AsyncIterator[str]:
+    """Validate the request, then return an iterator over the reply chunks as Gemini streams them.
+
+    Configuration, lookup and overload errors raise here, before any byte is sent. The turns are
+    stored only once the whole reply arrived, so a stream that fails or is abandoned
+    partway leaves the history untouched. ``deadline`` bounds the wait for the first chunk.
+    A cached answer is sent as a single chunk.
+    """
+    turn = await asyncio.to_thread(_prepare_prompt, bot_id, session_id, user_message)
+    if turn.cached_reply is not None:
+        return _cached_reply(bot_id, session_id, user_message, turn.cached_reply)
+    bulkheads["interactive"].check()
+    return _stream_reply(bot_id, session_id, user_message, turn, deadline)
+
+
+async def _cached_reply(bot_id: str, session_id: str, user_message: str, reply: str) -> AsyncIterator[str]:
+    yield reply
+    await asyncio.to_thread(_record_exchange, bot_id, session_id, user_message, reply)
+
+
+async def _stream_reply(
+    bot_id: str, session_id: str, user_message: str, turn: _Turn, deadline: Optional[Deadline]
+) -> AsyncIterator[str]:
+    parts = []
     try:
-        response, _ = generate_with_fallback(prompt)
-        reply = (response.text or "").strip()
+        async for chunk in stream_with_fallback(turn.prompt, deadline=deadline):
+            parts.append(chunk)
+            yield chunk
+    except AIServiceError:
+        raise
     except Exception as exc:  # noqa: BLE001
         raise AIServiceError(str(exc)) from exc
 
+    reply = "".join(parts).strip()
     if not reply:
         raise AIServiceError("Gemini returned an empty response")
+    _remember_reply(bot_id, turn, user_message, reply)
+    await asyncio.to_thread(_record_exchange, bot_id, session_id, user_message, reply)
 
-    store.append_turn(bot_id, session_id, ChatTurn(role="user", content=user_message))
-    store.append_turn(bot_id, session_id, ChatTurn(role="assistant", content=reply))
 
-    return reply
+def prewarm_sample_answers(blueprint: BotBlueprint) -> threading.Thread:
+    """Replace the bot's cached sample answers with Gemini's own, in a background thread.
+
+    Runs as batch traffic; a question that fails keeps its blueprint answer.
+    """
+
+    def _run() -> None:
+        for question in blueprint.sample_questions:
+            try:
+                prompt = build_playground_prompt(blueprint, [], question, knowledge_index.select(blueprint, question))
+                response, _ = generate_with_fallback(prompt, traffic="batch")
+                reply = _reply_text(response)
+            except Exception as exc:  # noqa: BLE001 - best effort
+                logger.warning("Skipping pre-warm of %r for bot %s: %s", question, blueprint.bot_id, exc)
+                continue
+            if not answer_cache.store(blueprint.bot_id, question, reply):
+                return  # evicted meanwhile
+
+    thread = threading.Thread(target=_run, name=f"prewarm-{blueprint.bot_id}", daemon=True)
+    thread.start()
+    return thread
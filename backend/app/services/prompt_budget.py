@@ -0,0 +1,69 @@
+"""Token budget for Playground prompts, and the size of the prompts actually sent."""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Dict, List, Sequence
+
+from app.core.config import get_settings
+from app.models.bot import BotBlueprint, ChatTurn
+from app.utils.prompts import window_turns
+from app.utils.tokens import estimate_text_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class PromptBudget:
+    """Fits a conversation's history into ``max_tokens`` and keeps per-request prompt statistics."""
+
+    def __init__(self, max_tokens: int) -> None:
+        self.max_tokens = max_tokens
+        self._counters = {
+            "requests": 0,
+            "truncated": 0,
+            "turns_dropped": 0,
+            "over_budget": 0,
+            "prompt_tokens": 0,
+            "max_prompt_tokens": 0,
+        }
+        self._lock = threading.Lock()
+
+    def window(
+        self,
+        bot: BotBlueprint,
+        turns: Sequence[ChatTurn],
+        user_message: str,
+        knowledge: Sequence[str] = (),
+    ) -> List[ChatTurn]:
+        return window_turns(bot, turns, user_message, knowledge, self.max_tokens)
+
+    def record(self, bot_id: str, prompt: str, turns: int, kept: int) -> int:
+        """Account for one prompt built from ``kept`` of ``turns`` stored turns; returns its estimated size."""
+        tokens = estimate_text_tokens(prompt)
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters["prompt_tokens"] += tokens
+            self._counters["max_prompt_tokens"] = max(self._counters["max_prompt_tokens"], tokens)
+            if kept < turns:
+                self._counters["truncated"] += 1
+                self._counters["turns_dropped"] += turns - kept
+            if self.max_tokens and tokens > self.max_tokens:
+                self._counters["over_budget"] += 1
+        logger.debug("Playground prompt for bot %s: ~%d tokens, %d of %d turns", bot_id, tokens, kept, turns)
+        return tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self._counters["requests"]
+            return {
+                "max_tokens": self.max_tokens,
+                "avg_prompt_tokens": round(self._counters["prompt_tokens"] / requests, 1) if requests else None,
+                **self._counters,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters = dict.fromkeys(self._counters, 0)
+
+
+prompt_budget = PromptBudget(get_settings().prompt_max_tokens)
@@ -0,0 +1,191 @@
+"""Client-side per-model request and token budgets (RPM/TPM) for Gemini."""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from app.core.config import get_settings
+
+# Key in ``GEMINI_RPM_LIMITS`` / ``GEMINI_TPM_LIMITS`` that applies to every model not listed by name.
+DEFAULT_KEY = "*"
+
+
+class TokenBucket:
+    """Refills continuously at ``per_minute / 60`` units per second, up to ``per_minute``.
+
+    ``take`` may overdraw the bucket: a caller that decided to wait for budget
+    reserves it up front and the debt is paid off by later refills, so callers
+    that arrive meanwhile queue up behind it instead of jumping ahead.
+    """
+
+    def __init__(self, per_minute: float, now: float) -> None:
+        self.capacity = per_minute
+        self._rate = per_minute / 60.0
+        self._level = per_minute
+        self._updated = now
+
+    def level(self, now: float) -> float:
+        self._level = min(self.capacity, self._level + max(0.0, now - self._updated) * self._rate)
+        self._updated = max(self._updated, now)
+        return self._level
+
+    def wait_time(self, amount: float, now: float) -> float:
+        # A request larger than the whole bucket only needs a full one, otherwise it could never run.
+        missing = min(amount, self.capacity) - self.level(now)
+        return max(0.0, missing / self._rate)
+
+    def take(self, amount: float, now: float) -> None:
+        self.level(now)
+        self._level -= amount
+
+    def give_back(self, amount: float) -> None:
+        self._level = min(self.capacity, self._level + amount)
+
+
+@dataclass
+class _ModelBudget:
+    requests: Optional[TokenBucket]
+    tokens: Optional[TokenBucket]
+    admitted: int = 0
+    waited: int = 0
+    throttled: int = 0
+    wait_seconds: float = 0.0
+
+
+class ModelRateLimiter:
+    """Keeps each model under its configured requests and tokens per minute.
+
+    Requests reserve one request and their estimated prompt tokens before they
+    are sent; ``settle`` corrects the token reservation with the usage Gemini
+    reports. Models without a limit (and no ``*`` default) are never throttled.
+    """
+
+    def __init__(
+        self,
+        rpm: Dict[str, float] | None = None,
+        tpm: Dict[str, float] | None = None,
+        *,
+        max_wait_seconds: float = 0.0,
+    ) -> None:
+        self._rpm = dict(rpm or {})
+        self._tpm = dict(tpm or {})
+        self._max_wait = max_wait_seconds
+        self._budgets: Dict[str, _ModelBudget] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._rpm or self._tpm)
+
+    @property
+    def max_wait(self) -> float:
+        """Longest a request may wait for budget instead of moving on."""
+        return self._max_wait
+
+    def wait_time(self, model: str, tokens: int, now: float | None = None) -> float:
+        """Seconds until ``model`` has budget for one request of ``tokens`` tokens."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            budget = self._budget_locked(model, now)
+            return 0.0 if budget is None else self._wait_locked(budget, tokens, now)
+
+    def acquire(self, model: str, tokens: int, *, max_wait: float = 0.0, now: float | None = None) -> float | None:
+        """Reserve budget for one call; returns the delay to honour first, or ``None`` if over ``max_wait``."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            budget = self._budget_locked(model, now)
+            if budget is None:
+                return 0.0
+            delay = self._wait_locked(budget, tokens, now)
+            if delay > max_wait:
+                budget.throttled += 1
+                return None
+            for bucket, amount in ((budget.requests, 1), (budget.tokens, tokens)):
+                if bucket is not None:
+                    bucket.take(amount, now)
+            budget.admitted += 1
+            if delay:
+                budget.waited += 1
+                budget.wait_seconds += delay
+            return delay
+
+    def settle(self, model: str, reserved: int, actual: int) -> None:
+        """Replace a call's estimated token reservation with what it actually used."""
+        with self._lock:
+            budget = self._budgets.get(model)
+            if budget is not None and budget.tokens is not None:
+                budget.tokens.give_back(reserved - actual)
+
+    def remaining(self, model: str, now: float | None = None) -> Dict[str, Any]:
+        """Budget currently left for ``model`` (``None`` where no limit applies)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            budget = self._budget_locked(model, now)
+            return self._describe_locked(budget, now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            models = {model: self._describe_locked(budget, now) for model, budget in self._budgets.items()}
+        return {
+            "rpm_limits": dict(self._rpm),
+            "tpm_limits": dict(self._tpm),
+            "max_wait_ms": round(self._max_wait * 1000, 1),
+            "models": models,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._budgets.clear()
+
+    def _budget_locked(self, model: str, now: float) -> _ModelBudget | None:
+        budget = self._budgets.get(model)
+        if budget is None:
+            rpm = self._rpm.get(model, self._rpm.get(DEFAULT_KEY))
+            tpm = self._tpm.get(model, self._tpm.get(DEFAULT_KEY))
+            if rpm is None and tpm is None:
+                return None
+            budget = self._budgets[model] = _ModelBudget(
+                requests=None if rpm is None else TokenBucket(rpm, now),
+                tokens=None if tpm is None else TokenBucket(tpm, now),
+            )
+        return budget
+
+    @staticmethod
+    def _wait_locked(budget: _ModelBudget, tokens: int, now: float) -> float:
+        waits = [0.0]
+        if budget.requests is not None:
+            waits.append(budget.requests.wait_time(1, now))
+        if budget.tokens is not None:
+            waits.append(budget.tokens.wait_time(tokens, now))
+        return max(waits)
+
+    @staticmethod
+    def _describe_locked(budget: _ModelBudget | None, now: float) -> Dict[str, Any]:
+        if budget is None:
+            return {"requests_remaining": None, "tokens_remaining": None}
+        requests, tokens = budget.requests, budget.tokens
+        return {
+            "rpm": None if requests is None else requests.capacity,
+            "requests_remaining": None if requests is None else max(0, int(requests.level(now))),
+            "tpm": None if tokens is None else tokens.capacity,
+            "tokens_remaining": None if tokens is None else max(0, int(tokens.level(now))),
+            "admitted": budget.admitted,
+            "waited": budget.waited,
+            "throttled": budget.throttled,
+            "wait_ms_total": round(budget.wait_seconds * 1000, 1),
+        }
+
+
+def _create_rate_limiter() -> ModelRateLimiter:
+    settings = get_settings()
+    return ModelRateLimiter(
+        settings.rpm_limits,
+        settings.tpm_limits,
+        max_wait_seconds=settings.gemini_rate_limit_max_wait_ms / 1000,
+    )
+
+
+rate_limiter = _create_rate_limiter()
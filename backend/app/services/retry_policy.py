@@ -0,0 +1,84 @@
+"""Backoff policy for retrying transient Gemini errors on the same model."""
+from __future__ import annotations
+
+import random
+import threading
+from typing import Any, Callable, Dict
+
+from app.core.config import get_settings
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter, bounded by attempts and a time budget.
+
+    Before attempt ``n + 1`` the caller waits a uniformly random time between
+    zero and ``min(max_delay, base_delay * 2 ** (n - 1))``. No retry is
+    scheduled once ``max_attempts`` calls were made or when the wait would end
+    past ``budget_seconds`` after the request started.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int,
+        *,
+        base_delay: float,
+        max_delay: float,
+        budget_seconds: float,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_seconds = budget_seconds
+        self._rng = rng
+        self._counters = {"retries": 0, "recovered": 0, "attempts_exhausted": 0, "budget_exhausted": 0}
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt: int, elapsed: float, budget: float | None = None) -> float | None:
+        """Delay before retrying after failed attempt ``attempt`` (1-based); ``None`` to give up.
+
+        ``budget`` tightens ``budget_seconds`` for a request with a shorter deadline of its own.
+        """
+        budget = self.budget_seconds if budget is None else min(budget, self.budget_seconds)
+        with self._lock:
+            if attempt >= self.max_attempts:
+                self._counters["attempts_exhausted"] += 1
+                return None
+            delay = self._rng() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+            if elapsed + delay >= budget:
+                self._counters["budget_exhausted"] += 1
+                return None
+            self._counters["retries"] += 1
+            return delay
+
+    def record_recovery(self) -> None:
+        """A request succeeded on a model after retrying it."""
+        with self._lock:
+            self._counters["recovered"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_attempts": self.max_attempts,
+                "base_delay_ms": round(self.base_delay * 1000, 1),
+                "max_delay_ms": round(self.max_delay * 1000, 1),
+                "budget_seconds": self.budget_seconds,
+                **self._counters,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters = dict.fromkeys(self._counters, 0)
+
+
+def _create_policy() -> RetryPolicy:
+    settings = get_settings()
+    return RetryPolicy(
+        settings.gemini_retry_attempts,
+        base_delay=settings.gemini_retry_base_ms / 1000,
+        max_delay=settings.gemini_retry_max_ms / 1000,
+        budget_seconds=settings.gemini_retry_budget_seconds,
+    )
+
+
+retry_policy = _create_policy()
@@ -0,0 +1,133 @@
+"""Per-bot cache of first-turn replies, matched by local character n-gram similarity."""
+from __future__ import annotations
+
+import math
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.answer_cache import normalize_question
+
+NGRAM = 3
+DIMENSIONS = 1 << 18
+
+Vector = Dict[int, float]
+
+
+def embed(text: str) -> Vector:
+    """Unit-length sparse vector of the hashed character trigrams of the normalized text."""
+    padded = f" {normalize_question(text)} "
+    counts: Dict[int, float] = {}
+    for start in range(max(len(padded) - NGRAM + 1, 0)):
+        feature = zlib.crc32(padded[start:start + NGRAM].encode("utf-8")) % DIMENSIONS
+        counts[feature] = counts.get(feature, 0.0) + 1.0
+    norm = math.sqrt(sum(value * value for value in counts.values()))
+    return {feature: value / norm for feature, value in counts.items()} if norm else {}
+
+
+def cosine(query: Vector, other: Vector) -> float:
+    if len(other) < len(query):
+        query, other = other, query
+    return sum(value * other.get(feature, 0.0) for feature, value in query.items())
+
+
+class SemanticCache:
+    """Replies to earlier first-turn questions, served again for questions that are nearly the same.
+
+    Questions are embedded locally (no network) and compared by cosine
+    similarity against every question cached for the bot; the best match at
+    or above ``threshold`` wins. Each bot keeps its ``max_entries`` most
+    recently used questions and at most ``max_bots`` bots are kept, least
+    recently used first out.
+    """
+
+    def __init__(self, enabled: bool, *, threshold: float, max_entries: int, max_bots: int) -> None:
+        self.enabled = enabled and max_entries > 0 and max_bots > 0
+        self.threshold = threshold
+        self._max_entries = max_entries
+        self._max_bots = max_bots
+        self._bots: "OrderedDict[str, OrderedDict[str, Tuple[Vector, str]]]" = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._lookup_seconds = 0.0
+        self._max_lookup_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def lookup(self, bot_id: str, message: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        query = embed(message)
+        with self._lock:
+            entries = self._bots.get(bot_id)
+            best: Optional[str] = None
+            best_score = self.threshold
+            if entries and query:
+                for key, (vector, _) in entries.items():
+                    score = cosine(query, vector)
+                    if score >= best_score:
+                        best, best_score = key, score
+            if best is not None:
+                entries.move_to_end(best)
+                self._bots.move_to_end(bot_id)
+            self._counters["hits" if best is not None else "misses"] += 1
+            elapsed = time.perf_counter() - started
+            self._lookup_seconds += elapsed
+            self._max_lookup_seconds = max(self._max_lookup_seconds, elapsed)
+            return None if best is None else entries[best][1]
+
+    def store(self, bot_id: str, message: str, reply: str) -> None:
+        key = normalize_question(message)
+        if not self.enabled or not key:
+            return
+        vector = embed(message)
+        with self._lock:
+            entries = self._bots.get(bot_id)
+            if entries is None:
+                entries = self._bots[bot_id] = OrderedDict()
+            self._bots.move_to_end(bot_id)
+            entries[key] = (vector, reply)
+            entries.move_to_end(key)
+            self._counters["stored"] += 1
+            while len(entries) > self._max_entries:
+                entries.popitem(last=False)
+                self._counters["evicted"] += 1
+            while len(self._bots) > self._max_bots:
+                _, dropped = self._bots.popitem(last=False)
+                self._counters["evicted"] += len(dropped)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "bots": len(self._bots),
+                "entries": sum(len(entries) for entries in self._bots.values()),
+                "max_entries_per_bot": self._max_entries,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else None,
+                "avg_lookup_ms": round(self._lookup_seconds / lookups * 1000, 3) if lookups else None,
+                "max_lookup_ms": round(self._max_lookup_seconds * 1000, 3),
+                **self._counters,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bots.clear()
+            self._counters = dict.fromkeys(self._counters, 0)
+            self._lookup_seconds = self._max_lookup_seconds = 0.0
+
+
+def _create_cache() -> SemanticCache:
+    settings = get_settings()
+    return SemanticCache(
+        settings.semantic_cache_enabled,
+        threshold=settings.semantic_cache_threshold,
+        max_entries=settings.semantic_cache_size,
+        max_bots=settings.semantic_cache_max_bots,
+    )
+
+
+semantic_cache = _create_cache()
@@ -0,0 +1,174 @@
+"""Cross-process variant of ``JsonStore`` for running several uvicorn/gunicorn workers."""
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+try:  # POSIX only; Windows development setups keep using the single-process store.
+    import fcntl
+except ImportError:  # pragma: no cover - exercised on Windows only
+    fcntl = None  # type: ignore[assignment]
+
+from app.models.bot import BotBlueprint, ChatTurn
+from app.services.store import JsonStore
+
+_VERSION_WIDTH = 20
+
+
+class SharedJsonStore(JsonStore):
+    """``JsonStore`` whose files can be shared by several processes.
+
+    Every operation runs under an ``flock`` on ``<STORE_PATH>.lock`` (shared for
+    reads, exclusive for writes). The lock file also holds a version counter that
+    writers bump; a process reloads its in-memory copy from disk whenever the
+    counter moved since it last looked; read-only operations and writes that
+    change nothing leave it alone. Writes are always persisted before the lock
+    is released, so the ``batch``/``none`` durability levels do not apply.
+    """
+
+    def __init__(self, storage_path: str | Path | None = None, **options: Any) -> None:
+        if fcntl is None:
+            raise RuntimeError("STORE_SHARED requires POSIX file locking (fcntl)")
+        options["durability"] = "always"
+        self._lock_fd: int | None = None
+        self._lock_depth = 0
+        self._lock_exclusive = False
+        # The initial load ran without the file lock, so the first operation always reloads.
+        self._seen_version = -1
+        self._swept_version = -1
+        self._changed = False
+        super().__init__(storage_path, **options)
+        if self._path is None:
+            raise ValueError("STORE_SHARED needs a file-backed STORE_PATH")
+
+    def _remove_orphaned_spill_files(self) -> int:
+        # Other workers may hold spilled sessions that no snapshot references yet;
+        # ``_acquire_file_lock`` sweeps under the exclusive lock instead.
+        return 0
+
+    def _commit_locked(self, op: str, **fields: Any) -> None:
+        super()._commit_locked(op, **fields)
+        self._changed = True
+
+    @property
+    def _lock_path(self) -> Path:
+        assert self._path is not None
+        return self._path.with_name(self._path.name + ".lock")
+
+    # ------------------------------------------------------------------
+    # Cross-process coordination
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _shared(self, *, exclusive: bool) -> Iterator[None]:
+        with self._lock:
+            if self._lock_depth == 0:
+                self._acquire_file_lock(exclusive)
+            elif exclusive and not self._lock_exclusive:
+                raise RuntimeError("Cannot upgrade a shared store lock to exclusive")
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    self._release_file_lock()
+
+    def _acquire_file_lock(self, exclusive: bool) -> None:
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._lock_fd = fd
+        self._lock_exclusive = exclusive
+        version = self._read_version(fd)
+        if version != self._seen_version:
+            if self._journal is not None:
+                # Another process may have rotated the journal under our append handle.
+                self._journal.close()
+            self._reset_state_locked()
+            self._load()
+            self._seen_version = version
+        if exclusive and version != self._swept_version:
+            # No other worker can spill right now and our copy is the latest one, so every
+            # unreferenced spill file is garbage. Removing any makes the others reload.
+            if super()._remove_orphaned_spill_files():
+                self._changed = True
+            self._swept_version = version
+
+    def _release_file_lock(self) -> None:
+        fd = self._lock_fd
+        assert fd is not None
+        try:
+            if self._lock_exclusive and self._changed:
+                self._changed = False
+                version = self._read_version(fd) + 1
+                if self._swept_version == self._seen_version:
+                    # Our own writes leave no orphans behind; no need to sweep again.
+                    self._swept_version = version
+                self._seen_version = version
+                os.pwrite(fd, str(self._seen_version).rjust(_VERSION_WIDTH).encode("ascii"), 0)
+        finally:
+            self._lock_fd = None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    @staticmethod
+    def _read_version(fd: int) -> int:
+        raw = os.pread(fd, _VERSION_WIDTH, 0).strip()
+        return int(raw) if raw else 0
+
+    # ------------------------------------------------------------------
+    # JsonStore API
+    # ------------------------------------------------------------------
+    def save_blueprint(self, blueprint: BotBlueprint) -> None:
+        with self._shared(exclusive=True):
+            super().save_blueprint(blueprint)
+
+    def get_blueprint(self, bot_id: str) -> BotBlueprint | None:
+        with self._shared(exclusive=False):
+            return super().get_blueprint(bot_id)
+
+    def assign_session(self, bot_id: str, session_id: str) -> None:
+        with self._shared(exclusive=True):
+            super().assign_session(bot_id, session_id)
+
+    def get_session_state(self, session_id: str) -> tuple[BotBlueprint | None, Sequence[ChatTurn]]:
+        with self._shared(exclusive=False):
+            return super().get_session_state(session_id)
+
+    def reset_history_for_bot(self, bot_id: str) -> None:
+        with self._shared(exclusive=True):
+            super().reset_history_for_bot(bot_id)
+
+    def append_turn(self, bot_id: str, session_id: str, turn: ChatTurn) -> None:
+        with self._shared(exclusive=True):
+            super().append_turn(bot_id, session_id, turn)
+
+    def get_history(self, bot_id: str, session_id: str) -> Sequence[ChatTurn]:
+        with self._shared(exclusive=False):
+            return super().get_history(bot_id, session_id)
+
+    @contextmanager
+    def transaction(self) -> Iterator["SharedJsonStore"]:
+        with self._shared(exclusive=True), super().transaction():
+            yield self
+
+    def expire(self, now: float | None = None) -> int:
+        with self._shared(exclusive=True):
+            return super().expire(now)
+
+    def compact(self) -> None:
+        with self._shared(exclusive=True):
+            super().compact()
+            if self._journal is not None:
+                # Other workers must drop their append handle on the rotated journal.
+                self._changed = True
+
+    def clear(self) -> None:
+        with self._shared(exclusive=True):
+            super().clear()
+            self._changed = True
@@ -0,0 +1,171 @@
+"""Coalescing of identical Gemini requests that are in flight at the same time."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.core.config import get_settings
+from app.services.deadline import Deadline
+from app.services.exceptions import DeadlineExceededError
+
+T = TypeVar("T")
+
+
+def content_key(contents: Any, *scope: str) -> str:
+    """Stable hash of a request's contents; the model is deliberately left out."""
+    payload = json.dumps([scope, contents], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class _AsyncFlight:
+    __slots__ = ("task", "waiters", "followers")
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+        self.followers = 0
+
+
+class SingleFlight:
+    """Runs one call per key at a time and hands its outcome to everyone who asked meanwhile.
+
+    The first caller for a key leads; identical calls that arrive before it
+    finished wait for the same result, or the same exception. Each waiter
+    still honours its own deadline, and the leader's is not passed on: when
+    the shared call ran out of the leader's time (or was cancelled), a
+    follower with time left makes the call again itself. On the async side
+    the shared call runs as its own task, so it keeps going while at least
+    one caller is waiting and is cancelled once the last one gave up.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[str, _AsyncFlight] = {}
+        self._counters = {"leaders": 0, "coalesced": 0, "retaken": 0, "shared_errors": 0, "abandoned": 0}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, call: Callable[[], T], deadline: Optional[Deadline] = None) -> T:
+        if not self.enabled:
+            return call()
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self._counters["leaders"] += 1
+                else:
+                    flight.followers += 1
+                    self._counters["coalesced"] += 1
+            if leader:
+                try:
+                    flight.result = call()
+                except BaseException as exc:
+                    flight.error = exc
+                    raise
+                finally:
+                    with self._lock:
+                        del self._flights[key]
+                        if flight.error is not None and not isinstance(flight.error, DeadlineExceededError):
+                            self._counters["shared_errors"] += flight.followers
+                    flight.done.set()
+                return flight.result
+            if not flight.done.wait(None if deadline is None else deadline.remaining()):
+                with self._lock:
+                    self._counters["abandoned"] += 1
+                raise deadline.exceeded()
+            if isinstance(flight.error, DeadlineExceededError):
+                self._retake(deadline)
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+    async def do_async(
+        self, key: str, call: Callable[[], Awaitable[T]], deadline: Optional[Deadline] = None
+    ) -> T:
+        if not self.enabled:
+            return await call()
+        while True:
+            with self._lock:
+                flight = self._async_flights.get(key)
+                # A finished task may linger until its done-callback has run.
+                leader = flight is None or flight.task.done()
+                if leader:
+                    flight = self._async_flights[key] = _AsyncFlight(asyncio.ensure_future(call()))
+                    flight.task.add_done_callback(lambda task, flight=flight: self._finish_async(key, flight))
+                    self._counters["leaders"] += 1
+                else:
+                    flight.followers += 1
+                    self._counters["coalesced"] += 1
+                flight.waiters += 1
+            try:
+                # The leader's own deadline already bounds the shared call; followers bring theirs.
+                timeout = None if leader or deadline is None else deadline.remaining()
+                return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+            except asyncio.TimeoutError:
+                if flight.task.done():
+                    raise  # the shared call itself timed out
+                with self._lock:
+                    self._counters["abandoned"] += 1
+                raise deadline.exceeded() from None
+            except DeadlineExceededError:
+                if leader:
+                    raise
+                self._retake(deadline)
+            except asyncio.CancelledError:
+                # Only a follower whose shared call was cancelled, not the follower itself, tries again.
+                if leader or not flight.task.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                self._retake(deadline)
+            finally:
+                with self._lock:
+                    flight.waiters -= 1
+                    if flight.waiters == 0 and not flight.task.done():
+                        flight.task.cancel()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "in_flight": len(self._flights) + len(self._async_flights),
+                **self._counters,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters = dict.fromkeys(self._counters, 0)
+
+    def _retake(self, deadline: Optional[Deadline]) -> None:
+        """A follower outlived the leader's deadline or cancellation; it makes the call itself if it has time left."""
+        if deadline is not None and deadline.expired:
+            raise deadline.exceeded()
+        with self._lock:
+            self._counters["retaken"] += 1
+
+    def _finish_async(self, key: str, flight: _AsyncFlight) -> None:
+        with self._lock:
+            if self._async_flights.get(key) is flight:
+                del self._async_flights[key]
+            if flight.task.cancelled():
+                return
+            error = flight.task.exception()
+            if error is not None and not isinstance(error, DeadlineExceededError):
+                self._counters["shared_errors"] += flight.followers
+
+
+single_flight = SingleFlight(get_settings().gemini_coalesce)
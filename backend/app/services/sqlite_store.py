@@ -0,0 +1,332 @@
+"""SQLite-backed storage engine exposing the same API as ``JsonStore``."""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from app.core.config import get_settings
+from app.models.bot import BotBlueprint, ChatTurn
+from app.services.expiry import Sweeper
+
+SQLITE_URL_PREFIX = "sqlite:///"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blueprints (
+    bot_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    last_active REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS session_map (
+    session_id TEXT PRIMARY KEY,
+    bot_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bot_sessions (
+    bot_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    touched INTEGER NOT NULL,
+    last_active REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (bot_id, session_id)
+);
+CREATE INDEX IF NOT EXISTS idx_bot_sessions_recency ON bot_sessions (bot_id, touched);
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bot_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_turns_session ON turns (bot_id, session_id, id);
+"""
+
+# Columns added after the first schema; older databases are migrated in place.
+_ADDED_COLUMNS = {
+    "blueprints": "last_active REAL NOT NULL DEFAULT 0",
+    "bot_sessions": "last_active REAL NOT NULL DEFAULT 0",
+}
+
+_EXPIRY_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_bot_sessions_activity ON bot_sessions (last_active);
+CREATE INDEX IF NOT EXISTS idx_blueprints_activity ON blueprints (last_active);
+CREATE INDEX IF NOT EXISTS idx_session_map_bot ON session_map (bot_id);
+"""
+
+
+def is_sqlite_url(value: str | Path | None) -> bool:
+    return isinstance(value, str) and value.startswith(SQLITE_URL_PREFIX)
+
+
+def _database_from_url(url: str) -> str:
+    database = url[len(SQLITE_URL_PREFIX):]
+    if not database or database.lower() == ":memory:":
+        return ":memory:"
+    path = Path(database).resolve()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return str(path)
+
+
+class SqliteStore:
+    """Row-level store: blueprints, session ownership and turns live in indexed tables.
+
+    ``bot_sessions`` mirrors the per-bot ``OrderedDict`` of ``JsonStore``: its
+    ``touched`` counter orders sessions by recency so the session cap can be
+    enforced with a single indexed ``DELETE``.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        max_sessions_per_bot: int | None = None,
+        max_turns_per_session: int | None = None,
+        session_ttl_seconds: int | None = None,
+        blueprint_ttl_seconds: int | None = None,
+        sweep_interval_seconds: int | None = None,
+    ) -> None:
+        settings = get_settings()
+        sessions_cap = max_sessions_per_bot or settings.store_max_sessions_per_bot
+        turns_cap = max_turns_per_session or settings.store_max_turns_per_session
+        if sessions_cap < 1 or turns_cap < 1:
+            raise ValueError("Storage limits must be positive integers")
+
+        self._max_sessions_per_bot = sessions_cap
+        self._max_turns_per_session = turns_cap
+
+        database = _database_from_url(url)
+        self._conn = sqlite3.connect(database, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout = 5000")
+        if database != ":memory:":
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self._conn.executescript(_EXPIRY_INDEXES)
+        self._lock = threading.RLock()
+        self._tx_depth = 0
+
+        self._session_ttl = (
+            settings.store_session_ttl_seconds if session_ttl_seconds is None else session_ttl_seconds
+        )
+        self._blueprint_ttl = (
+            settings.store_blueprint_ttl_seconds if blueprint_ttl_seconds is None else blueprint_ttl_seconds
+        )
+        self._sweeper: Sweeper | None = None
+        if self._session_ttl or self._blueprint_ttl:
+            interval = sweep_interval_seconds or settings.store_sweep_interval_seconds
+            self._sweeper = Sweeper(self.expire, interval).start()
+
+    # ---------------------------------------------------------------------
+    # Blueprint APIs
+    # ---------------------------------------------------------------------
+    def save_blueprint(self, blueprint: BotBlueprint) -> None:
+        with self._lock, self._transaction():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blueprints (bot_id, payload, last_active) VALUES (?, ?, ?)",
+                (blueprint.bot_id, json.dumps(blueprint.model_dump(), ensure_ascii=False), time.time()),
+            )
+
+    def get_blueprint(self, bot_id: str) -> BotBlueprint | None:
+        with self._lock:
+            return self._blueprint_locked(bot_id)
+
+    # ---------------------------------------------------------------------
+    # Session association
+    # ---------------------------------------------------------------------
+    def assign_session(self, bot_id: str, session_id: str) -> None:
+        if not session_id:
+            return
+        with self._lock, self._transaction():
+            row = self._conn.execute(
+                "SELECT bot_id FROM session_map WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is not None:
+                self._drop_session_locked(row[0], session_id)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO session_map (session_id, bot_id) VALUES (?, ?)",
+                (session_id, bot_id),
+            )
+            self._touch_session_locked(bot_id, session_id)
+            self._trim_sessions_locked(bot_id)
+
+    def get_session_state(self, session_id: str) -> tuple[BotBlueprint | None, List[ChatTurn]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT bot_id FROM session_map WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None, []
+            bot_id = row[0]
+            return self._blueprint_locked(bot_id), self._turns_locked(bot_id, session_id)
+
+    # ---------------------------------------------------------------------
+    # Conversation history
+    # ---------------------------------------------------------------------
+    def reset_history_for_bot(self, bot_id: str) -> None:
+        with self._lock, self._transaction():
+            self._conn.execute("DELETE FROM turns WHERE bot_id = ?", (bot_id,))
+            self._conn.execute("DELETE FROM bot_sessions WHERE bot_id = ?", (bot_id,))
+
+    def append_turn(self, bot_id: str, session_id: str, turn: ChatTurn) -> None:
+        with self._lock, self._transaction():
+            self._conn.execute(
+                "INSERT INTO turns (bot_id, session_id, role, content) VALUES (?, ?, ?, ?)",
+                (bot_id, session_id, turn.role, turn.content),
+            )
+            self._conn.execute(
+                """
+                DELETE FROM turns
+                WHERE bot_id = ? AND session_id = ? AND id <= (
+                    SELECT id FROM turns WHERE bot_id = ? AND session_id = ?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?
+                )
+                """,
+                (bot_id, session_id, bot_id, session_id, self._max_turns_per_session),
+            )
+            self._touch_session_locked(bot_id, session_id)
+
+    def get_history(self, bot_id: str, session_id: str) -> List[ChatTurn]:
+        with self._lock:
+            return self._turns_locked(bot_id, session_id)
+
+    # ------------------------------------------------------------------
+    # Utilities (primarily for tests/admin tasks)
+    # ------------------------------------------------------------------
+    def clear(self) -> None:
+        with self._lock, self._transaction():
+            for table in ("turns", "bot_sessions", "session_map", "blueprints"):
+                self._conn.execute(f"DELETE FROM {table}")
+
+    def expire(self, now: float | None = None) -> int:
+        """Delete idle sessions and orphaned blueprints; both lookups are indexed range scans."""
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock, self._transaction():
+            if self._session_ttl:
+                stale = self._conn.execute(
+                    "SELECT bot_id, session_id FROM bot_sessions WHERE last_active <= ?",
+                    (now - self._session_ttl,),
+                ).fetchall()
+                for bot_id, session_id in stale:
+                    self._drop_session_locked(bot_id, session_id)
+                    self._conn.execute(
+                        "DELETE FROM session_map WHERE session_id = ? AND bot_id = ?", (session_id, bot_id)
+                    )
+                removed += len(stale)
+            if self._blueprint_ttl:
+                orphaned = self._conn.execute(
+                    """
+                    SELECT bot_id FROM blueprints
+                    WHERE last_active <= ?
+                    AND NOT EXISTS (SELECT 1 FROM bot_sessions WHERE bot_sessions.bot_id = blueprints.bot_id)
+                    """,
+                    (now - self._blueprint_ttl,),
+                ).fetchall()
+                for (bot_id,) in orphaned:
+                    self._conn.execute("DELETE FROM blueprints WHERE bot_id = ?", (bot_id,))
+                    self._conn.execute("DELETE FROM session_map WHERE bot_id = ?", (bot_id,))
+                removed += len(orphaned)
+        return removed
+
+    @contextmanager
+    def transaction(self) -> Iterator["SqliteStore"]:
+        """Run several mutations in one SQL transaction; an exception rolls all of them back."""
+        with self._lock, self._transaction():
+            yield self
+
+    def flush(self) -> None:
+        """Every mutation commits its own transaction, so nothing is ever pending."""
+
+    def stats(self) -> Dict[str, Any]:
+        """Row counts for monitoring; SQLite keeps nothing resident beyond its page cache."""
+        with self._lock:
+            counts = {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("blueprints", "bot_sessions", "turns")
+            }
+        return {"engine": "sqlite", "rows": counts}
+
+    def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.stop()
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _migrate(self) -> None:
+        for table, column in _ADDED_COLUMNS.items():
+            existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if column.split()[0] not in existing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # Nested calls join the outermost BEGIN/COMMIT opened by ``transaction()``.
+        if self._tx_depth:
+            self._tx_depth += 1
+            try:
+                yield self._conn
+            finally:
+                self._tx_depth -= 1
+            return
+        self._conn.execute("BEGIN IMMEDIATE")
+        self._tx_depth = 1
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        else:
+            self._conn.execute("COMMIT")
+        finally:
+            self._tx_depth = 0
+
+    def _blueprint_locked(self, bot_id: str) -> BotBlueprint | None:
+        row = self._conn.execute("SELECT payload FROM blueprints WHERE bot_id = ?", (bot_id,)).fetchone()
+        return BotBlueprint(**json.loads(row[0])) if row else None
+
+    def _turns_locked(self, bot_id: str, session_id: str) -> List[ChatTurn]:
+        rows = self._conn.execute(
+            "SELECT role, content FROM turns WHERE bot_id = ? AND session_id = ? ORDER BY id",
+            (bot_id, session_id),
+        ).fetchall()
+        return [ChatTurn(role=role, content=content) for role, content in rows]
+
+    def _touch_session_locked(self, bot_id: str, session_id: str) -> None:
+        now = time.time()
+        self._conn.execute(
+            """
+            INSERT INTO bot_sessions (bot_id, session_id, touched, last_active)
+            VALUES (?, ?, (SELECT COALESCE(MAX(touched), 0) + 1 FROM bot_sessions WHERE bot_id = ?), ?)
+            ON CONFLICT (bot_id, session_id)
+            DO UPDATE SET touched = excluded.touched, last_active = excluded.last_active
+            """,
+            (bot_id, session_id, bot_id, now),
+        )
+        self._conn.execute("UPDATE blueprints SET last_active = ? WHERE bot_id = ?", (now, bot_id))
+
+    def _drop_session_locked(self, bot_id: str, session_id: str) -> None:
+        self._conn.execute(
+            "DELETE FROM turns WHERE bot_id = ? AND session_id = ?", (bot_id, session_id)
+        )
+        self._conn.execute(
+            "DELETE FROM bot_sessions WHERE bot_id = ? AND session_id = ?", (bot_id, session_id)
+        )
+
+    def _trim_sessions_locked(self, bot_id: str) -> None:
+        stale = self._conn.execute(
+            """
+            SELECT session_id FROM bot_sessions WHERE bot_id = ?
+            ORDER BY touched DESC LIMIT -1 OFFSET ?
+            """,
+            (bot_id, self._max_sessions_per_bot),
+        ).fetchall()
+        for (session_id,) in stale:
+            self._drop_session_locked(bot_id, session_id)
+            self._conn.execute("DELETE FROM session_map WHERE session_id = ?", (session_id,))
+
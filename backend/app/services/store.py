@@ -2,13 +2,77 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
 import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
 from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Callable, Dict, Iterator, List, Literal, Sequence
 
 from app.core.config import get_settings
 from app.models.bot import BotBlueprint, ChatTurn
+from app.services.expiry import ExpiryIndex, Sweeper
+from app.services.sqlite_store import SqliteStore, is_sqlite_url
+from app.services.store_journal import JournalRecord, StoreJournal
+from app.services.turn_history import EMPTY_HISTORY, TurnHistory
+
+logger = logging.getLogger(__name__)
+
+Durability = Literal["always", "batch", "none"]
+_PendingWrite = Callable[[], None]
+
+
+class _DeferredTurns(ABC):
+    """A session whose turns are not resident yet; ``load`` materializes them."""
+
+    __slots__ = ()
+
+    @abstractmethod
+    def load(self) -> TurnHistory:
+        ...
+
+
+class _UnloadedTurns(_DeferredTurns):
+    """Raw turn dicts from the snapshot, materialized on first access to the session."""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: List[Dict[str, Any]]) -> None:
+        self.raw = raw
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def load(self) -> TurnHistory:
+        # Written by this store, so skip re-validation.
+        return TurnHistory.from_raw(self.raw)
+
+
+class _SpilledTurns(_DeferredTurns):
+    """A session evicted by the memory budget; its turns live in an immutable spill file."""
+
+    __slots__ = ("path", "count")
+
+    def __init__(self, path: Path, count: int) -> None:
+        self.path = path
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def load(self) -> TurnHistory:
+        try:
+            return TurnHistory.from_raw(json.loads(self.path.read_text(encoding="utf-8")))
+        except (OSError, json.JSONDecodeError):
+            logger.warning("Spilled session file %s is unreadable; starting the session empty", self.path)
+            return EMPTY_HISTORY
+
+    def to_raw(self) -> Dict[str, Any]:
+        return {"$spilled": self.path.name, "turns": self.count}
 
 
 class JsonStore:
@@ -18,6 +82,16 @@ class JsonStore:
         *,
         max_sessions_per_bot: int | None = None,
         max_turns_per_session: int | None = None,
+        journal: bool | None = None,
+        compact_threshold: int | None = None,
+        durability: Durability | None = None,
+        flush_interval_ms: int | None = None,
+        flush_max_pending: int | None = None,
+        max_bytes: int | None = None,
+        lazy_load: bool | None = None,
+        session_ttl_seconds: int | None = None,
+        blueprint_ttl_seconds: int | None = None,
+        sweep_interval_seconds: int | None = None,
     ) -> None:
         settings = get_settings()
         path_value = storage_path if storage_path is not None else settings.store_path
@@ -35,67 +109,358 @@ class JsonStore:
         self._max_turns_per_session = turns_cap
 
         self._blueprints: Dict[str, BotBlueprint] = {}
-        self._history: Dict[str, OrderedDict[str, List[ChatTurn]]] = {}
+        # Read-copy-update: histories are immutable ``TurnHistory`` columns and every write
+        # swaps in a new object, so readers take plain (GIL-atomic) dict lookups without the lock.
+        self._history: Dict[str, OrderedDict[str, TurnHistory | _DeferredTurns]] = {}
         self._session_map: Dict[str, str] = {}
-        self._lock = threading.Lock()
+        # Serializes writers only; re-entrant so public methods can run inside ``transaction()``.
+        self._lock = threading.RLock()
+        self._tx_depth = 0
+        self._io_lock = threading.Lock()
+        self._generation = 0
+        self._written_generation = 0
 
+        use_journal = settings.store_journal if journal is None else journal
+        self._journal = (
+            StoreJournal(self._path.with_name(self._path.name + ".journal"))
+            if use_journal and self._path is not None
+            else None
+        )
+        self._compact_threshold = compact_threshold or settings.store_compact_threshold
+        self._seq = 0
+        self._compact_lock = threading.Lock()
+        self._compact_requested = threading.Event()
+        self._closed = False
+
+        self._durability: Durability = durability or settings.store_durability
+        if self._durability not in ("always", "batch", "none"):
+            raise ValueError(f"Unknown store durability '{self._durability}'")
+        self._flush_interval = (flush_interval_ms or settings.store_flush_interval_ms) / 1000
+        self._flush_max_pending = flush_max_pending or settings.store_flush_max_pending
+        self._pending_records: List[JournalRecord] = []
+        self._dirty = 0
+        self._flush_requested = threading.Event()
+
+        session_ttl = settings.store_session_ttl_seconds if session_ttl_seconds is None else session_ttl_seconds
+        blueprint_ttl = (
+            settings.store_blueprint_ttl_seconds if blueprint_ttl_seconds is None else blueprint_ttl_seconds
+        )
+        # Keys are (bot_id, session_id) for sessions and bot_id for blueprints.
+        self._session_expiry: ExpiryIndex[tuple[str, str]] | None = (
+            ExpiryIndex(session_ttl) if session_ttl else None
+        )
+        self._blueprint_expiry: ExpiryIndex[str] | None = ExpiryIndex(blueprint_ttl) if blueprint_ttl else None
+        self._sweeper: Sweeper | None = None
+
+        # Global memory budget across bots: resident (materialized) sessions in LRU order
+        # with their ``TurnHistory.nbytes``. Deferred sessions are not counted.
+        self._max_bytes = settings.store_max_bytes if max_bytes is None else max_bytes
+        self._resident: OrderedDict[tuple[str, str], int] = OrderedDict()
+        self._bytes_in_use = 0
+        self._spill_dir = None if self._path is None else self._path.with_name(self._path.name + ".sessions")
+        # Spill files no longer referenced in memory; deleted once a snapshot without them is on disk.
+        self._spill_garbage: List[Path] = []
+        self._memory_stats = {"evictions": 0, "spilled": 0, "dropped": 0, "reloads": 0}
+
+        self._lazy_load = settings.store_lazy_load if lazy_load is None else lazy_load
+        self._load_stats: Dict[str, Any] = {}
         self._load()
+        self._remove_orphaned_spill_files()
+
+        if self._journal is not None:
+            threading.Thread(target=self._compactor_loop, name="store-compactor", daemon=True).start()
+            self._maybe_request_compaction()
+        if self._durability == "batch" and not self._memory_only:
+            threading.Thread(target=self._flusher_loop, name="store-flusher", daemon=True).start()
+        if self._session_expiry is not None or self._blueprint_expiry is not None:
+            interval = sweep_interval_seconds or settings.store_sweep_interval_seconds
+            self._sweeper = Sweeper(self.expire, interval).start()
 
     # ---------------------------------------------------------------------
     # Persistence helpers
     # ---------------------------------------------------------------------
     def _load(self) -> None:
-        if self._memory_only or self._path is None or not self._path.exists():
+        if self._memory_only or self._path is None:
             return
 
-        try:
-            raw = json.loads(self._path.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            return
+        started = time.perf_counter()
+        replayed = 0
+        if self._path.exists():
+            try:
+                self._restore_snapshot(json.loads(self._path.read_text(encoding="utf-8")))
+            except json.JSONDecodeError:
+                pass
 
+        # Replay even with the journal off: a run that had it on may have left writes the snapshot lacks.
+        journal = self._journal or StoreJournal(self._path.with_name(self._path.name + ".journal"))
+        for record in journal.replay(after_seq=self._seq):
+            self._replay_record(record)
+            self._seq = max(self._seq, record.get("seq", self._seq))
+            replayed += 1
+        self._evict(self._over_budget_locked())
+        if journal is not self._journal:
+            if replayed:
+                self._write_snapshot(self._snapshot_payload_locked())
+            journal.clear()
+
+        sessions = [turns for bot_sessions in self._history.values() for turns in bot_sessions.values()]
+        self._load_stats = {
+            "seconds": round(time.perf_counter() - started, 4),
+            "lazy": self._lazy_load,
+            "blueprints": len(self._blueprints),
+            "sessions": len(sessions),
+            "turns": sum(len(turns) for turns in sessions),
+            "journal_records": replayed,
+        }
+        logger.info("Store loaded from %s: %s", self._path, self._load_stats)
+
+    def _restore_snapshot(self, raw: Dict[str, Any]) -> None:
         blueprints = raw.get("blueprints", {})
         history = raw.get("history", {})
         sessions = raw.get("sessions", {})
 
-        self._blueprints = {bot_id: BotBlueprint(**data) for bot_id, data in blueprints.items()}
+        if self._lazy_load:
+            self._blueprints = {
+                bot_id: BotBlueprint.model_construct(**data) for bot_id, data in blueprints.items()
+            }
+        else:
+            self._blueprints = {bot_id: BotBlueprint(**data) for bot_id, data in blueprints.items()}
         self._history = {
             bot_id: OrderedDict(
-                (session_id, [ChatTurn(**turn) for turn in turns or []])
-                for session_id, turns in session_map.items()
+                (session_id, self._restored_turns(turns)) for session_id, turns in session_map.items()
             )
             for bot_id, session_map in history.items()
         }
+        for bot_id, bot_sessions in self._history.items():
+            for session_id, turns in bot_sessions.items():
+                self._account_locked(bot_id, session_id, turns)
         self._session_map = {session_id: bot_id for session_id, bot_id in sessions.items()}
+        self._seq = int(raw.get("seq", 0))
+        self._restore_activity(raw.get("activity", {}))
 
-    def _save_locked(self) -> None:
-        if self._memory_only or self._path is None:
-            return
+    def _restored_turns(self, turns: List[Dict[str, Any]] | Dict[str, Any] | None) -> TurnHistory | _DeferredTurns:
+        if isinstance(turns, dict):
+            assert self._spill_dir is not None
+            return _SpilledTurns(self._spill_dir / turns["$spilled"], int(turns.get("turns", 0)))
+        if self._lazy_load:
+            return _UnloadedTurns(turns or [])
+        return TurnHistory.from_turns(ChatTurn(**turn) for turn in turns or [])
 
-        payload = {
+    def _restore_activity(self, activity: Dict[str, Any]) -> None:
+        # Snapshots written before expiry existed have no timestamps: start their clock now.
+        now = time.time()
+        if self._session_expiry is not None:
+            seen = {(bot_id, session_id): ts for bot_id, session_id, ts in activity.get("sessions", [])}
+            for bot_id, bot_sessions in self._history.items():
+                for session_id in bot_sessions:
+                    self._session_expiry.touch((bot_id, session_id), seen.get((bot_id, session_id), now))
+        if self._blueprint_expiry is not None:
+            seen_bots = dict(activity.get("blueprints", []))
+            for bot_id in self._blueprints:
+                self._blueprint_expiry.touch(bot_id, seen_bots.get(bot_id, now))
+
+    def _snapshot_payload_locked(self) -> Dict[str, Any]:
+        return {
             "blueprints": {bot_id: blueprint.model_dump() for bot_id, blueprint in self._blueprints.items()},
             "history": {
                 bot_id: {
-                    session_id: [turn.model_dump() for turn in turns]
+                    session_id: turns.raw if isinstance(turns, _UnloadedTurns) else turns.to_raw()
                     for session_id, turns in session_map.items()
                 }
                 for bot_id, session_map in self._history.items()
             },
             "sessions": dict(self._session_map),
+            "seq": self._seq,
+            "activity": {
+                "sessions": [
+                    [bot_id, session_id, ts] for (bot_id, session_id), ts in self._session_expiry.items()
+                ]
+                if self._session_expiry is not None
+                else [],
+                "blueprints": [list(item) for item in self._blueprint_expiry.items()]
+                if self._blueprint_expiry is not None
+                else [],
+            },
         }
-        self._path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    def _write_snapshot(self, payload: Dict[str, Any]) -> None:
+        """Atomically replace the snapshot: temp file, fsync, rename, fsync the directory."""
+        assert self._path is not None
+        tmp_path = self._path.with_name(self._path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            handle.write(json.dumps(payload, indent=2, ensure_ascii=False))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self._path)
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(self._path.parent, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def _write_snapshot_if_newer(self, generation: int, payload: Dict[str, Any], garbage: List[Path]) -> None:
+        # Runs outside ``self._lock``: a slower writer must not clobber a newer snapshot.
+        with self._io_lock:
+            if generation > self._written_generation:
+                self._write_snapshot(payload)
+                self._written_generation = generation
+        # Either way a snapshot taken after these files were released is now on disk.
+        self._remove_spill_files(garbage)
+
+    def _commit_locked(self, op: str, **fields: Any) -> None:
+        """Record one mutation; ``_mutating`` decides when it reaches disk."""
+        if self._memory_only:
+            return
+        if self._journal is not None:
+            self._seq += 1
+            self._pending_records.append({"seq": self._seq, "op": op, **fields})
+        self._dirty += 1
+
+    def _schedule_flush_locked(self) -> _PendingWrite | None:
+        if self._durability == "always":
+            return self._flush_locked()
+        if self._durability == "batch" and self._dirty >= self._flush_max_pending:
+            self._flush_requested.set()
+        return None
+
+    @contextmanager
+    def _mutating(self) -> Iterator[None]:
+        """Writer section: mutate under the lock, do the slow disk work after releasing it."""
+        with self._lock:
+            self._tx_depth += 1
+            try:
+                yield
+            finally:
+                self._tx_depth -= 1
+                pending = None if self._tx_depth else self._schedule_flush_locked()
+                victims = None if self._tx_depth else self._over_budget_locked()
+        if pending is not None:
+            pending()
+        if victims:
+            self._evict(victims)
+
+    @contextmanager
+    def transaction(self) -> Iterator["JsonStore"]:
+        """Apply several mutations under one lock hold and persist them once on exit.
+
+        Mutations are applied in memory as they happen; there is no rollback, so
+        whatever ran before an exception is still persisted with the rest.
+        """
+        with self._mutating():
+            yield self
+
+    def _flush_locked(self) -> _PendingWrite | None:
+        """Hand buffered mutations to the disk; returns the part that may run unlocked."""
+        if not self._dirty:
+            return None
+        self._dirty = 0
+        if self._journal is not None:
+            # Appends stay ordered under the lock; only the fsync is deferred.
+            self._journal.append(self._pending_records)
+            self._pending_records = []
+            self._maybe_request_compaction()
+            return self._journal.sync
+        self._generation += 1
+        generation, payload, garbage = self._generation, self._snapshot_payload_locked(), self._take_garbage_locked()
+        return lambda: self._write_snapshot_if_newer(generation, payload, garbage)
+
+    def flush(self) -> None:
+        """Write any mutations still buffered by the ``batch``/``none`` durability levels."""
+        with self._lock:
+            pending = self._flush_locked()
+        if pending is not None:
+            pending()
+
+    def _flusher_loop(self) -> None:
+        # Group commit: wake every interval, or early once enough mutations are pending.
+        while not self._closed:
+            self._flush_requested.wait(timeout=self._flush_interval)
+            self._flush_requested.clear()
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Store flush failed; pending mutations kept for the next attempt")
+
+    def _replay_record(self, record: JournalRecord) -> None:
+        op = record.get("op")
+        now = record.get("ts") or time.time()
+        if op == "blueprint":
+            self._put_blueprint_locked(BotBlueprint(**record["blueprint"]), now)
+        elif op == "assign":
+            self._assign_session_locked(record["bot_id"], record["session_id"], now)
+        elif op == "reset":
+            self._reset_history_locked(record["bot_id"])
+        elif op == "turn":
+            self._append_turn_locked(record["bot_id"], record["session_id"], ChatTurn(**record["turn"]), now)
+        elif op == "expire":
+            self._expire_locked([tuple(key) for key in record["sessions"]], record["bots"])
+        else:
+            logger.warning("Skipping unknown journal record %r", op)
+
+    # ---------------------------------------------------------------------
+    # Compaction
+    # ---------------------------------------------------------------------
+    def _maybe_request_compaction(self) -> None:
+        if self._journal is not None and self._journal.pending >= self._compact_threshold:
+            self._compact_requested.set()
+
+    def _compactor_loop(self) -> None:
+        while True:
+            self._compact_requested.wait()
+            self._compact_requested.clear()
+            if self._closed:
+                return
+            try:
+                self.compact()
+            except OSError:
+                logger.exception("Store compaction failed; journal kept for replay")
+
+    def compact(self) -> None:
+        """Fold the journal into a fresh snapshot."""
+        if self._journal is None:
+            return
+        with self._compact_lock:
+            with self._lock:
+                payload = self._snapshot_payload_locked()
+                garbage = self._take_garbage_locked()
+                # Buffered records are already folded into the payload.
+                self._pending_records = []
+                self._dirty = 0
+                self._journal.rotate()
+            # Records appended from here on land in the new journal with seq > payload["seq"].
+            self._write_snapshot(payload)
+            self._journal.discard_rotated()
+            self._remove_spill_files(garbage)
+
+    def close(self) -> None:
+        """Flush pending state, stop background work and release file handles."""
+        self._closed = True
+        self._compact_requested.set()
+        self._flush_requested.set()
+        if self._sweeper is not None:
+            self._sweeper.stop()
+        self.flush()
+        if self._journal is not None:
+            # Leave a snapshot that covers the journal, so the next start has nothing to replay.
+            try:
+                self.compact()
+            except OSError:
+                logger.exception("Store compaction on close failed; the journal is kept for the next start")
+            with self._lock:
+                self._journal.close()
 
     # ---------------------------------------------------------------------
     # Blueprint APIs
     # ---------------------------------------------------------------------
     def save_blueprint(self, blueprint: BotBlueprint) -> None:
-        with self._lock:
-            self._blueprints[blueprint.bot_id] = blueprint
-            self._history.setdefault(blueprint.bot_id, OrderedDict())
-            self._save_locked()
+        now = time.time()
+        with self._mutating():
+            self._put_blueprint_locked(blueprint, now)
+            self._commit_locked("blueprint", blueprint=blueprint, ts=now)
 
     def get_blueprint(self, bot_id: str) -> BotBlueprint | None:
-        with self._lock:
-            return self._blueprints.get(bot_id)
+        return self._blueprints.get(bot_id)
 
     # ---------------------------------------------------------------------
     # Session association
@@ -103,76 +468,319 @@ class JsonStore:
     def assign_session(self, bot_id: str, session_id: str) -> None:
         if not session_id:
             return
-        with self._lock:
-            previous_bot = self._session_map.get(session_id)
-            if previous_bot and previous_bot in self._history:
-                self._history[previous_bot].pop(session_id, None)
-            self._session_map[session_id] = bot_id
-            bot_sessions = self._history.setdefault(bot_id, OrderedDict())
-            if session_id in bot_sessions:
-                bot_sessions.move_to_end(session_id)
-            else:
-                bot_sessions[session_id] = []
-            self._trim_sessions_for_bot(bot_id)
-            self._save_locked()
+        now = time.time()
+        with self._mutating():
+            self._assign_session_locked(bot_id, session_id, now)
+            self._commit_locked("assign", bot_id=bot_id, session_id=session_id, ts=now)
 
-    def get_session_state(self, session_id: str) -> tuple[BotBlueprint | None, List[ChatTurn]]:
-        with self._lock:
-            bot_id = self._session_map.get(session_id)
-            if not bot_id:
-                return None, []
-            blueprint = self._blueprints.get(bot_id)
-            turns = list(self._history.get(bot_id, {}).get(session_id, []))
-            return blueprint, turns
+    def get_session_state(self, session_id: str) -> tuple[BotBlueprint | None, Sequence[ChatTurn]]:
+        """Return the session's blueprint and an immutable view of its turns."""
+        bot_id = self._session_map.get(session_id)
+        if not bot_id:
+            return None, EMPTY_HISTORY
+        return self._blueprints.get(bot_id), self._session_turns(bot_id, session_id)
 
     # ---------------------------------------------------------------------
     # Conversation history
     # ---------------------------------------------------------------------
     def reset_history_for_bot(self, bot_id: str) -> None:
-        with self._lock:
-            if bot_id in self._history:
-                self._history[bot_id] = OrderedDict()
-            self._save_locked()
+        with self._mutating():
+            self._reset_history_locked(bot_id)
+            self._commit_locked("reset", bot_id=bot_id)
 
     def append_turn(self, bot_id: str, session_id: str, turn: ChatTurn) -> None:
-        with self._lock:
-            bot_sessions = self._history.setdefault(bot_id, OrderedDict())
-            turns = bot_sessions.setdefault(session_id, [])
-            turns.append(turn)
-            if len(turns) > self._max_turns_per_session:
-                del turns[: len(turns) - self._max_turns_per_session]
-            bot_sessions.move_to_end(session_id)
-            self._save_locked()
+        now = time.time()
+        with self._mutating():
+            self._append_turn_locked(bot_id, session_id, turn, now)
+            self._commit_locked("turn", bot_id=bot_id, session_id=session_id, turn=turn, ts=now)
 
-    def get_history(self, bot_id: str, session_id: str) -> List[ChatTurn]:
-        with self._lock:
-            turns = self._history.get(bot_id, OrderedDict()).get(session_id, [])
-            return list(turns)
+    def get_history(self, bot_id: str, session_id: str) -> Sequence[ChatTurn]:
+        """Return an immutable view of the session's turns (no copy is made)."""
+        return self._session_turns(bot_id, session_id)
 
     # ------------------------------------------------------------------
     # Utilities (primarily for tests/admin tasks)
     # ------------------------------------------------------------------
+    def expire(self, now: float | None = None) -> int:
+        """Drop sessions idle past ``STORE_SESSION_TTL`` and orphaned blueprints past ``STORE_BLUEPRINT_TTL``."""
+        now = time.time() if now is None else now
+        with self._mutating():
+            sessions = self._session_expiry.pop_expired(now) if self._session_expiry is not None else []
+            bots: List[str] = []
+            if self._blueprint_expiry is not None:
+                for bot_id in self._blueprint_expiry.pop_expired(now):
+                    if self._history.get(bot_id) and not all(
+                        (bot_id, session_id) in sessions for session_id in self._history[bot_id]
+                    ):
+                        # Still has live sessions, so it is not orphaned yet.
+                        self._blueprint_expiry.touch(bot_id, now)
+                    else:
+                        bots.append(bot_id)
+            if sessions or bots:
+                self._expire_locked(sessions, bots)
+                self._commit_locked("expire", sessions=[list(key) for key in sessions], bots=bots)
+        return len(sessions) + len(bots)
+
+    def stats(self) -> Dict[str, Any]:
+        """Startup load and memory-budget metrics for monitoring."""
+        return {
+            "engine": "json",
+            "load": dict(self._load_stats),
+            "memory": {
+                "max_bytes": self._max_bytes,
+                "bytes_in_use": self._bytes_in_use,
+                "resident_sessions": len(self._resident),
+                **self._memory_stats,
+            },
+        }
+
     def clear(self) -> None:
-        with self._lock:
-            self._blueprints.clear()
-            self._history.clear()
-            self._session_map.clear()
+        with self._lock, self._io_lock:
+            self._reset_state_locked()
+            self._written_generation = self._generation
+            if self._journal is not None:
+                self._journal.clear()
             if not self._memory_only and self._path and self._path.exists():
                 try:
                     self._path.unlink()
                 except OSError:
                     pass
+            if self._spill_dir is not None:
+                self._remove_spill_files(list(self._spill_dir.glob("*.json")))
+                self._spill_garbage = []
 
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
+    def _reset_state_locked(self) -> None:
+        self._blueprints.clear()
+        self._history.clear()
+        self._session_map.clear()
+        for index in (self._session_expiry, self._blueprint_expiry):
+            if index is not None:
+                index.clear()
+        self._resident.clear()
+        self._bytes_in_use = 0
+        self._seq = 0
+        self._pending_records = []
+        self._dirty = 0
+
+    def _session_turns(self, bot_id: str, session_id: str) -> TurnHistory:
+        turns = self._history.get(bot_id, {}).get(session_id, EMPTY_HISTORY)
+        if isinstance(turns, _DeferredTurns):
+            with self._lock:
+                turns = self._loaded_turns_locked(bot_id, session_id)
+                victims = self._over_budget_locked()
+            self._evict(victims)
+        return turns
+
+    def _loaded_turns_locked(self, bot_id: str, session_id: str) -> TurnHistory:
+        bot_sessions = self._history.get(bot_id)
+        turns = bot_sessions.get(session_id, EMPTY_HISTORY) if bot_sessions is not None else EMPTY_HISTORY
+        if isinstance(turns, _DeferredTurns):
+            if isinstance(turns, _SpilledTurns):
+                self._spill_garbage.append(turns.path)
+                self._memory_stats["reloads"] += 1
+            turns = turns.load()
+            # Replacing an existing key keeps the session's recency position.
+            bot_sessions[session_id] = turns
+            self._account_locked(bot_id, session_id, turns)
+        return turns
+
+    def _touch_locked(self, bot_id: str, session_id: str | None, now: float) -> None:
+        if self._session_expiry is not None and session_id is not None:
+            self._session_expiry.touch((bot_id, session_id), now)
+        if self._blueprint_expiry is not None and bot_id in self._blueprints:
+            self._blueprint_expiry.touch(bot_id, now)
+
+    def _forget_session_locked(self, bot_id: str, session_id: str) -> None:
+        if self._session_expiry is not None:
+            self._session_expiry.discard((bot_id, session_id))
+
+    def _put_blueprint_locked(self, blueprint: BotBlueprint, now: float) -> None:
+        self._blueprints[blueprint.bot_id] = blueprint
+        self._history.setdefault(blueprint.bot_id, OrderedDict())
+        self._touch_locked(blueprint.bot_id, None, now)
+
+    def _assign_session_locked(self, bot_id: str, session_id: str, now: float) -> None:
+        previous_bot = self._session_map.get(session_id)
+        if previous_bot and previous_bot in self._history:
+            self._release_turns_locked(previous_bot, session_id, self._history[previous_bot].pop(session_id, None))
+            self._forget_session_locked(previous_bot, session_id)
+        self._session_map[session_id] = bot_id
+        bot_sessions = self._history.setdefault(bot_id, OrderedDict())
+        if session_id in bot_sessions:
+            bot_sessions.move_to_end(session_id)
+            if (bot_id, session_id) in self._resident:
+                self._resident.move_to_end((bot_id, session_id))
+        else:
+            bot_sessions[session_id] = EMPTY_HISTORY
+            self._account_locked(bot_id, session_id, EMPTY_HISTORY)
+        self._touch_locked(bot_id, session_id, now)
+        self._trim_sessions_for_bot(bot_id)
+
+    def _reset_history_locked(self, bot_id: str) -> None:
+        if bot_id in self._history:
+            for session_id, turns in self._history[bot_id].items():
+                self._release_turns_locked(bot_id, session_id, turns)
+            self._history[bot_id] = OrderedDict()
+
+    def _append_turn_locked(self, bot_id: str, session_id: str, turn: ChatTurn, now: float) -> None:
+        bot_sessions = self._history.setdefault(bot_id, OrderedDict())
+        turns = self._loaded_turns_locked(bot_id, session_id)
+        turns = turns.appended(turn, limit=self._max_turns_per_session)
+        bot_sessions[session_id] = turns
+        bot_sessions.move_to_end(session_id)
+        self._account_locked(bot_id, session_id, turns)
+        self._touch_locked(bot_id, session_id, now)
+
+    def _expire_locked(self, sessions: List[tuple[str, str]], bots: List[str]) -> None:
+        for bot_id, session_id in sessions:
+            bot_sessions = self._history.get(bot_id)
+            if bot_sessions is not None:
+                self._release_turns_locked(bot_id, session_id, bot_sessions.pop(session_id, None))
+            if self._session_map.get(session_id) == bot_id:
+                del self._session_map[session_id]
+            self._forget_session_locked(bot_id, session_id)
+        for bot_id in bots:
+            self._blueprints.pop(bot_id, None)
+            if not self._history.get(bot_id):
+                self._history.pop(bot_id, None)
+            if self._blueprint_expiry is not None:
+                self._blueprint_expiry.discard(bot_id)
+
     def _trim_sessions_for_bot(self, bot_id: str) -> None:
         bot_sessions = self._history.get(bot_id)
         if not bot_sessions:
             return
         while len(bot_sessions) > self._max_sessions_per_bot:
-            oldest_session_id, _ = bot_sessions.popitem(last=False)
+            oldest_session_id, turns = bot_sessions.popitem(last=False)
+            self._release_turns_locked(bot_id, oldest_session_id, turns)
             self._session_map.pop(oldest_session_id, None)
+            self._forget_session_locked(bot_id, oldest_session_id)
+
+    # ------------------------------------------------------------------
+    # Memory budget
+    # ------------------------------------------------------------------
+    def _account_locked(self, bot_id: str, session_id: str, turns: TurnHistory | _DeferredTurns) -> None:
+        key = (bot_id, session_id)
+        self._bytes_in_use -= self._resident.pop(key, 0)
+        if isinstance(turns, TurnHistory):
+            self._resident[key] = turns.nbytes
+            self._bytes_in_use += turns.nbytes
+
+    def _release_turns_locked(
+        self, bot_id: str, session_id: str, turns: TurnHistory | _DeferredTurns | None
+    ) -> None:
+        """Stop accounting for a session that left ``_history``."""
+        self._bytes_in_use -= self._resident.pop((bot_id, session_id), 0)
+        if isinstance(turns, _SpilledTurns):
+            self._spill_garbage.append(turns.path)
+
+    def _over_budget_locked(self) -> List[tuple[str, str, TurnHistory]]:
+        """Pick least recently used sessions until the budget holds; the most recent one always stays.
+
+        Memory-only stores have nowhere to put them, so they are dropped here. File-backed
+        stores return them for ``_evict`` to spill outside the lock.
+        """
+        victims: List[tuple[str, str, TurnHistory]] = []
+        if not self._max_bytes:
+            return victims
+        while self._bytes_in_use > self._max_bytes and len(self._resident) > 1:
+            (bot_id, session_id), nbytes = self._resident.popitem(last=False)
+            self._bytes_in_use -= nbytes
+            self._memory_stats["evictions"] += 1
+            bot_sessions = self._history.get(bot_id, {})
+            turns = bot_sessions.get(session_id)
+            if not isinstance(turns, TurnHistory):
+                continue
+            if self._spill_dir is None:
+                del bot_sessions[session_id]
+                if self._session_map.get(session_id) == bot_id:
+                    del self._session_map[session_id]
+                self._forget_session_locked(bot_id, session_id)
+                self._memory_stats["dropped"] += 1
+            else:
+                victims.append((bot_id, session_id, turns))
+        return victims
+
+    def _evict(self, victims: List[tuple[str, str, TurnHistory]]) -> None:
+        """Write evicted sessions to spill files, then swap them for ``_SpilledTurns`` markers.
+
+        A session written to meanwhile keeps its new turns; its spill file is discarded.
+        """
+        if not victims:
+            return
+        assert self._spill_dir is not None
+        self._spill_dir.mkdir(parents=True, exist_ok=True)
+        spilled = []
+        for bot_id, session_id, turns in victims:
+            path = self._spill_dir / f"{uuid.uuid4().hex}.json"
+            with path.open("w", encoding="utf-8") as handle:
+                handle.write(json.dumps(turns.to_raw(), ensure_ascii=False))
+                handle.flush()
+                os.fsync(handle.fileno())
+            spilled.append((bot_id, session_id, turns, path))
+        stale: List[Path] = []
+        with self._lock:
+            for bot_id, session_id, turns, path in spilled:
+                bot_sessions = self._history.get(bot_id, {})
+                if bot_sessions.get(session_id) is turns and (bot_id, session_id) not in self._resident:
+                    bot_sessions[session_id] = _SpilledTurns(path, len(turns))
+                    self._memory_stats["spilled"] += 1
+                else:
+                    stale.append(path)
+        self._remove_spill_files(stale)
+
+    def _remove_orphaned_spill_files(self) -> int:
+        # Sessions spilled after the last snapshot was written are unreachable after a restart.
+        if self._spill_dir is None or not self._spill_dir.is_dir():
+            return 0
+        referenced = set(self._spill_garbage)
+        for bot_sessions in self._history.values():
+            referenced.update(turns.path for turns in bot_sessions.values() if isinstance(turns, _SpilledTurns))
+        orphans = [path for path in self._spill_dir.glob("*.json") if path not in referenced]
+        self._remove_spill_files(orphans)
+        return len(orphans)
+
+    def _take_garbage_locked(self) -> List[Path]:
+        garbage, self._spill_garbage = self._spill_garbage, []
+        return garbage
+
+    @staticmethod
+    def _remove_spill_files(paths: List[Path]) -> None:
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+_SQLITE_OPTIONS = frozenset(
+    {
+        "max_sessions_per_bot",
+        "max_turns_per_session",
+        "session_ttl_seconds",
+        "blueprint_ttl_seconds",
+        "sweep_interval_seconds",
+    }
+)
+
+
+def create_store(storage_path: str | Path | None = None, **options: Any) -> JsonStore | SqliteStore:
+    """Pick the storage engine from ``STORE_PATH``: ``sqlite:///...`` URLs use SQLite, anything else JSON."""
+    path_value = storage_path if storage_path is not None else get_settings().store_path
+    if is_sqlite_url(path_value):
+        return SqliteStore(
+            str(path_value),
+            **{key: value for key, value in options.items() if key in _SQLITE_OPTIONS},
+        )
+    shared = options.pop("shared", None)
+    if get_settings().store_shared if shared is None else shared:
+        from app.services.shared_store import SharedJsonStore
+
+        return SharedJsonStore(path_value, **options)
+    return JsonStore(path_value, **options)
 
 
-store = JsonStore()
+store = create_store()
@@ -0,0 +1,131 @@
+"""Append-only journal used by the JSON store's log-structured mode."""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, TextIO
+
+JournalRecord = Dict[str, Any]
+
+
+def _encode(value: Any) -> Any:
+    dump = getattr(value, "model_dump", None)
+    if dump is None:
+        raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
+    return dump()
+
+
+def encode_record(record: JournalRecord) -> str:
+    """Serialize a record as one compact JSON line."""
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=_encode)
+
+
+class StoreJournal:
+    """Sequence of compact JSON records appended next to the store snapshot.
+
+    Compaction rotates the live file to ``<name>.1`` so new records keep flowing
+    while the snapshot is written; the rotated file is dropped once the snapshot
+    that covers it is on disk.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._rotated = path.with_name(path.name + ".1")
+        self._handle: TextIO | None = None
+        self._pending = 0
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def pending(self) -> int:
+        """Records appended since the last rotation."""
+        return self._pending
+
+    def replay(self, after_seq: int = 0) -> Iterator[JournalRecord]:
+        """Yield records newer than ``after_seq``, oldest first."""
+        self._pending = 0
+        for path in (self._rotated, self._path):
+            if not path.exists():
+                continue
+            with path.open("r", encoding="utf-8") as handle:
+                for line in handle:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn write from a crash; the record never completed.
+                        continue
+                    if record.get("seq", 0) > after_seq:
+                        self._pending += 1
+                        yield record
+
+    def append(self, records: Iterable[JournalRecord]) -> None:
+        lines: List[str] = [encode_record(record) + "\n" for record in records]
+        if not lines:
+            return
+        handle = self._open()
+        handle.write("".join(lines))
+        handle.flush()
+        self._pending += len(lines)
+
+    def sync(self) -> None:
+        """fsync whatever has been appended so far; safe to call without the store lock."""
+        handle = self._handle
+        if handle is None:
+            return
+        try:
+            os.fsync(handle.fileno())
+        except (OSError, ValueError):
+            # Rotated or closed concurrently; compaction fsyncs the snapshot that covers it.
+            pass
+
+    def rotate(self) -> None:
+        """Move the live journal aside so a snapshot can absorb it."""
+        self.close()
+        if not self._path.exists():
+            return
+        if self._rotated.exists():
+            # A previous compaction never finished: keep both generations in order.
+            with self._rotated.open("a", encoding="utf-8") as target:
+                target.write(self._path.read_text(encoding="utf-8"))
+            self._path.unlink()
+        else:
+            os.replace(self._path, self._rotated)
+        self._pending = 0
+
+    def discard_rotated(self) -> None:
+        try:
+            self._rotated.unlink()
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        self.close()
+        for path in (self._path, self._rotated):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        self._pending = 0
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def _open(self) -> TextIO:
+        if self._handle is None:
+            torn_tail = False
+            if self._path.exists() and self._path.stat().st_size:
+                with self._path.open("rb") as existing:
+                    existing.seek(-1, os.SEEK_END)
+                    torn_tail = existing.read(1) != b"\n"
+            self._handle = self._path.open("a", encoding="utf-8")
+            if torn_tail:
+                self._handle.write("\n")
+        return self._handle
@@ -0,0 +1,101 @@
+"""Compact, immutable storage for a session's chat turns."""
+from __future__ import annotations
+
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple, overload
+
+from app.models.bot import ChatTurn
+
+ROLES: Tuple[str, ...] = ("user", "assistant")
+_ROLE_CODES: Dict[str, int] = {role: code for code, role in enumerate(ROLES)}
+# Tuple slot plus role byte; the content string itself is measured with ``sys.getsizeof``.
+_TURN_OVERHEAD = 9
+
+
+def _turn_size(content: str) -> int:
+    return sys.getsizeof(content) + _TURN_OVERHEAD
+
+
+class TurnHistory(Sequence[ChatTurn]):
+    """Column-oriented turn list: one byte per role plus a tuple of contents.
+
+    Turns only become ``ChatTurn`` models when indexed or iterated, i.e. at the
+    API boundary. Instances never change; ``appended`` returns a new history, which
+    is what lets the store hand them to lock-free readers without copying.
+    """
+
+    __slots__ = ("_roles", "_contents", "_nbytes")
+
+    def __init__(self, roles: bytes = b"", contents: Tuple[str, ...] = (), nbytes: int | None = None) -> None:
+        if len(roles) != len(contents):
+            raise ValueError("roles and contents must have the same length")
+        self._roles = roles
+        self._contents = contents
+        self._nbytes = sum(_turn_size(content) for content in contents) if nbytes is None else nbytes
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size of the turns, used by the store's memory budget."""
+        return self._nbytes
+
+    @classmethod
+    def from_turns(cls, turns: Iterable[ChatTurn]) -> "TurnHistory":
+        roles = bytearray()
+        contents: List[str] = []
+        for turn in turns:
+            roles.append(_ROLE_CODES[turn.role])
+            contents.append(turn.content)
+        return cls(bytes(roles), tuple(contents))
+
+    @classmethod
+    def from_raw(cls, raw: Iterable[Dict[str, Any]]) -> "TurnHistory":
+        """Build from trusted ``{"role", "content"}`` dicts without model validation."""
+        rows = [(_ROLE_CODES[item["role"]], item["content"]) for item in raw]
+        return cls(bytes(code for code, _ in rows), tuple(content for _, content in rows))
+
+    def to_raw(self) -> List[Dict[str, str]]:
+        return [
+            {"role": ROLES[code], "content": content} for code, content in zip(self._roles, self._contents)
+        ]
+
+    def appended(self, turn: ChatTurn, *, limit: int | None = None) -> "TurnHistory":
+        roles = self._roles + bytes((_ROLE_CODES[turn.role],))
+        contents = self._contents + (turn.content,)
+        nbytes = self._nbytes + _turn_size(turn.content)
+        if limit is not None and len(contents) > limit:
+            nbytes -= sum(_turn_size(content) for content in contents[:-limit])
+            roles, contents = roles[-limit:], contents[-limit:]
+        return TurnHistory(roles, contents, nbytes)
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+    @overload
+    def __getitem__(self, index: int) -> ChatTurn: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "TurnHistory": ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TurnHistory(self._roles[index], self._contents[index])
+        return ChatTurn.model_construct(role=ROLES[self._roles[index]], content=self._contents[index])
+
+    def __iter__(self) -> Iterator[ChatTurn]:
+        for code, content in zip(self._roles, self._contents):
+            yield ChatTurn.model_construct(role=ROLES[code], content=content)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, TurnHistory):
+            return self._roles == other._roles and self._contents == other._contents
+        if isinstance(other, Sequence) and not isinstance(other, (str, bytes)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"TurnHistory({self.to_raw()!r})"
+
+
+EMPTY_HISTORY = TurnHistory()
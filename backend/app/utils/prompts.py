@@ -1,9 +1,10 @@
 """Prompt templates for the Bot Factory flows."""
 from __future__ import annotations
 
-from typing import Iterable
+from typing import Iterable, List, Sequence
 
 from app.models.bot import BotBlueprint, ChatTurn
+from app.utils.tokens import estimate_text_tokens
 
 
 BLUEPRINT_PROMPT_TEMPLATE = """You are an expert AI product designer.
@@ -37,7 +38,7 @@ Language: {language}
 
 System instructions:
 {system_prompt}
-
+{knowledge}
 Conversation so far:
 {history}
 
@@ -57,16 +58,54 @@ def build_blueprint_prompt(**kwargs: str) -> str:
     return BLUEPRINT_PROMPT_TEMPLATE.format(**kwargs)
 
 
+def _format_turn(bot: BotBlueprint, turn: ChatTurn) -> str:
+    speaker = "User" if turn.role == "user" else bot.bot_name
+    return f"{speaker}: {turn.content}"
+
+
 def _format_history(bot: BotBlueprint, turns: Iterable[ChatTurn]) -> str:
-    rendered = []
-    for turn in turns:
-        speaker = "User" if turn.role == "user" else bot.bot_name
-        rendered.append(f"{speaker}: {turn.content}")
+    rendered = [_format_turn(bot, turn) for turn in turns]
     return "\n".join(rendered) if rendered else "(no previous messages)"
 
 
-def build_playground_prompt(bot: BotBlueprint, turns: Iterable[ChatTurn], user_message: str) -> str:
-    """Create the full prompt for the Playground chat call."""
+def window_turns(
+    bot: BotBlueprint,
+    turns: Sequence[ChatTurn],
+    user_message: str,
+    knowledge: Sequence[str] = (),
+    max_tokens: int = 0,
+) -> List[ChatTurn]:
+    """The newest ``turns`` that keep the Playground prompt within ``max_tokens`` (``0``: all of them).
+
+    The persona header, the knowledge and the latest message are always kept,
+    so a prompt may exceed the budget on its own; older turns go first.
+    """
+    if max_tokens <= 0:
+        return list(turns)
+    budget = max_tokens - estimate_text_tokens(build_playground_prompt(bot, [], user_message, knowledge))
+    kept = 0
+    for turn in reversed(turns):
+        budget -= estimate_text_tokens(_format_turn(bot, turn)) + 1  # +1 for the line break
+        if budget < 0:
+            break
+        kept += 1
+    return list(turns[len(turns) - kept:])
+
+
+def _format_knowledge(entries: Sequence[str]) -> str:
+    if not entries:
+        return ""
+    return "\nRelevant knowledge:\n" + "\n".join(f"- {entry}" for entry in entries) + "\n"
+
+
+def build_playground_prompt(
+    bot: BotBlueprint, turns: Iterable[ChatTurn], user_message: str, knowledge: Sequence[str] = ()
+) -> str:
+    """Create the full prompt for the Playground chat call.
+
+    ``knowledge`` holds the ``knowledge_base`` entries picked for this turn; the section is omitted when empty.
+    ``turns`` are rendered as given; use ``window_turns`` to fit them into a token budget first.
+    """
     history = _format_history(bot, turns)
     return PLAYGROUND_PROMPT_TEMPLATE.format(
         bot_name=bot.bot_name,
@@ -74,6 +113,7 @@ def build_playground_prompt(bot: BotBlueprint, turns: Iterable[ChatTurn], user_m
         tone=bot.tone,
         language=bot.language,
         system_prompt=bot.system_prompt,
+        knowledge=_format_knowledge(knowledge),
         history=history,
         user_message=user_message,
     )
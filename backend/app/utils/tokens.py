@@ -0,0 +1,33 @@
+"""Cheap local token estimates for Gemini contents (no API round trip)."""
+from __future__ import annotations
+
+import math
+from typing import Any
+
+# Gemini tokenizers average roughly four characters per token on English prose.
+CHARS_PER_TOKEN = 4
+# Role markers and turn separators the model sees around every content entry.
+_PER_ENTRY_OVERHEAD = 4
+
+
+def estimate_text_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def estimate_tokens(contents: Any) -> int:
+    """Approximate prompt size of ``contents`` as accepted by ``generate_content``.
+
+    Handles a plain string, a list of strings, or a list of
+    ``{"role", "parts": [{"text"}]}`` dicts; anything else counts as zero.
+    """
+    if isinstance(contents, str):
+        return estimate_text_tokens(contents)
+    if isinstance(contents, dict):
+        parts = contents.get("parts") or ()
+        return _PER_ENTRY_OVERHEAD + sum(
+            estimate_text_tokens(part.get("text") or "") if isinstance(part, dict) else estimate_tokens(part)
+            for part in parts
+        )
+    if isinstance(contents, (list, tuple)):
+        return sum(estimate_tokens(item) for item in contents)
+    return 0
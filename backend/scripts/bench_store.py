@@ -0,0 +1,93 @@
+"""Contention benchmark for the store engines.
+
+Runs N threads against one store, each owning its own bot, and reports read
+and write throughput. Example::
+
+    python scripts/bench_store.py --threads 8 --ops 2000 --store-path /tmp/bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.models.bot import BotBlueprint, ChatTurn  # noqa: E402
+from app.services.store import create_store  # noqa: E402
+
+
+def _blueprint(bot_id: str) -> BotBlueprint:
+    return BotBlueprint(
+        bot_id=bot_id,
+        bot_name=f"Bench {bot_id}",
+        tagline="Benchmark bot",
+        tone="neutral",
+        language="en",
+        knowledge_base=[],
+        system_prompt="Answer briefly.",
+        sample_questions=[],
+        sample_responses=[],
+    )
+
+
+def _worker(store, bot_id: str, ops: int, write_every: int, barrier: threading.Barrier, counts: dict) -> None:
+    session_id = f"{bot_id}-session"
+    store.save_blueprint(_blueprint(bot_id))
+    store.assign_session(bot_id, session_id)
+    turn = ChatTurn(role="user", content="How long does delivery take?")
+    reads = writes = 0
+    barrier.wait()
+    for index in range(ops):
+        if index % write_every == 0:
+            store.append_turn(bot_id, session_id, turn)
+            writes += 1
+        else:
+            store.get_blueprint(bot_id)
+            store.get_history(bot_id, session_id)
+            reads += 1
+    counts[bot_id] = (reads, writes)
+
+
+def run(threads: int, ops: int, write_every: int, store_path: str, durability: str) -> None:
+    options = {} if store_path.startswith("sqlite:///") else {"durability": durability}
+    store = create_store(store_path, **options)
+    barrier = threading.Barrier(threads + 1)
+    counts: dict = {}
+    workers = [
+        threading.Thread(target=_worker, args=(store, f"bot-{index}", ops, write_every, barrier, counts))
+        for index in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    store.close()
+
+    reads = sum(count[0] for count in counts.values())
+    writes = sum(count[1] for count in counts.values())
+    print(f"store={store_path} durability={durability} threads={threads} ops/thread={ops}")
+    print(f"elapsed={elapsed:.3f}s reads/s={reads / elapsed:,.0f} writes/s={writes / elapsed:,.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=1000, help="operations per thread")
+    parser.add_argument("--write-every", type=int, default=10, help="one append_turn every N operations")
+    parser.add_argument("--store-path", default=None, help="JSON path, :memory: or sqlite:/// URL")
+    parser.add_argument("--durability", default="always", choices=["always", "batch", "none"])
+    args = parser.parse_args()
+
+    store_path = args.store_path or str(Path(tempfile.mkdtemp()) / "bench-store.json")
+    run(args.threads, args.ops, args.write_every, store_path, args.durability)
+
+
+if __name__ == "__main__":
+    main()
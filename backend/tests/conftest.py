@@ -2,15 +2,32 @@ import os
 
 import pytest
 
-from app.services.store import store
-
-# Ensure the JSON store stays in-memory during automated tests
+# Keep the JSON store and the blueprint cache in memory during automated tests.
+# Set before importing ``app``: the module-level singletons read them at import time.
 os.environ.setdefault("STORE_PATH", ":memory:")
+os.environ["BLUEPRINT_CACHE_PATH"] = ":memory:"
+
+from app.services.answer_cache import answer_cache
+from app.services.blueprint_cache import blueprint_cache
+from app.services.knowledge_index import knowledge_index
+from app.services.prompt_budget import prompt_budget
+from app.services.semantic_cache import semantic_cache
+from app.services.store import store
 
 
 @pytest.fixture(autouse=True)
 def reset_store():
-	"""Guarantee every test starts with a clean store."""
+	"""Guarantee every test starts with a clean store and caches."""
 	store.clear()
+	blueprint_cache.clear()
+	answer_cache.clear()
+	semantic_cache.clear()
+	knowledge_index.clear()
+	prompt_budget.reset()
 	yield
 	store.clear()
+	blueprint_cache.clear()
+	answer_cache.clear()
+	semantic_cache.clear()
+	knowledge_index.clear()
+	prompt_budget.reset()
@@ -1,3 +1,4 @@
+import asyncio
 from types import SimpleNamespace
 
 import pytest
@@ -51,4 +52,19 @@ def test_generate_ai_reply_with_context_rolls_back_on_error(monkeypatch):
     result = ai_service.generate_ai_reply_with_context("session-err", "Hi")
 
     assert result.startswith("Error: boom")
-    assert ai_service.chat_sessions["session-err"] == []
\ No newline at end of file
+    assert ai_service.chat_sessions["session-err"] == []
+
+def test_generate_ai_reply_with_context_async_records_exchange_on_success(monkeypatch):
+    seen = []
+
+    async def _generate(history, **_):
+        seen.append(list(history))
+        return SimpleNamespace(text="async response"), "model"
+
+    monkeypatch.setattr(ai_service, "generate_with_fallback_async", _generate)
+
+    reply = asyncio.run(ai_service.generate_ai_reply_with_context_async("session-async", "Hi"))
+
+    assert reply == "async response"
+    assert [entry["parts"][0]["text"] for entry in seen[0]] == ["Hi"]
+    assert [entry["role"] for entry in ai_service.chat_sessions["session-async"]] == ["user", "model"]
@@ -0,0 +1,44 @@
+from app.models.bot import BotBlueprint
+from app.services.answer_cache import AnswerCache, normalize_question
+
+
+def _blueprint(bot_id: str = "bot-1") -> BotBlueprint:
+    return BotBlueprint(
+        bot_id=bot_id,
+        bot_name="Cafe Helper",
+        tagline="Coffee questions",
+        tone="friendly",
+        language="en",
+        knowledge_base=[],
+        system_prompt="Help",
+        sample_questions=["What are your opening hours?", "Do you have Wi-Fi?"],
+        sample_responses=["8 to 20, every day.", "Yes, it is free."],
+    )
+
+
+def test_normalize_question_ignores_case_accents_and_punctuation():
+    assert normalize_question("  Do you have WI-FI?? ") == "do you have wi fi"
+    assert normalize_question("Café  crème!") == normalize_question("cafe creme")
+    assert normalize_question("שָׁלוֹם") == "שלום"
+
+
+def test_lookup_serves_samples_and_evicts_least_recently_used_bot():
+    cache = AnswerCache(max_bots=1)
+
+    assert cache.lookup(_blueprint(), "what are your opening hours") == "8 to 20, every day."
+    assert cache.lookup(_blueprint(), "Can I bring my dog?") is None
+    assert cache.store("bot-1", "Do you have wifi", "Yes.") is True
+
+    cache.populate(_blueprint("bot-2"))
+    assert cache.store("bot-1", "Do you have wifi", "Yes.") is False
+    assert cache.stats() == {
+        "enabled": True,
+        "bots": 1,
+        "max_bots": 1,
+        "answers": 2,
+        "hit_rate": 0.5,
+        "hits": 1,
+        "misses": 1,
+        "prewarmed": 1,
+    }
+    assert AnswerCache(max_bots=0).lookup(_blueprint(), "Do you have Wi-Fi?") is None
@@ -0,0 +1,31 @@
+from app.services.blueprint_cache import BlueprintCache
+
+
+def _cache(path=":memory:", **overrides) -> BlueprintCache:
+    options = {"models": ["gemini-pro", "gemini-flash"], "max_entries": 2, "ttl_seconds": 60} | overrides
+    return BlueprintCache(path, **options)
+
+
+def test_lookup_tries_configured_models_and_evicts_least_recent() -> None:
+    cache = _cache()
+    cache.put("prompt-a", "gemini-flash", {"bot_name": "A"}, now=0)
+    cache.put("prompt-b", "gemini-pro", {"bot_name": "B"}, now=0)
+
+    assert cache.get("prompt-a", now=1) == ({"bot_name": "A"}, "gemini-flash")
+    cache.put("prompt-c", "gemini-pro", {"bot_name": "C"}, now=2)  # evicts prompt-b, the least recently used
+
+    assert cache.get("prompt-b", now=3) is None
+    assert cache.get("prompt-c", now=3) == ({"bot_name": "C"}, "gemini-pro")
+    assert cache.get("prompt-a", now=61) is None  # expired
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["evicted"]) == (2, 2, 1, 1)
+    assert stats["entries"] == 1
+
+
+def test_entries_survive_a_restart(tmp_path) -> None:
+    path = tmp_path / "blueprint_cache.json"
+    _cache(path).put("prompt", "gemini-pro", {"bot_name": "Saved"})
+
+    assert _cache(path).get("prompt") == ({"bot_name": "Saved"}, "gemini-pro")
+    assert _cache(path, models=["gemini-flash"]).get("prompt") is None
+    assert _cache(path, ttl_seconds=0, max_entries=0).get("prompt") is None
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from types import SimpleNamespace
 
@@ -37,7 +38,7 @@ def test_create_bot_blueprint_persists_and_returns(monkeypatch):
     }
     fake_response = SimpleNamespace(text=json.dumps(payload))
 
-    monkeypatch.setattr(blueprint_service, "generate_with_fallback", lambda prompt: (fake_response, "model"))
+    monkeypatch.setattr(blueprint_service, "generate_with_fallback", lambda prompt, **_: (fake_response, "model"))
 
     saved = []
     resets = []
@@ -53,7 +54,7 @@ def test_create_bot_blueprint_persists_and_returns(monkeypatch):
 
 def test_create_bot_blueprint_raises_on_invalid_json(monkeypatch):
     fake_response = SimpleNamespace(text="not json")
-    monkeypatch.setattr(blueprint_service, "generate_with_fallback", lambda prompt: (fake_response, "model"))
+    monkeypatch.setattr(blueprint_service, "generate_with_fallback", lambda prompt, **_: (fake_response, "model"))
 
     with pytest.raises(AIServiceError, match="valid JSON"):
         blueprint_service.create_bot_blueprint(_make_request())
@@ -64,3 +65,38 @@ def test_create_bot_blueprint_requires_api_key(monkeypatch):
 
     with pytest.raises(MissingConfigurationError):
         blueprint_service.create_bot_blueprint(_make_request())
+
+
+def test_create_bot_blueprint_async_persists(monkeypatch):
+    fake_response = SimpleNamespace(text=json.dumps({"bot_name": "Async Guru"}))
+
+    async def _generate(prompt, **_):
+        return fake_response, "model"
+
+    monkeypatch.setattr(blueprint_service, "generate_with_fallback_async", _generate)
+
+    blueprint = asyncio.run(blueprint_service.create_bot_blueprint_async(_make_request(), "sess-async"))
+
+    assert blueprint.bot_name == "Async Guru"
+    assert blueprint_service.store.get_session_state("sess-async") == (blueprint, [])
+
+
+def test_identical_answers_reuse_the_cached_blueprint_with_a_new_bot_id(monkeypatch):
+    calls = []
+
+    def _generate(prompt, **_):
+        calls.append(prompt)
+        return SimpleNamespace(text=json.dumps({"bot_name": "Cached Guru"})), "gemini-flash-latest"
+
+    monkeypatch.setattr(blueprint_service, "generate_with_fallback", _generate)
+
+    first = blueprint_service.create_bot_blueprint(_make_request())
+    second = blueprint_service.create_bot_blueprint(_make_request(), "sess-2")
+    third = blueprint_service.create_bot_blueprint(_make_request(), use_cache=False)
+
+    assert len(calls) == 2
+    assert first.bot_name == second.bot_name == third.bot_name == "Cached Guru"
+    assert len({first.bot_id, second.bot_id, third.bot_id}) == 3
+    assert blueprint_service.store.get_session_state("sess-2") == (second, [])
+    stats = blueprint_service.blueprint_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["bypassed"]) == (1, 1, 1)
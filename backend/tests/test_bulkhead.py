@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.bulkhead import Bulkhead
+from app.services.deadline import Deadline
+from app.services.exceptions import BulkheadFullError, DeadlineExceededError
+
+
+def _bulkhead(**overrides) -> Bulkhead:
+    options = {"max_concurrent": 1, "max_queue": 1, "max_wait_seconds": 5.0} | overrides
+    return Bulkhead("interactive", **options)
+
+
+def test_queued_caller_gets_the_released_slot_and_overflow_is_rejected() -> None:
+    bulkhead = _bulkhead()
+    entered = threading.Event()
+    order = []
+
+    def _waiting_call() -> None:
+        with bulkhead.slot():
+            order.append("queued")
+        entered.set()
+
+    with bulkhead.slot():
+        worker = threading.Thread(target=_waiting_call)
+        worker.start()
+        while bulkhead.snapshot()["queue_depth"] == 0:
+            pass
+        with pytest.raises(BulkheadFullError) as excinfo:
+            bulkhead.check()
+        assert excinfo.value.retry_after >= 1
+        order.append("first")
+
+    assert entered.wait(2)
+    worker.join()
+    assert order == ["first", "queued"]
+    snapshot = bulkhead.snapshot()
+    assert (snapshot["in_flight"], snapshot["queue_depth"]) == (0, 0)
+    assert (snapshot["admitted"], snapshot["queued"], snapshot["rejected"]) == (2, 1, 1)
+
+
+def test_projected_wait_past_deadline_rejects_up_front() -> None:
+    bulkhead = _bulkhead(max_queue=10, max_wait_seconds=1.0)
+    bulkhead._hold_ewma = 3.0
+
+    with bulkhead.slot():
+        with pytest.raises(BulkheadFullError) as excinfo:
+            bulkhead.check()
+
+    assert excinfo.value.retry_after == 3
+
+
+def test_async_waiter_times_out_and_leaves_the_queue() -> None:
+    bulkhead = _bulkhead(max_wait_seconds=0.05)
+
+    async def _scenario():
+        async with bulkhead.slot_async():
+            with pytest.raises(BulkheadFullError, match="Timed out"):
+                async with bulkhead.slot_async():
+                    pass
+        async with bulkhead.slot_async():
+            return bulkhead.snapshot()
+
+    snapshot = asyncio.run(_scenario())
+
+    assert (snapshot["in_flight"], snapshot["queue_depth"], snapshot["timed_out"]) == (1, 0, 1)
+
+
+def test_queue_wait_is_bounded_by_the_request_deadline() -> None:
+    bulkhead = _bulkhead(max_wait_seconds=3.0)
+
+    async def _scenario():
+        async with bulkhead.slot_async():
+            started = time.monotonic()
+            with pytest.raises(DeadlineExceededError):
+                async with bulkhead.slot_async(Deadline(0.05)):
+                    pass
+            return time.monotonic() - started
+
+    assert asyncio.run(_scenario()) < 1.0
+
+    with bulkhead.slot():
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceededError):
+            with bulkhead.slot(Deadline(0.05)):
+                pass
+        assert time.monotonic() - started < 1.0
+
+    snapshot = bulkhead.snapshot()
+    assert (snapshot["queue_depth"], snapshot["timed_out"], snapshot["deadline_exceeded"]) == (0, 0, 2)
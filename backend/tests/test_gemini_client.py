@@ -1,17 +1,38 @@
+import asyncio
+import threading
+import time
 from types import SimpleNamespace
 
 import pytest
 from google.api_core import exceptions as google_exceptions
 
 from app.services import gemini_client
-from app.services.exceptions import MissingConfigurationError
+from app.services.deadline import Deadline
+from app.services.exceptions import (
+    DeadlineExceededError,
+    MissingConfigurationError,
+    ModelsUnavailableError,
+    RateLimitedError,
+)
+from app.services.model_router import ModelRouter
+from app.services.rate_limits import ModelRateLimiter
+from app.services.retry_policy import RetryPolicy
+from app.services.single_flight import SingleFlight
 
 
 @pytest.fixture(autouse=True)
 def reset_client():
     gemini_client._client = None
+    gemini_client.health_registry.reset()
+    gemini_client.model_router.reset()
+    gemini_client.hedge_policy.reset()
+    gemini_client.rate_limiter.reset()
+    gemini_client.retry_policy.reset()
+    gemini_client.single_flight.reset()
     yield
     gemini_client._client = None
+    gemini_client.health_registry.reset()
+    gemini_client.model_router.reset()
 
 
 def _stub_settings(models, api_key="test-key"):
@@ -79,3 +100,470 @@ def test_generate_with_fallback_raises_when_no_models(monkeypatch):
 
     with pytest.raises(MissingConfigurationError, match="No Gemini models"):
         gemini_client.generate_with_fallback("prompt")
+
+
+def test_generate_with_fallback_async_uses_aio_client(monkeypatch):
+    class FakeAsyncModels:
+        def __init__(self):
+            self.calls = []
+
+        async def generate_content(self, model, contents):
+            self.calls.append(model)
+            if model == "gemini-a":
+                raise google_exceptions.ResourceExhausted("quota")
+            return SimpleNamespace(text="async")
+
+    fake_client = SimpleNamespace(aio=SimpleNamespace(models=FakeAsyncModels()))
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: fake_client)
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a", "gemini-b"]))
+
+    response, used_model = asyncio.run(gemini_client.generate_with_fallback_async("hello"))
+
+    assert response.text == "async"
+    assert used_model == "gemini-b"
+    assert fake_client.aio.models.calls == ["gemini-a", "gemini-b"]
+
+
+def test_stream_with_fallback_switches_models_before_first_chunk(monkeypatch):
+    async def _chunks(*texts):
+        for text in texts:
+            yield SimpleNamespace(text=text)
+
+    class FakeAsyncModels:
+        async def generate_content_stream(self, model, contents):
+            if model == "gemini-a":
+                raise google_exceptions.ResourceExhausted("quota")
+            return _chunks("Hel", None, "lo")
+
+    fake_client = SimpleNamespace(aio=SimpleNamespace(models=FakeAsyncModels()))
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: fake_client)
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a", "gemini-b"]))
+
+    async def _collect():
+        return [chunk async for chunk in gemini_client.stream_with_fallback("hello")]
+
+    assert asyncio.run(_collect()) == ["Hel", "lo"]
+
+
+def test_open_breaker_skips_model_until_half_open_probe(monkeypatch):
+    class FakeModels:
+        def __init__(self):
+            self.calls = []
+
+        def generate_content(self, model, contents):
+            self.calls.append(model)
+            if model == "gemini-a" and len(self.calls) == 1:
+                raise google_exceptions.ResourceExhausted("quota")
+            return SimpleNamespace(text=model)
+
+    fake_client = SimpleNamespace(models=FakeModels())
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: fake_client)
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a", "gemini-b"]))
+
+    gemini_client.generate_with_fallback("one")
+    gemini_client.generate_with_fallback("two")
+    assert fake_client.models.calls == ["gemini-a", "gemini-b", "gemini-b"]
+    assert gemini_client.health_registry.state("gemini-a") == "open"
+
+    # Once the cooldown elapsed, the next request probes gemini-a again and closes the breaker.
+    gemini_client.health_registry._breakers["gemini-a"].opened_at -= 3600
+    _, used_model = gemini_client.generate_with_fallback("three")
+
+    assert used_model == "gemini-a"
+    breakers = gemini_client.stats()["breakers"]
+    assert breakers["models"]["gemini-a"] == {"state": "closed", "failures": 1, "trips": 1}
+    assert [(t["from"], t["to"]) for t in breakers["transitions"]] == [
+        ("closed", "open"),
+        ("open", "half_open"),
+        ("half_open", "closed"),
+    ]
+
+
+def test_all_models_cooling_down_fails_fast(monkeypatch):
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(models=None))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a"]))
+    gemini_client.health_registry.record_quota_error("gemini-a")
+
+    with pytest.raises(ModelsUnavailableError, match="gemini-a"):
+        gemini_client.generate_with_fallback("prompt")
+
+
+def test_adaptive_router_orders_by_expected_latency():
+    router = ModelRouter("adaptive", alpha=0.5, weights={"gemini-c": 4.0})
+    router.observe("gemini-a", 2.0, ok=True, now=1000)
+    router.observe("gemini-b", 0.5, ok=True, now=1000)
+    router.observe("gemini-c", 1.2, ok=True, now=1000)
+    # Half of gemini-b's recent calls failed, doubling its expected latency to 1.0s.
+    router.observe("gemini-b", 0.5, ok=False, now=1000)
+
+    trace = router.plan(["gemini-a", "gemini-b", "gemini-c", "gemini-new"], now=1001)
+
+    # Unmeasured models go first so they get measured; gemini-c's weight makes it 0.3s.
+    assert trace.order == ["gemini-new", "gemini-c", "gemini-b", "gemini-a"]
+    assert [item["score"] for item in trace.candidates] == [None, 0.3, 1.0, 2.0]
+
+
+def test_static_routing_keeps_order_and_records_trace(monkeypatch):
+    class FakeModels:
+        def generate_content(self, model, contents):
+            if model == "gemini-a":
+                raise google_exceptions.ResourceExhausted("quota")
+            return SimpleNamespace(text="ok")
+
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(models=FakeModels()))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a", "gemini-b"]))
+
+    gemini_client.generate_with_fallback("prompt")
+
+    routing = gemini_client.stats()["routing"]
+    trace = routing["recent"][-1]
+    assert trace["mode"] == "static"
+    assert trace["order"] == ["gemini-a", "gemini-b"]
+    assert [(a["model"], a["outcome"]) for a in trace["attempts"]] == [("gemini-a", "quota"), ("gemini-b", "ok")]
+    assert trace["chosen"] == "gemini-b"
+    assert routing["models"]["gemini-a"]["error_rate"] == 1.0
+    assert routing["models"]["gemini-b"]["samples"] == 1
+
+
+class _SlowPrimaryModels:
+    def __init__(self):
+        self.cancelled = []
+
+    async def generate_content(self, model, contents):
+        try:
+            await asyncio.sleep(5 if model == "gemini-a" else 0)
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        return SimpleNamespace(text=model)
+
+
+def _hedging_setup(monkeypatch, max_fraction):
+    models = _SlowPrimaryModels()
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=models)))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a", "gemini-b"]))
+    monkeypatch.setattr(gemini_client.hedge_policy, "percentile", 90)
+    monkeypatch.setattr(gemini_client.hedge_policy, "max_fraction", max_fraction)
+    for _ in range(20):
+        gemini_client.model_router.observe("gemini-a", 0.01, ok=True)
+    return models
+
+
+def test_hedged_request_races_next_model_and_cancels_loser(monkeypatch):
+    models = _hedging_setup(monkeypatch, max_fraction=1.0)
+
+    response, used_model = asyncio.run(gemini_client.generate_with_fallback_async("prompt"))
+
+    assert (response.text, used_model) == ("gemini-b", "gemini-b")
+    assert models.cancelled == ["gemini-a"]
+    hedging = gemini_client.stats()["hedging"]
+    assert (hedging["requests"], hedging["hedged"], hedging["hedge_wins"]) == (1, 1, 1)
+    trace = gemini_client.stats()["routing"]["recent"][-1]
+    assert [(a["model"], a["outcome"]) for a in trace["attempts"]] == [("gemini-b", "ok"), ("gemini-a", "cancelled")]
+
+
+def test_hedges_are_capped_by_traffic_fraction(monkeypatch):
+    _hedging_setup(monkeypatch, max_fraction=0.5)
+
+    async def _run():
+        # The first request has only earned half a hedge, so it waits for the primary.
+        return await asyncio.wait_for(gemini_client.generate_with_fallback_async("prompt"), timeout=0.5)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(_run())
+    assert gemini_client.stats()["hedging"]["denied"] == 1
+
+
+def test_hedge_credit_is_kept_when_no_other_model_is_left(monkeypatch):
+    class _OnlyModel:
+        async def generate_content(self, model, contents):
+            await asyncio.sleep(0.05)
+            return SimpleNamespace(text=model)
+
+    _hedging_setup(monkeypatch, max_fraction=1.0)
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=_OnlyModel())))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a"]))
+
+    _, used_model = asyncio.run(gemini_client.generate_with_fallback_async("prompt"))
+
+    assert used_model == "gemini-a"
+    hedging = gemini_client.stats()["hedging"]
+    assert (hedging["requests"], hedging["hedged"], hedging["credit"]) == (1, 0, 1.0)
+
+
+class _UsageModels:
+    def __init__(self):
+        self.calls = []
+
+    def generate_content(self, model, contents):
+        self.calls.append(model)
+        return SimpleNamespace(text=model, usage_metadata=SimpleNamespace(total_token_count=40))
+
+
+def test_model_out_of_budget_is_skipped_for_the_next_candidate(monkeypatch):
+    models = _UsageModels()
+    limiter = ModelRateLimiter({"gemini-a": 1}, {"gemini-b": 100})
+    monkeypatch.setattr(gemini_client, "rate_limiter", limiter)
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(models=models))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a", "gemini-b"]))
+
+    assert gemini_client.generate_with_fallback("x" * 40)[1] == "gemini-a"
+    assert gemini_client.generate_with_fallback("x" * 40)[1] == "gemini-b"
+
+    assert models.calls == ["gemini-a", "gemini-b"]
+    trace = gemini_client.stats()["routing"]["recent"][-1]
+    assert [(a["model"], a["outcome"]) for a in trace["attempts"]] == [("gemini-a", "rate_limited"), ("gemini-b", "ok")]
+    budgets = gemini_client.stats()["rate_limits"]["models"]
+    assert budgets["gemini-a"]["requests_remaining"] == 0
+    # The 10-token estimate was replaced by the 40 tokens Gemini reported.
+    assert budgets["gemini-b"]["tokens_remaining"] == 60
+
+
+def test_exhausted_budgets_wait_briefly_then_fail_with_retry_after(monkeypatch):
+    models = _UsageModels()
+    limiter = ModelRateLimiter({"*": 600}, max_wait_seconds=0.2)
+    monkeypatch.setattr(gemini_client, "rate_limiter", limiter)
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(models=models))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a"]))
+    for _ in range(600):
+        limiter.acquire("gemini-a", 0, max_wait=60)
+
+    # One request frees up every 0.1s, which is within the wait budget.
+    assert gemini_client.generate_with_fallback("prompt")[1] == "gemini-a"
+    assert limiter.remaining("gemini-a")["waited"] == 1
+
+    for _ in range(10):
+        limiter.acquire("gemini-a", 0, max_wait=60)
+    with pytest.raises(RateLimitedError) as excinfo:
+        gemini_client.generate_with_fallback("prompt")
+    assert excinfo.value.retry_after == 2
+    assert models.calls == ["gemini-a"]
+
+
+def test_retry_policy_uses_capped_full_jitter_within_budget():
+    policy = RetryPolicy(4, base_delay=0.1, max_delay=0.3, budget_seconds=1.0, rng=lambda: 1.0)
+
+    assert [policy.backoff(attempt, elapsed=0) for attempt in (1, 2, 3)] == [0.1, 0.2, 0.3]
+    assert policy.backoff(4, elapsed=0) is None
+    assert policy.backoff(1, elapsed=0.95) is None
+    snapshot = policy.snapshot()
+    assert (snapshot["retries"], snapshot["attempts_exhausted"], snapshot["budget_exhausted"]) == (3, 1, 1)
+
+
+def _flaky_models(failures):
+    class FlakyModels:
+        def __init__(self):
+            self.calls = []
+
+        def generate_content(self, model, contents):
+            self.calls.append(model)
+            if len(self.calls) <= failures:
+                raise google_exceptions.ServiceUnavailable("backend overloaded")
+            return SimpleNamespace(text=model)
+
+    return FlakyModels()
+
+
+def test_transient_errors_are_retried_on_the_same_model(monkeypatch):
+    models = _flaky_models(failures=2)
+    monkeypatch.setattr(gemini_client, "retry_policy", RetryPolicy(3, base_delay=0.01, max_delay=0.01, budget_seconds=5))
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(models=models))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a", "gemini-b"]))
+
+    assert gemini_client.generate_with_fallback("prompt")[1] == "gemini-a"
+
+    assert models.calls == ["gemini-a"] * 3
+    trace = gemini_client.stats()["routing"]["recent"][-1]
+    assert [a["outcome"] for a in trace["attempts"]] == ["retry", "retry", "ok"]
+    assert gemini_client.stats()["retries"]["recovered"] == 1
+    assert gemini_client.health_registry.state("gemini-a") == "closed"
+
+
+def test_retries_stop_at_the_budget_and_fall_back(monkeypatch):
+    models = _flaky_models(failures=5)
+    policy = RetryPolicy(5, base_delay=1.0, max_delay=1.0, budget_seconds=0.5, rng=lambda: 1.0)
+    monkeypatch.setattr(gemini_client, "retry_policy", policy)
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(models=models))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a", "gemini-b"]))
+
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        gemini_client.generate_with_fallback("prompt")
+
+    # A one-second backoff would overrun the budget, so each model is tried once.
+    assert models.calls == ["gemini-a", "gemini-b"]
+    assert policy.snapshot()["budget_exhausted"] == 2
+
+
+def test_non_transient_errors_are_not_retried(monkeypatch):
+    class BadRequestModels:
+        def __init__(self):
+            self.calls = 0
+
+        async def generate_content(self, model, contents):
+            self.calls += 1
+            raise google_exceptions.InvalidArgument("bad prompt")
+
+    models = BadRequestModels()
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=models)))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a", "gemini-b"]))
+
+    with pytest.raises(google_exceptions.InvalidArgument):
+        asyncio.run(gemini_client.generate_with_fallback_async("prompt"))
+    assert models.calls == 1
+
+
+def test_deadline_bounds_each_attempt_and_stops_the_fallback(monkeypatch):
+    class StuckModels:
+        def __init__(self):
+            self.calls = []
+
+        async def generate_content(self, model, contents):
+            self.calls.append(model)
+            await asyncio.sleep(5)
+
+    models = StuckModels()
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=models)))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a", "gemini-b"]))
+
+    with pytest.raises(DeadlineExceededError, match="0.05s"):
+        asyncio.run(gemini_client.generate_with_fallback_async("prompt", deadline=Deadline(0.05)))
+
+    assert models.calls == ["gemini-a"]
+    trace = gemini_client.stats()["routing"]["recent"][-1]
+    assert [(a["model"], a["outcome"]) for a in trace["attempts"]] == [("gemini-a", "deadline")]
+    assert gemini_client.stats()["routing"]["models"] == {}
+
+
+def test_sync_attempts_carry_the_remaining_time_as_http_timeout(monkeypatch):
+    seen = []
+
+    class FakeModels:
+        def generate_content(self, model, contents, config=None):
+            seen.append(config.http_options.timeout)
+            return SimpleNamespace(text="ok")
+
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(models=FakeModels()))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a"]))
+
+    gemini_client.generate_with_fallback("prompt", deadline=Deadline(30))
+
+    assert 29_000 < seen[0] <= 30_000
+    with pytest.raises(DeadlineExceededError):
+        gemini_client.generate_with_fallback("prompt", deadline=Deadline(0))
+
+
+class _GatedModels:
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+
+    async def generate_content(self, model, contents):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(text=contents)
+
+
+def test_identical_concurrent_requests_share_one_call(monkeypatch):
+    models = _GatedModels()
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=models)))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a"]))
+
+    async def _burst():
+        return await asyncio.gather(
+            gemini_client.generate_with_fallback_async("same"),
+            gemini_client.generate_with_fallback_async("same"),
+            gemini_client.generate_with_fallback_async("other"),
+        )
+
+    results = asyncio.run(_burst())
+
+    assert [response.text for response, _ in results] == ["same", "same", "other"]
+    assert models.calls == 2
+    coalescing = gemini_client.stats()["coalescing"]
+    assert (coalescing["leaders"], coalescing["coalesced"], coalescing["in_flight"]) == (2, 1, 0)
+
+
+def test_coalesced_callers_all_receive_the_error(monkeypatch):
+    models = _GatedModels(error=google_exceptions.InvalidArgument("bad prompt"))
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=models)))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a"]))
+
+    async def _burst():
+        calls = [gemini_client.generate_with_fallback_async("same") for _ in range(3)]
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    errors = asyncio.run(_burst())
+
+    assert all(isinstance(error, google_exceptions.InvalidArgument) for error in errors)
+    assert models.calls == 1
+    assert gemini_client.stats()["coalescing"]["shared_errors"] == 2
+
+
+def test_sync_follower_gives_up_at_its_own_deadline():
+    flights = SingleFlight()
+    release = threading.Event()
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("key", lambda: release.wait(2) and "done")))
+    leader.start()
+    while flights.snapshot()["in_flight"] == 0:
+        pass
+
+    with pytest.raises(DeadlineExceededError):
+        flights.do("key", lambda: "never called", Deadline(0.01))
+    release.set()
+    leader.join()
+
+    assert results == ["done"]
+    assert flights.snapshot()["abandoned"] == 1
+
+
+def test_follower_outlives_a_leader_with_a_shorter_deadline(monkeypatch):
+    models = _GatedModels()
+    monkeypatch.setattr(gemini_client, "_ensure_client", lambda: SimpleNamespace(aio=SimpleNamespace(models=models)))
+    monkeypatch.setattr(gemini_client, "settings", _stub_settings(["gemini-a"]))
+
+    async def _mixed():
+        return await asyncio.gather(
+            gemini_client.generate_with_fallback_async("same", deadline=Deadline(0.02)),
+            gemini_client.generate_with_fallback_async("same", deadline=Deadline(30)),
+            return_exceptions=True,
+        )
+
+    leader_outcome, follower_outcome = asyncio.run(_mixed())
+
+    assert isinstance(leader_outcome, DeadlineExceededError)
+    assert follower_outcome[0].text == "same"
+    assert models.calls == 2
+    coalescing = gemini_client.stats()["coalescing"]
+    assert (coalescing["coalesced"], coalescing["retaken"], coalescing["shared_errors"]) == (1, 1, 0)
+
+
+def test_sync_follower_retakes_the_call_after_the_leader_deadline():
+    flights = SingleFlight()
+    leader_started = threading.Event()
+    leader_deadline = Deadline(0.05)
+    errors = []
+
+    def _leader_call():
+        leader_started.set()
+        time.sleep(0.1)
+        raise leader_deadline.exceeded()
+
+    def _lead():
+        try:
+            flights.do("key", _leader_call, leader_deadline)
+        except DeadlineExceededError as exc:
+            errors.append(exc)
+
+    leader = threading.Thread(target=_lead)
+    leader.start()
+    assert leader_started.wait(2)
+
+    assert flights.do("key", lambda: "fresh", Deadline(30)) == "fresh"
+    leader.join()
+
+    assert len(errors) == 1
+    snapshot = flights.snapshot()
+    assert (snapshot["leaders"], snapshot["coalesced"], snapshot["retaken"]) == (2, 1, 1)
@@ -0,0 +1,56 @@
+from app.models.bot import BotBlueprint, ChatTurn
+from app.services.knowledge_index import BM25Index, KnowledgeIndex
+
+
+def _blueprint(knowledge_base: list[str]) -> BotBlueprint:
+    return BotBlueprint(
+        bot_id="bot-1",
+        bot_name="Pizza Sherpa",
+        tagline="Guides every order",
+        tone="friendly",
+        language="en",
+        knowledge_base=knowledge_base,
+        system_prompt="Help",
+        sample_questions=[],
+        sample_responses=[],
+    )
+
+
+KNOWLEDGE = [
+    "Delivery is free above 100 NIS and takes about 40 minutes.",
+    "We are open Sunday to Thursday, 11:00 to 23:00.",
+    "Gluten-free dough is available for every pizza.",
+    "Parking is available behind the restaurant.",
+]
+
+
+def test_search_ranks_matching_entries_and_follows_updates():
+    index = BM25Index()
+    index.sync(KNOWLEDGE)
+
+    assert [text for text, _ in index.search(["gluten", "free", "pizza"], 2)] == [KNOWLEDGE[2], KNOWLEDGE[0]]
+    assert index.search(["sushi"], 3) == []
+
+    index.sync(KNOWLEDGE[1:] + ["Delivery to Haifa takes an hour."])
+    assert len(index) == 4
+    assert [text for text, _ in index.search(["delivery"], 3)] == ["Delivery to Haifa takes an hour."]
+
+
+def test_select_uses_recent_turns_and_respects_budgets():
+    knowledge = KnowledgeIndex(top_k=2, max_tokens=20, max_bots=4)
+    blueprint = _blueprint(KNOWLEDGE)
+    knowledge.index_blueprint(blueprint)
+    turns = [ChatTurn(role="user", content="Do you have gluten free options?")]
+
+    assert knowledge.select(blueprint, "And for pizza?", turns) == [KNOWLEDGE[2]]  # delivery entry is over budget
+    assert knowledge.select(blueprint, "Hello") == []
+    assert KnowledgeIndex(top_k=0, max_tokens=20, max_bots=4).select(blueprint, "parking") == []
+
+    stats = knowledge.stats()
+    assert (stats["bots"], stats["entries"], stats["lookups"], stats["selected"], stats["skipped_for_budget"]) == (
+        1,
+        4,
+        2,
+        1,
+        1,
+    )
@@ -3,6 +3,7 @@ from fastapi.testclient import TestClient
 from app.main import app
 from app.models.bot import BotBlueprint, BotSnippetResponse
 from app.models.message import ChatMessage
+from app.services.exceptions import BlueprintNotFoundError, BulkheadFullError, DeadlineExceededError
 from app.services.store import store
 from app.models.session import ChatTurn
 client = TestClient(app)
@@ -15,10 +16,10 @@ def test_health_check() -> None:
 
 
 def test_chat_endpoint(monkeypatch) -> None:
-    def fake_reply(session_id: str, prompt: str) -> str:  # noqa: ARG001 - signature must match
+    async def fake_reply(session_id: str, prompt: str, **_) -> str:  # noqa: ARG001 - signature must match
         return "mocked answer"
 
-    monkeypatch.setattr("app.routers.ai_router.generate_ai_reply_with_context", fake_reply)
+    monkeypatch.setattr("app.routers.ai_router.generate_ai_reply_with_context_async", fake_reply)
     payload = {"content": "Hello"}
     response = client.post("/api/v1/chat", json=payload)
     assert response.status_code == 200
@@ -38,7 +39,10 @@ def test_create_blueprint_endpoint(monkeypatch) -> None:
         sample_responses=["היי!"],
     )
 
-    monkeypatch.setattr("app.routers.ai_router.create_bot_blueprint", lambda payload, session_id: blueprint)
+    async def fake_create(payload, session_id, **_):  # noqa: ARG001 - signature must match
+        return blueprint
+
+    monkeypatch.setattr("app.routers.ai_router.create_bot_blueprint_async", fake_create)
 
     payload = {
         "business_name": "My Pizza",
@@ -54,11 +58,31 @@ def test_create_blueprint_endpoint(monkeypatch) -> None:
     assert response.json()["bot_id"] == "bot-123"
 
 
+def test_create_blueprint_endpoint_honours_no_cache(monkeypatch) -> None:
+    seen = []
+
+    async def fake_create(payload, session_id, *, use_cache, **_):  # noqa: ARG001
+        seen.append(use_cache)
+        raise BlueprintNotFoundError("stop here")
+
+    monkeypatch.setattr("app.routers.ai_router.create_bot_blueprint_async", fake_create)
+    payload = {
+        "business_name": "Pizza Planet",
+        "business_description": "We craft artisan pizzas with bold flavors.",
+        "desired_bot_role": "Guide customers to the perfect pizza",
+    }
+
+    client.post("/api/v1/bots/blueprint", json=payload)
+    client.post("/api/v1/bots/blueprint", json=payload, headers={"Cache-Control": "no-cache"})
+
+    assert seen == [True, False]
+
+
 def test_playground_endpoint(monkeypatch) -> None:
-    monkeypatch.setattr(
-        "app.routers.ai_router.chat_with_bot",
-        lambda bot_id, session_id, message: f"reply to {message}",
-    )
+    async def fake_chat(bot_id: str, session_id: str, message: str, **_) -> str:  # noqa: ARG001
+        return f"reply to {message}"
+
+    monkeypatch.setattr("app.routers.ai_router.chat_with_bot_async", fake_chat)
 
     response = client.post(
         "/api/v1/bots/bot-123/playground",
@@ -69,6 +93,75 @@ def test_playground_endpoint(monkeypatch) -> None:
     assert response.json()["reply"] == "reply to מה המומלץ?"
 
 
+def test_playground_stream_endpoint_sends_sse(monkeypatch) -> None:
+    async def fake_chunks():
+        yield "Hello "
+        yield "there"
+
+    async def fake_stream(bot_id, session_id, message, **_):
+        return fake_chunks()
+
+    monkeypatch.setattr("app.routers.ai_router.stream_chat_with_bot", fake_stream)
+
+    response = client.post("/api/v1/bots/bot-123/playground/stream", json={"content": "hi"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == (
+        'data: {"delta": "Hello "}\n\n'
+        'data: {"delta": "there"}\n\n'
+        "event: done\ndata: {}\n\n"
+    )
+
+
+def test_chat_stream_endpoint_reports_errors_as_events(monkeypatch) -> None:
+    async def failing_chunks():
+        yield "Hal"
+        raise RuntimeError("upstream closed")
+
+    monkeypatch.setattr(
+        "app.routers.ai_router.stream_ai_reply_with_context",
+        lambda session_id, prompt, **_: failing_chunks(),
+    )
+
+    response = client.post("/api/v1/chat/stream", json={"content": "Hello"})
+    assert response.status_code == 200
+    assert response.text.endswith('event: error\ndata: {"detail": "upstream closed"}\n\n')
+
+
+def test_playground_endpoint_returns_503_when_overloaded(monkeypatch) -> None:
+    async def overloaded(bot_id: str, session_id: str, message: str, **_) -> str:  # noqa: ARG001
+        raise BulkheadFullError("Too many pending interactive Gemini requests", retry_after=4)
+
+    monkeypatch.setattr("app.routers.ai_router.chat_with_bot_async", overloaded)
+
+    response = client.post("/api/v1/bots/bot-123/playground", json={"content": "hi"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "4"
+
+
+def test_playground_endpoint_applies_request_timeout_and_returns_504(monkeypatch) -> None:
+    timeouts = []
+
+    async def slow(bot_id: str, session_id: str, message: str, *, deadline) -> str:  # noqa: ARG001
+        timeouts.append(deadline.timeout)
+        raise DeadlineExceededError(f"Request deadline of {deadline.timeout:g}s exceeded")
+
+    monkeypatch.setattr("app.routers.ai_router.chat_with_bot_async", slow)
+
+    response = client.post(
+        "/api/v1/bots/bot-123/playground", json={"content": "hi"}, headers={"X-Request-Timeout": "2.5"}
+    )
+    assert response.status_code == 504
+    assert response.json()["detail"] == "Request deadline of 2.5s exceeded"
+
+    client.post("/api/v1/bots/bot-123/playground", json={"content": "hi"}, headers={"X-Request-Timeout": "9999"})
+    client.post("/api/v1/bots/bot-123/playground", json={"content": "hi"})
+    assert timeouts == [2.5, 300, 60]
+    assert client.post(
+        "/api/v1/bots/bot-123/playground", json={"content": "hi"}, headers={"X-Request-Timeout": "0"}
+    ).status_code == 422
+
+
 def test_snippet_endpoint(monkeypatch) -> None:
     snippet = BotSnippetResponse(
         bot_id="bot-123",
@@ -108,3 +201,9 @@ def test_session_state_endpoint() -> None:
     payload = response.json()
     assert payload["blueprint"]["bot_id"] == "bot-789"
     assert [turn["content"] for turn in payload["history"]] == ["Hi", "Hello"]
+
+
+def test_metrics_reports_store_stats() -> None:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.json()["store"]["engine"] in {"json", "sqlite"}
@@ -1,10 +1,21 @@
+import asyncio
+import threading
+from contextlib import contextmanager
 from types import SimpleNamespace
 
 import pytest
 
 from app.models.bot import BotBlueprint, ChatTurn
 from app.services import playground_service
-from app.services.exceptions import AIServiceError, BlueprintNotFoundError, MissingConfigurationError
+from app.services.deadline import Deadline
+from app.services.exceptions import (
+    AIServiceError,
+    BlueprintNotFoundError,
+    DeadlineExceededError,
+    MissingConfigurationError,
+)
+from app.services.prompt_budget import PromptBudget
+from app.services.semantic_cache import SemanticCache
 
 
 def _blueprint() -> BotBlueprint:
@@ -29,6 +40,17 @@ def _fake_store(monkeypatch, blueprint=None):
     class _Store:
         def __init__(self):
             self.appended: list[tuple[str, str, ChatTurn]] = []
+            self.transactions = 0
+            self.in_transaction = False
+
+        @contextmanager
+        def transaction(self):
+            self.transactions += 1
+            self.in_transaction = True
+            try:
+                yield self
+            finally:
+                self.in_transaction = False
 
         def get_blueprint(self, bot_id: str):
             if blueprint and bot_id == blueprint.bot_id:
@@ -39,6 +61,7 @@ def _fake_store(monkeypatch, blueprint=None):
             return _history()
 
         def append_turn(self, bot_id: str, session_id: str, turn: ChatTurn):
+            assert self.in_transaction, "turns must be persisted together"
             self.appended.append((bot_id, session_id, turn))
 
     instance = _Store()
@@ -58,7 +81,7 @@ def test_chat_with_bot_returns_clean_reply(monkeypatch):
     monkeypatch.setattr(
         playground_service,
         "generate_with_fallback",
-        lambda prompt: (SimpleNamespace(text="  hi  "), "model"),
+        lambda prompt, **_: (SimpleNamespace(text="  hi  "), "model"),
     )
 
     reply = playground_service.chat_with_bot("bot-123", "sess-1", "שלום")
@@ -66,6 +89,7 @@ def test_chat_with_bot_returns_clean_reply(monkeypatch):
     assert reply == "hi"
     assert [turn.role for *_, turn in fake_store.appended] == ["user", "assistant"]
     assert fake_store.appended[-1][2].content == "hi"
+    assert fake_store.transactions == 1
 
 
 def test_chat_with_bot_requires_blueprint(monkeypatch):
@@ -91,7 +115,7 @@ def test_chat_with_bot_validates_reply(monkeypatch):
     monkeypatch.setattr(
         playground_service,
         "generate_with_fallback",
-        lambda prompt: (SimpleNamespace(text="   "), "model"),
+        lambda prompt, **_: (SimpleNamespace(text="   "), "model"),
     )
 
     with pytest.raises(AIServiceError, match="empty"):
@@ -103,10 +127,206 @@ def test_chat_with_bot_wraps_unknown_errors(monkeypatch):
     _configure_settings(monkeypatch)
     monkeypatch.setattr(playground_service, "build_playground_prompt", lambda *args: "prompt")
 
-    def _boom(prompt):  # noqa: ARG001 - signature defined by dependency
+    def _boom(prompt, **_):  # noqa: ARG001 - signature defined by dependency
         raise RuntimeError("explode")
 
     monkeypatch.setattr(playground_service, "generate_with_fallback", _boom)
 
     with pytest.raises(AIServiceError, match="explode"):
         playground_service.chat_with_bot("bot-123", "sess", "hi")
+
+
+def test_chat_with_bot_async_awaits_gemini_and_persists(monkeypatch):
+    fake_store = _fake_store(monkeypatch, _blueprint())
+    _configure_settings(monkeypatch)
+    monkeypatch.setattr(playground_service, "build_playground_prompt", lambda *args: "prompt")
+
+    async def _generate(prompt, **_):
+        return SimpleNamespace(text=" async hi "), "model"
+
+    monkeypatch.setattr(playground_service, "generate_with_fallback_async", _generate)
+
+    reply = asyncio.run(playground_service.chat_with_bot_async("bot-123", "sess-1", "שלום"))
+
+    assert reply == "async hi"
+    assert [turn.content for *_, turn in fake_store.appended] == ["שלום", "async hi"]
+    assert fake_store.transactions == 1
+
+
+def _stream_of(*chunks, fail: bool = False):
+    async def _stream(prompt, **_):
+        for chunk in chunks:
+            yield chunk
+        if fail:
+            raise RuntimeError("stream cut")
+
+    return _stream
+
+
+async def _drain(chunks):
+    return [chunk async for chunk in chunks]
+
+
+async def _drain_stream(stream):
+    return await _drain(await stream)
+
+
+def test_stream_chat_with_bot_persists_assembled_reply(monkeypatch):
+    fake_store = _fake_store(monkeypatch, _blueprint())
+    _configure_settings(monkeypatch)
+    monkeypatch.setattr(playground_service, "build_playground_prompt", lambda *args: "prompt")
+    monkeypatch.setattr(playground_service, "stream_with_fallback", _stream_of("נסה ", "מרגריטה "))
+
+    chunks = asyncio.run(_drain_stream(playground_service.stream_chat_with_bot("bot-123", "sess-1", "מה מומלץ")))
+
+    assert chunks == ["נסה ", "מרגריטה "]
+    assert [turn.content for *_, turn in fake_store.appended] == ["מה מומלץ", "נסה מרגריטה"]
+
+
+def test_stream_chat_with_bot_failure_leaves_history_untouched(monkeypatch):
+    fake_store = _fake_store(monkeypatch, _blueprint())
+    _configure_settings(monkeypatch)
+    monkeypatch.setattr(playground_service, "build_playground_prompt", lambda *args: "prompt")
+    monkeypatch.setattr(playground_service, "stream_with_fallback", _stream_of("partial", fail=True))
+
+    with pytest.raises(AIServiceError, match="stream cut"):
+        asyncio.run(_drain_stream(playground_service.stream_chat_with_bot("bot-123", "sess-1", "hi")))
+    assert fake_store.appended == []
+
+
+def test_stream_chat_with_bot_checks_blueprint_before_streaming(monkeypatch):
+    _fake_store(monkeypatch, blueprint=None)
+    _configure_settings(monkeypatch)
+
+    with pytest.raises(BlueprintNotFoundError):
+        asyncio.run(playground_service.stream_chat_with_bot("missing", "sess", "hi"))
+
+
+def test_reply_arriving_after_the_deadline_is_not_stored(monkeypatch):
+    fake_store = _fake_store(monkeypatch, _blueprint())
+    _configure_settings(monkeypatch)
+    monkeypatch.setattr(playground_service, "build_playground_prompt", lambda *args: "prompt")
+    deadline = Deadline(0.01)
+
+    async def _late(prompt, **_):
+        await asyncio.sleep(0.02)
+        return SimpleNamespace(text="too late"), "model"
+
+    monkeypatch.setattr(playground_service, "generate_with_fallback_async", _late)
+
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(playground_service.chat_with_bot_async("bot-123", "sess-1", "hi", deadline=deadline))
+    assert fake_store.appended == []
+
+
+def test_first_message_matching_a_sample_question_skips_gemini(monkeypatch):
+    fake_store = _fake_store(monkeypatch, _blueprint())
+    fake_store.get_history = lambda bot_id, session_id: []
+    _configure_settings(monkeypatch)
+
+    def _unexpected(*args, **kwargs):
+        raise AssertionError("Gemini should not be called")
+
+    monkeypatch.setattr(playground_service, "generate_with_fallback", _unexpected)
+    monkeypatch.setattr(playground_service, "stream_with_fallback", _unexpected)
+
+    assert playground_service.chat_with_bot("bot-123", "sess-1", "  מה מומלץ?") == "נסה מרגריטה"
+    chunks = asyncio.run(_drain_stream(playground_service.stream_chat_with_bot("bot-123", "sess-2", "מה מומלץ")))
+
+    assert chunks == ["נסה מרגריטה"]
+    assert [(session, turn.role) for _, session, turn in fake_store.appended] == [
+        ("sess-1", "user"),
+        ("sess-1", "assistant"),
+        ("sess-2", "user"),
+        ("sess-2", "assistant"),
+    ]
+
+
+def test_prewarm_replaces_sample_answers_with_generated_ones(monkeypatch):
+    blueprint = _blueprint()
+    playground_service.answer_cache.populate(blueprint)
+    calls = []
+
+    def _generate(prompt, **kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(text=" מרגריטה עם בזיליקום "), "model"
+
+    monkeypatch.setattr(playground_service, "generate_with_fallback", _generate)
+
+    playground_service.prewarm_sample_answers(blueprint).join(timeout=5)
+
+    assert calls == [{"traffic": "batch"}]
+    assert playground_service.answer_cache.lookup(blueprint, "מה מומלץ") == "מרגריטה עם בזיליקום"
+
+
+def test_similar_first_message_is_served_from_the_semantic_cache(monkeypatch):
+    fake_store = _fake_store(monkeypatch, _blueprint())
+    fake_store.get_history = lambda bot_id, session_id: []
+    _configure_settings(monkeypatch)
+    monkeypatch.setattr(playground_service, "build_playground_prompt", lambda *args: "prompt")
+    monkeypatch.setattr(
+        playground_service,
+        "semantic_cache",
+        SemanticCache(True, threshold=0.8, max_entries=8, max_bots=8),
+    )
+    calls = []
+
+    def _generate(prompt, **_):
+        calls.append(prompt)
+        return SimpleNamespace(text="Until midnight"), "model"
+
+    monkeypatch.setattr(playground_service, "generate_with_fallback", _generate)
+
+    assert playground_service.chat_with_bot("bot-123", "sess-1", "How late are you open?") == "Until midnight"
+    assert playground_service.chat_with_bot("bot-123", "sess-2", "how late are you open tonight") == "Until midnight"
+    assert calls == ["prompt"]
+    assert len(fake_store.appended) == 4
+
+
+def test_long_history_is_windowed_and_recorded(monkeypatch):
+    fake_store = _fake_store(monkeypatch, _blueprint())
+    history = [ChatTurn(role="user", content="old " * 100), ChatTurn(role="assistant", content="recent")]
+    fake_store.get_history = lambda bot_id, session_id: history
+    _configure_settings(monkeypatch)
+    budget = PromptBudget(max_tokens=200)
+    monkeypatch.setattr(playground_service, "prompt_budget", budget)
+    prompts = []
+
+    def _generate(prompt, **_):
+        prompts.append(prompt)
+        return SimpleNamespace(text="ok"), "model"
+
+    monkeypatch.setattr(playground_service, "generate_with_fallback", _generate)
+
+    playground_service.chat_with_bot("bot-123", "sess-1", "and now?")
+
+    assert "Pizza Sherpa: recent" in prompts[0]
+    assert "old old" not in prompts[0]
+    stats = budget.stats()
+    assert (stats["requests"], stats["truncated"], stats["turns_dropped"], stats["over_budget"]) == (1, 1, 1, 0)
+    assert 0 < stats["max_prompt_tokens"] <= 200
+
+
+def test_async_entry_points_read_the_store_off_the_event_loop(monkeypatch):
+    fake_store = _fake_store(monkeypatch, _blueprint())
+    _configure_settings(monkeypatch)
+    monkeypatch.setattr(playground_service, "build_playground_prompt", lambda *args: "prompt")
+    reader_threads = []
+
+    def _history_from_thread(bot_id, session_id):
+        reader_threads.append(threading.current_thread())
+        return _history()
+
+    fake_store.get_history = _history_from_thread
+
+    async def _generate(prompt, **_):
+        return SimpleNamespace(text="ok"), "model"
+
+    monkeypatch.setattr(playground_service, "generate_with_fallback_async", _generate)
+    monkeypatch.setattr(playground_service, "stream_with_fallback", _stream_of("ok"))
+
+    asyncio.run(playground_service.chat_with_bot_async("bot-123", "sess-1", "hi"))
+    asyncio.run(_drain_stream(playground_service.stream_chat_with_bot("bot-123", "sess-1", "hi")))
+
+    assert len(reader_threads) == 2
+    assert threading.main_thread() not in reader_threads
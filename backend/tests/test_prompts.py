@@ -49,3 +49,25 @@ def test_build_playground_prompt_renders_turns():
 
     assert "User: Hi" in prompt_text
     assert f"{blueprint.bot_name}: Welcome" in prompt_text
+
+
+def test_build_playground_prompt_lists_selected_knowledge_only_when_given():
+    blueprint = _blueprint()
+
+    with_knowledge = prompts.build_playground_prompt(blueprint, [], "Hi", ["Open until 23:00", "Free parking"])
+    without = prompts.build_playground_prompt(blueprint, [], "Hi")
+
+    assert "Relevant knowledge:\n- Open until 23:00\n- Free parking\n" in with_knowledge
+    assert "Relevant knowledge" not in without
+
+
+def test_window_turns_keeps_the_newest_turns_that_fit():
+    blueprint = _blueprint()
+    turns = [ChatTurn(role="user", content=f"message number {index} " + "x" * 40) for index in range(10)]
+    fixed = prompts.estimate_text_tokens(prompts.build_playground_prompt(blueprint, [], "Next"))
+
+    window = prompts.window_turns(blueprint, turns, "Next", max_tokens=fixed + 55)
+
+    assert window == turns[-3:]
+    assert prompts.window_turns(blueprint, turns, "Next") == turns
+    assert prompts.window_turns(blueprint, turns, "Next", max_tokens=1) == []
@@ -0,0 +1,40 @@
+from app.services.rate_limits import ModelRateLimiter, TokenBucket
+
+
+def test_token_bucket_refills_per_second_and_allows_debt() -> None:
+    bucket = TokenBucket(60, now=0.0)
+    bucket.take(60, now=0.0)
+
+    assert bucket.wait_time(1, now=0.0) == 1.0
+    assert bucket.wait_time(1, now=0.5) == 0.5
+    bucket.take(1, now=0.5)  # reserved ahead of the refill
+    assert bucket.level(now=0.5) == -0.5
+    assert bucket.wait_time(1, now=0.5) == 1.5
+    # A request larger than the bucket only waits for a full one.
+    assert bucket.wait_time(500, now=61.0) == 0.0
+
+
+def test_limiter_uses_per_model_limits_with_a_default() -> None:
+    limiter = ModelRateLimiter({"*": 2, "gemini-pro": 1}, {"gemini-pro": 100}, max_wait_seconds=0.5)
+
+    assert limiter.acquire("gemini-pro", 50, now=0.0) == 0.0
+    assert limiter.acquire("gemini-pro", 50, now=0.0) is None  # out of requests
+    assert limiter.acquire("gemini-flash", 500, now=0.0) == 0.0  # no token limit for flash
+    assert limiter.acquire("gemini-flash", 500, now=0.0) == 0.0
+    assert limiter.wait_time("gemini-flash", 1, now=0.0) == 30.0
+    assert limiter.acquire("gemini-flash", 1, max_wait=30.0, now=0.0) == 30.0
+
+    remaining = limiter.remaining("gemini-pro", now=0.0)
+    assert (remaining["requests_remaining"], remaining["tokens_remaining"]) == (0, 50)
+    assert remaining["throttled"] == 1
+
+
+def test_settle_replaces_the_estimate_with_reported_usage() -> None:
+    limiter = ModelRateLimiter(tpm={"gemini-a": 1000})
+    limiter.acquire("gemini-a", 100, now=0.0)
+
+    limiter.settle("gemini-a", reserved=100, actual=400)
+
+    assert limiter.remaining("gemini-a", now=0.0)["tokens_remaining"] == 600
+    assert limiter.remaining("gemini-b") == {"requests_remaining": None, "tokens_remaining": None}
+    assert ModelRateLimiter().enabled is False
@@ -0,0 +1,45 @@
+import pytest
+
+from app.services.semantic_cache import SemanticCache, cosine, embed
+
+
+def test_embed_is_unit_length_and_ignores_case_and_punctuation():
+    vector = embed("Do you deliver to Haifa?")
+
+    assert cosine(vector, vector) == pytest.approx(1.0)
+    assert cosine(vector, embed("do you DELIVER to haifa")) == pytest.approx(1.0)
+    assert cosine(vector, embed("Do you deliver to Haifa today?")) > 0.8
+    assert cosine(vector, embed("What is on the menu?")) < 0.3
+    assert embed("?!") == {}
+
+
+def test_lookup_returns_the_best_match_above_threshold_per_bot():
+    cache = SemanticCache(True, threshold=0.8, max_entries=2, max_bots=2)
+    cache.store("bot-1", "Do you deliver to Haifa?", "Yes, within an hour.")
+    cache.store("bot-1", "What is on the menu?", "Pizza and pasta.")
+
+    assert cache.lookup("bot-1", "do you deliver to haifa today") == "Yes, within an hour."
+    assert cache.lookup("bot-2", "Do you deliver to Haifa?") is None
+    assert cache.lookup("bot-1", "Where can I park?") is None
+
+    cache.store("bot-1", "Where can I park?", "Behind the shop.")  # evicts the menu question
+    assert cache.lookup("bot-1", "What is on the menu?") is None
+
+    stats = cache.stats()
+    assert {key: stats[key] for key in ("entries", "hits", "misses", "stored", "evicted", "hit_rate")} == {
+        "entries": 2,
+        "hits": 1,
+        "misses": 3,
+        "stored": 3,
+        "evicted": 1,
+        "hit_rate": 0.25,
+    }
+    assert stats["avg_lookup_ms"] >= 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = SemanticCache(False, threshold=0.8, max_entries=2, max_bots=2)
+    cache.store("bot-1", "Do you deliver?", "Yes.")
+
+    assert cache.lookup("bot-1", "Do you deliver?") is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,110 @@
+import pytest
+
+from app.models.bot import BotBlueprint, ChatTurn
+from app.services.shared_store import SharedJsonStore
+from app.services.store import create_store
+
+
+def _blueprint(bot_id: str = "bot-1") -> BotBlueprint:
+    return BotBlueprint(
+        bot_id=bot_id,
+        bot_name="Pizza Guide",
+        tagline="Helps you pick the right pizza",
+        tone="playful",
+        language="he",
+        knowledge_base=["menu"],
+        system_prompt="Always suggest a pizza",
+        sample_questions=["מה טעים"],
+        sample_responses=["נסה מרגריטה"],
+    )
+
+
+def _turn(role: str, content: str) -> ChatTurn:
+    return ChatTurn(role=role, content=content)
+
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_workers_see_each_others_writes(tmp_path, journal) -> None:
+    path = tmp_path / "store.json"
+    worker_a = SharedJsonStore(path, journal=journal)
+    worker_b = SharedJsonStore(path, journal=journal)
+
+    worker_a.save_blueprint(_blueprint())
+    worker_a.assign_session("bot-1", "sess")
+    assert worker_b.get_session_state("sess") == (_blueprint(), [])
+
+    for index in range(3):
+        worker_a.append_turn("bot-1", "sess", _turn("user", f"a{index}"))
+        worker_b.append_turn("bot-1", "sess", _turn("assistant", f"b{index}"))
+
+    expected = [content for index in range(3) for content in (f"a{index}", f"b{index}")]
+    assert [turn.content for turn in worker_a.get_history("bot-1", "sess")] == expected
+    assert [turn.content for turn in worker_b.get_history("bot-1", "sess")] == expected
+
+    worker_b.compact()
+    worker_a.append_turn("bot-1", "sess", _turn("user", "after compaction"))
+    assert worker_b.get_history("bot-1", "sess")[-1].content == "after compaction"
+
+    worker_a.close()
+    worker_b.close()
+
+
+def test_transaction_holds_the_cross_process_lock(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    worker_a = SharedJsonStore(path)
+    worker_b = SharedJsonStore(path)
+
+    with worker_a.transaction():
+        worker_a.save_blueprint(_blueprint())
+        worker_a.reset_history_for_bot("bot-1")
+        worker_a.assign_session("bot-1", "sess")
+
+    assert worker_b.get_blueprint("bot-1") == _blueprint()
+    worker_b.clear()
+    assert worker_a.get_session_state("sess") == (None, [])
+
+
+def test_create_store_builds_shared_engine_and_rejects_memory(tmp_path) -> None:
+    assert isinstance(create_store(tmp_path / "store.json", shared=True), SharedJsonStore)
+    with pytest.raises(ValueError):
+        SharedJsonStore(":memory:")
+
+
+def test_writes_that_change_nothing_leave_the_version_alone(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    lock_path = tmp_path / "store.json.lock"
+    worker = SharedJsonStore(path, session_ttl_seconds=60, sweep_interval_seconds=3600)
+    worker.assign_session("bot-1", "sess")
+    version = lock_path.read_text(encoding="ascii")
+
+    assert worker.expire() == 0
+    assert lock_path.read_text(encoding="ascii") == version
+
+    worker.save_blueprint(_blueprint())
+    assert int(lock_path.read_text(encoding="ascii")) == int(version) + 1
+    worker.close()
+
+
+def test_orphaned_spill_files_are_swept_under_the_exclusive_lock(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    spill_dir = tmp_path / "store.json.sessions"
+    worker_a = SharedJsonStore(path, max_bytes=400)
+    for bot_id in ("bot-a", "bot-b"):
+        worker_a.save_blueprint(_blueprint(bot_id))
+        worker_a.assign_session(bot_id, f"sess-{bot_id}")
+        worker_a.append_turn(bot_id, f"sess-{bot_id}", _turn("user", bot_id * 100))
+    worker_a.save_blueprint(_blueprint("bot-c"))
+    spilled = list(spill_dir.iterdir())
+    assert len(spilled) == 1
+
+    orphan = spill_dir / "orphan.json"
+    orphan.write_text("[]", encoding="utf-8")
+    worker_b = SharedJsonStore(path, max_bytes=400)
+    # Loading without the file lock leaves other workers' files alone.
+    assert orphan.exists()
+
+    worker_b.append_turn("bot-b", "sess-bot-b", _turn("assistant", "ok"))
+    assert not orphan.exists()
+    assert worker_a.get_history("bot-a", "sess-bot-a") == [_turn("user", "bot-a" * 100)]
+    worker_a.close()
+    worker_b.close()
@@ -0,0 +1,159 @@
+import pytest
+
+from app.models.bot import BotBlueprint, ChatTurn
+from app.services.sqlite_store import SqliteStore
+from app.services.store import JsonStore, create_store
+
+
+def _blueprint(bot_id: str = "bot-1") -> BotBlueprint:
+    return BotBlueprint(
+        bot_id=bot_id,
+        bot_name="Pizza Guide",
+        tagline="Helps you pick the right pizza",
+        tone="playful",
+        language="he",
+        knowledge_base=["menu", "allergens"],
+        system_prompt="Always suggest a pizza",
+        sample_questions=["מה טעים"],
+        sample_responses=["נסה מרגריטה"],
+    )
+
+
+def _turn(role: str, content: str) -> ChatTurn:
+    return ChatTurn(role=role, content=content)
+
+
+@pytest.fixture
+def sqlite_store():
+    instance = SqliteStore("sqlite:///:memory:", max_sessions_per_bot=2, max_turns_per_session=3)
+    yield instance
+    instance.close()
+
+
+def test_create_store_selects_engine_from_url(tmp_path) -> None:
+    sqlite_engine = create_store(f"sqlite:///{tmp_path / 'store.db'}")
+    json_engine = create_store(":memory:")
+
+    assert isinstance(sqlite_engine, SqliteStore)
+    assert isinstance(json_engine, JsonStore)
+    assert (tmp_path / "store.db").exists()
+    sqlite_engine.close()
+
+
+def test_blueprint_and_session_state_round_trip(sqlite_store) -> None:
+    blueprint = _blueprint("bot-xyz")
+    sqlite_store.save_blueprint(blueprint)
+    sqlite_store.assign_session(blueprint.bot_id, "sess-9")
+    sqlite_store.append_turn(blueprint.bot_id, "sess-9", _turn("user", "hi"))
+    sqlite_store.append_turn(blueprint.bot_id, "sess-9", _turn("assistant", "hello"))
+
+    state_blueprint, history = sqlite_store.get_session_state("sess-9")
+
+    assert sqlite_store.get_blueprint("missing") is None
+    assert state_blueprint == blueprint
+    assert history == [_turn("user", "hi"), _turn("assistant", "hello")]
+
+
+def test_history_is_isolated_and_resettable(sqlite_store) -> None:
+    sqlite_store.append_turn("bot-1", "sess", _turn("user", "hi"))
+    sqlite_store.append_turn("bot-2", "sess", _turn("assistant", "hey"))
+
+    sqlite_store.reset_history_for_bot("bot-1")
+
+    assert sqlite_store.get_history("bot-1", "sess") == []
+    assert sqlite_store.get_history("bot-2", "sess") == [_turn("assistant", "hey")]
+
+
+def test_caps_are_enforced_in_sql(sqlite_store) -> None:
+    for session_id in ("sess-1", "sess-2", "sess-3"):
+        sqlite_store.assign_session("bot-limit", session_id)
+    for content in ("m1", "a1", "m2", "a2"):
+        sqlite_store.append_turn("bot-limit", "sess-3", _turn("user", content))
+
+    assert sqlite_store.get_session_state("sess-1") == (None, [])
+    assert [turn.content for turn in sqlite_store.get_history("bot-limit", "sess-3")] == ["a1", "m2", "a2"]
+
+
+def test_reassigning_session_moves_it_between_bots(sqlite_store) -> None:
+    sqlite_store.save_blueprint(_blueprint("bot-a"))
+    sqlite_store.save_blueprint(_blueprint("bot-b"))
+    sqlite_store.assign_session("bot-a", "sess")
+    sqlite_store.append_turn("bot-a", "sess", _turn("user", "hi"))
+
+    sqlite_store.assign_session("bot-b", "sess")
+
+    blueprint, history = sqlite_store.get_session_state("sess")
+    assert blueprint.bot_id == "bot-b"
+    assert history == []
+    assert sqlite_store.get_history("bot-a", "sess") == []
+
+
+def test_state_survives_reopen(tmp_path) -> None:
+    url = f"sqlite:///{tmp_path / 'store.db'}"
+    first = SqliteStore(url)
+    first.save_blueprint(_blueprint())
+    first.assign_session("bot-1", "sess")
+    first.append_turn("bot-1", "sess", _turn("user", "persist me"))
+    first.close()
+
+    second = SqliteStore(url)
+    blueprint, history = second.get_session_state("sess")
+    assert blueprint == _blueprint()
+    assert history == [_turn("user", "persist me")]
+    second.clear()
+    assert second.get_blueprint("bot-1") is None
+    second.close()
+
+
+def test_transaction_rolls_back_every_mutation(sqlite_store) -> None:
+    with pytest.raises(RuntimeError):
+        with sqlite_store.transaction():
+            sqlite_store.save_blueprint(_blueprint())
+            sqlite_store.assign_session("bot-1", "sess")
+            raise RuntimeError("abort")
+
+    assert sqlite_store.get_blueprint("bot-1") is None
+    assert sqlite_store.get_session_state("sess") == (None, [])
+
+    with sqlite_store.transaction():
+        sqlite_store.save_blueprint(_blueprint())
+        sqlite_store.assign_session("bot-1", "sess")
+
+    assert sqlite_store.get_session_state("sess") == (_blueprint(), [])
+
+
+def test_expire_uses_activity_columns() -> None:
+    import time
+
+    store = SqliteStore("sqlite:///:memory:", session_ttl_seconds=60, blueprint_ttl_seconds=60)
+    store.save_blueprint(_blueprint())
+    store.assign_session("bot-1", "sess")
+    store.append_turn("bot-1", "sess", _turn("user", "hi"))
+
+    assert store.expire(time.time()) == 0
+    assert store.expire(time.time() + 61) == 2
+    assert store.get_session_state("sess") == (None, [])
+    assert store.get_blueprint("bot-1") is None
+    store.close()
+
+
+def test_migrates_databases_created_before_expiry(tmp_path) -> None:
+    import sqlite3
+
+    database = tmp_path / "old.db"
+    conn = sqlite3.connect(database)
+    conn.executescript(
+        """
+        CREATE TABLE blueprints (bot_id TEXT PRIMARY KEY, payload TEXT NOT NULL);
+        CREATE TABLE bot_sessions (
+            bot_id TEXT NOT NULL, session_id TEXT NOT NULL, touched INTEGER NOT NULL,
+            PRIMARY KEY (bot_id, session_id)
+        );
+        """
+    )
+    conn.close()
+
+    store = SqliteStore(f"sqlite:///{database}")
+    store.assign_session("bot-1", "sess")
+    assert store.get_session_state("sess") == (None, [])
+    store.close()
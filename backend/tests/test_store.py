@@ -1,3 +1,8 @@
+import threading
+import time
+
+import pytest
+
 from app.models.bot import BotBlueprint, ChatTurn
 from app.services.store import JsonStore
 
@@ -36,7 +41,8 @@ def test_history_is_isolated_and_resettable() -> None:
     store.append_turn("bot-2", "sess", _turn("assistant", "hey"))
 
     history = store.get_history("bot-1", "sess")
-    history.append(_turn("assistant", "mutated"))
+    with pytest.raises(AttributeError):
+        history.append(_turn("assistant", "mutated"))
 
     assert store.get_history("bot-1", "sess") == [_turn("user", "hi")]
 
@@ -95,3 +101,320 @@ def test_turn_limit_keeps_recent_messages_only() -> None:
         _turn("user", "m2"),
         _turn("assistant", "a2"),
     ]
+
+
+def test_journal_mode_rebuilds_state_from_snapshot_and_journal(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    store = JsonStore(path, journal=True)
+    blueprint = _blueprint("bot-log")
+    store.save_blueprint(blueprint)
+    store.assign_session(blueprint.bot_id, "sess-log")
+    store.append_turn(blueprint.bot_id, "sess-log", _turn("user", "hi"))
+    # No close(): the process dies with only the journal on disk.
+
+    assert not path.exists()
+    assert len((tmp_path / "store.json.journal").read_text(encoding="utf-8").splitlines()) == 3
+
+    reopened = JsonStore(path, journal=True)
+    state_blueprint, history = reopened.get_session_state("sess-log")
+    assert state_blueprint == blueprint
+    assert history == [_turn("user", "hi")]
+
+    reopened.compact()
+    reopened.append_turn(blueprint.bot_id, "sess-log", _turn("assistant", "hello"))
+    assert len((tmp_path / "store.json.journal").read_text(encoding="utf-8").splitlines()) == 1
+    reopened.close()
+
+    # close() folds the journal into the snapshot.
+    assert path.exists()
+    assert not (tmp_path / "store.json.journal").exists()
+
+    final = JsonStore(path, journal=True)
+    assert final.get_history(blueprint.bot_id, "sess-log") == [_turn("user", "hi"), _turn("assistant", "hello")]
+    final.close()
+
+
+def test_journal_left_behind_is_replayed_with_journal_mode_off(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    store = JsonStore(path, journal=True)
+    store.append_turn("bot-1", "sess", _turn("user", "kept"))
+    # No close(): the writes live only in the journal.
+
+    reopened = JsonStore(path, journal=False)
+    assert reopened.get_history("bot-1", "sess") == [_turn("user", "kept")]
+    assert path.exists()
+    assert not (tmp_path / "store.json.journal").exists()
+    reopened.close()
+
+    assert JsonStore(path, journal=False).get_history("bot-1", "sess") == [_turn("user", "kept")]
+
+
+def test_journal_replay_skips_records_already_in_snapshot(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    store = JsonStore(path, journal=True)
+    store.append_turn("bot-1", "sess", _turn("user", "once"))
+    journal_text = (tmp_path / "store.json.journal").read_text(encoding="utf-8")
+    store.compact()
+    store.close()
+
+    # Simulate a crash between writing the snapshot and dropping the rotated journal.
+    (tmp_path / "store.json.journal.1").write_text(journal_text + '{"seq": 2, "op"', encoding="utf-8")
+
+    reopened = JsonStore(path, journal=True)
+    assert reopened.get_history("bot-1", "sess") == [_turn("user", "once")]
+    reopened.close()
+
+
+def test_journal_compacts_in_background_after_threshold(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    store = JsonStore(path, journal=True, compact_threshold=2)
+    store.append_turn("bot-1", "sess", _turn("user", "a"))
+    store.append_turn("bot-1", "sess", _turn("assistant", "b"))
+
+    deadline = time.monotonic() + 2
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    store.close()
+
+    assert path.exists()
+    assert JsonStore(path, journal=False).get_history("bot-1", "sess") == [
+        _turn("user", "a"),
+        _turn("assistant", "b"),
+    ]
+
+
+def test_journal_appends_after_torn_tail(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    (tmp_path / "store.json.journal").write_text('{"seq": 1, "op": "tu', encoding="utf-8")
+
+    store = JsonStore(path, journal=True)
+    store.append_turn("bot-1", "sess", _turn("user", "after crash"))
+    store.close()
+
+    reopened = JsonStore(path, journal=True)
+    assert reopened.get_history("bot-1", "sess") == [_turn("user", "after crash")]
+    reopened.close()
+
+
+def test_batch_durability_coalesces_writes_until_flush(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    store = JsonStore(path, durability="batch", flush_interval_ms=60_000, flush_max_pending=100)
+    store.save_blueprint(_blueprint())
+    store.append_turn("bot-1", "sess", _turn("user", "buffered"))
+
+    assert not path.exists()
+
+    store.flush()
+
+    assert JsonStore(path).get_history("bot-1", "sess") == [_turn("user", "buffered")]
+    store.close()
+
+
+def test_batch_durability_flushes_after_max_pending(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    store = JsonStore(path, journal=True, durability="batch", flush_interval_ms=60_000, flush_max_pending=2)
+    store.append_turn("bot-1", "sess", _turn("user", "a"))
+    store.append_turn("bot-1", "sess", _turn("assistant", "b"))
+
+    journal_path = tmp_path / "store.json.journal"
+
+    def journal_lines() -> int:
+        return len(journal_path.read_text(encoding="utf-8").splitlines()) if journal_path.exists() else 0
+
+    deadline = time.monotonic() + 2
+    while journal_lines() < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert journal_lines() == 2
+    store.close()
+
+
+def test_none_durability_persists_on_close(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    store = JsonStore(path, durability="none")
+    store.append_turn("bot-1", "sess", _turn("user", "late"))
+
+    assert not path.exists()
+
+    store.close()
+
+    assert JsonStore(path).get_history("bot-1", "sess") == [_turn("user", "late")]
+
+
+def test_transaction_persists_once(tmp_path, monkeypatch) -> None:
+    store = JsonStore(tmp_path / "store.json")
+    writes = []
+    original = store._write_snapshot
+    monkeypatch.setattr(store, "_write_snapshot", lambda payload: (writes.append(payload), original(payload)))
+
+    blueprint = _blueprint()
+    with store.transaction():
+        store.save_blueprint(blueprint)
+        store.reset_history_for_bot(blueprint.bot_id)
+        store.assign_session(blueprint.bot_id, "sess")
+
+    assert len(writes) == 1
+    assert JsonStore(tmp_path / "store.json").get_session_state("sess") == (blueprint, [])
+
+
+def test_reads_do_not_wait_for_writers() -> None:
+    store = JsonStore(":memory:")
+    blueprint = _blueprint()
+    store.save_blueprint(blueprint)
+    store.append_turn(blueprint.bot_id, "sess", _turn("user", "hi"))
+
+    writer_holds_lock = threading.Event()
+    release_writer = threading.Event()
+    reads = []
+
+    def _slow_writer() -> None:
+        with store.transaction():
+            writer_holds_lock.set()
+            release_writer.wait(timeout=5)
+
+    def _reader() -> None:
+        reads.append(store.get_blueprint(blueprint.bot_id))
+        reads.append(store.get_history(blueprint.bot_id, "sess"))
+
+    writer = threading.Thread(target=_slow_writer)
+    writer.start()
+    assert writer_holds_lock.wait(timeout=5)
+    try:
+        reader = threading.Thread(target=_reader)
+        reader.start()
+        reader.join(timeout=1)
+
+        assert not reader.is_alive(), "reads blocked behind the writer"
+        assert writer.is_alive() and not release_writer.is_set()
+        assert reads == [blueprint, [_turn("user", "hi")]]
+    finally:
+        release_writer.set()
+        writer.join()
+
+
+def test_lazy_load_defers_turn_materialization(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    seed = JsonStore(path)
+    blueprint = _blueprint()
+    seed.save_blueprint(blueprint)
+    seed.assign_session(blueprint.bot_id, "sess-a")
+    seed.append_turn(blueprint.bot_id, "sess-a", _turn("user", "a1"))
+    seed.assign_session(blueprint.bot_id, "sess-b")
+    seed.append_turn(blueprint.bot_id, "sess-b", _turn("user", "b1"))
+
+    lazy = JsonStore(path, lazy_load=True)
+
+    assert lazy.stats()["load"] | {"seconds": 0} == {
+        "seconds": 0,
+        "lazy": True,
+        "blueprints": 1,
+        "sessions": 2,
+        "turns": 2,
+        "journal_records": 0,
+    }
+    assert lazy.get_blueprint(blueprint.bot_id) == blueprint
+    assert lazy.get_session_state("sess-a") == (blueprint, [_turn("user", "a1")])
+
+    lazy.append_turn(blueprint.bot_id, "sess-a", _turn("assistant", "a2"))
+
+    reopened = JsonStore(path)
+    assert reopened.get_history(blueprint.bot_id, "sess-a") == [_turn("user", "a1"), _turn("assistant", "a2")]
+    assert reopened.get_history(blueprint.bot_id, "sess-b") == [_turn("user", "b1")]
+
+
+def test_expire_drops_idle_sessions_and_orphaned_blueprints(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    store = JsonStore(path, session_ttl_seconds=60, blueprint_ttl_seconds=30, sweep_interval_seconds=3600)
+    blueprint = _blueprint("bot-ttl")
+    store.save_blueprint(blueprint)
+    store.assign_session(blueprint.bot_id, "sess-old")
+    store.assign_session(blueprint.bot_id, "sess-new")
+    store.append_turn(blueprint.bot_id, "sess-old", _turn("user", "hi"))
+
+    now = time.time()
+    store._session_expiry.touch((blueprint.bot_id, "sess-new"), now + 50)
+
+    assert store.expire(now + 70) == 1
+    assert store.get_session_state("sess-old") == (None, [])
+    assert store.get_session_state("sess-new") == (blueprint, [])
+
+    # The blueprint keeps living while it still owns a session.
+    assert store.expire(now + 105) == 0
+    assert store.expire(now + 115) == 1
+    assert store.get_blueprint(blueprint.bot_id) == blueprint
+    assert store.expire(now + 140) == 1
+    assert store.get_blueprint(blueprint.bot_id) is None
+    store.close()
+
+    assert JsonStore(path).get_blueprint(blueprint.bot_id) is None
+
+
+def test_activity_timestamps_survive_restart(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    store = JsonStore(path, journal=True, session_ttl_seconds=60, sweep_interval_seconds=3600)
+    store.assign_session("bot-1", "sess")
+    store.close()
+
+    reopened = JsonStore(path, journal=True, session_ttl_seconds=60, sweep_interval_seconds=3600)
+    assert reopened.expire(time.time() + 61) == 1
+    assert reopened.get_session_state("sess") == (None, [])
+    reopened.compact()
+    reopened.close()
+
+    final = JsonStore(path, journal=True, session_ttl_seconds=60, sweep_interval_seconds=3600)
+    assert final.get_session_state("sess") == (None, [])
+    final.close()
+
+
+def test_memory_budget_spills_least_recent_sessions(tmp_path) -> None:
+    path = tmp_path / "store.json"
+    store = JsonStore(path, max_bytes=400)
+    for bot_id in ("bot-a", "bot-b"):
+        store.save_blueprint(_blueprint(bot_id))
+    store.assign_session("bot-a", "sess-a")
+    store.append_turn("bot-a", "sess-a", _turn("user", "a" * 200))
+    store.assign_session("bot-b", "sess-b")
+    store.append_turn("bot-b", "sess-b", _turn("user", "b" * 200))
+
+    memory = store.stats()["memory"]
+    assert memory["evictions"] == 1
+    assert memory["spilled"] == 1
+    assert memory["resident_sessions"] == 1
+    assert memory["bytes_in_use"] <= 400
+    assert len(list((tmp_path / "store.json.sessions").iterdir())) == 1
+
+    # Evicted sessions come back from the spill file, pushing the other one out.
+    assert store.get_history("bot-a", "sess-a") == [_turn("user", "a" * 200)]
+    assert store.stats()["memory"]["reloads"] == 1
+    # This snapshot references sess-b's spill file instead of its turns.
+    store.save_blueprint(_blueprint("bot-c"))
+    store.close()
+
+    reopened = JsonStore(path)
+    spill_dir = tmp_path / "store.json.sessions"
+    # sess-a's old spill file went away once that snapshot was on disk.
+    assert len(list(spill_dir.iterdir())) == 1
+    assert reopened.get_history("bot-a", "sess-a") == [_turn("user", "a" * 200)]
+    assert reopened.get_history("bot-b", "sess-b") == [_turn("user", "b" * 200)]
+    reopened.append_turn("bot-b", "sess-b", _turn("assistant", "ok"))
+    assert list(spill_dir.iterdir()) == []
+
+
+def test_memory_budget_drops_sessions_without_a_persistent_layer() -> None:
+    store = JsonStore(":memory:", max_bytes=300)
+    store.save_blueprint(_blueprint())
+    for session_id in ("sess-1", "sess-2"):
+        store.assign_session("bot-1", session_id)
+        store.append_turn("bot-1", session_id, _turn("user", "x" * 200))
+
+    assert store.get_session_state("sess-1") == (None, [])
+    assert store.get_history("bot-1", "sess-2") == [_turn("user", "x" * 200)]
+    assert store.stats()["memory"] | {"bytes_in_use": 0} == {
+        "max_bytes": 300,
+        "bytes_in_use": 0,
+        "resident_sessions": 1,
+        "evictions": 1,
+        "spilled": 0,
+        "dropped": 1,
+        "reloads": 0,
+    }
@@ -0,0 +1,42 @@
+import pytest
+
+from app.models.bot import ChatTurn
+from app.services.turn_history import EMPTY_HISTORY, TurnHistory
+
+
+def _turns() -> list[ChatTurn]:
+    return [
+        ChatTurn(role="user", content="hi"),
+        ChatTurn(role="assistant", content="hello"),
+        ChatTurn(role="user", content="menu?"),
+    ]
+
+
+def test_round_trips_between_models_and_raw_dicts():
+    history = TurnHistory.from_turns(_turns())
+
+    assert list(history) == _turns()
+    assert history[1] == ChatTurn(role="assistant", content="hello")
+    assert TurnHistory.from_raw(history.to_raw()) == history
+    assert history[1:] == _turns()[1:]
+
+
+def test_appended_returns_new_history_and_applies_limit():
+    history = TurnHistory.from_turns(_turns())
+
+    trimmed = history.appended(ChatTurn(role="assistant", content="pizza"), limit=2)
+
+    assert len(history) == 3
+    assert [turn.content for turn in trimmed] == ["menu?", "pizza"]
+    assert EMPTY_HISTORY == []
+
+
+def test_history_is_immutable_and_unhashable():
+    history = TurnHistory.from_turns(_turns())
+
+    with pytest.raises(AttributeError):
+        history.append(ChatTurn(role="user", content="nope"))  # type: ignore[attr-defined]
+    with pytest.raises(TypeError):
+        hash(history)
+    with pytest.raises(ValueError):
+        TurnHistory(b"\x00", ())